@@ -3,11 +3,8 @@ import asyncio
 import threading
 import sys
 import os
-import json
 from datetime import datetime
 from tkinter import filedialog
-from PyPDF2 import PdfReader
-from docx import Document
 
 # Garante que o diretório src esteja no path para chamadas internas
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
@@ -16,7 +13,10 @@ sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
 from hipnolawrence.core.browser import BrowserManager
 from hipnolawrence.core.brain import BrainManager
 from hipnolawrence.core.vision import VisionManager
-from hipnolawrence.core.dom_observer import DOMObserver
+from hipnolawrence.core.dom_observer import create_dom_observer
+from hipnolawrence.core.matrix_sync import MatrixSync
+from hipnolawrence.core.telemetry import get_telemetry
+from hipnolawrence.core.model_residency import ModelResidency
 
 class HipnoLawrenceGUI(ctk.CTk):
     def __init__(self):
@@ -31,7 +31,9 @@ class HipnoLawrenceGUI(ctk.CTk):
         self.browser = None
         self.brain = None
         self.dom_observer = None
+        self.residency = None
         self.loop = None
+        self._stream_open = False  # Linha de tokens do LLM em andamento na Thought Box
 
         # --- SIDEBAR (MENU DE FERRAMENTAS) ---
         self.sidebar = ctk.CTkFrame(self, width=280, corner_radius=0)
@@ -102,25 +104,51 @@ class HipnoLawrenceGUI(ctk.CTk):
         """Inicialização protegida."""
         self.append_thought("Iniciando Motores Neurais...")
         try:
+            # Modelos carregam no Ollama enquanto o navegador abre (1º comando sem carga a frio)
+            self.residency = ModelResidency(on_status=self._on_model_status)
+            self.residency.start()
             self.browser = BrowserManager()
             await self.browser.launch()
             self.brain = BrainManager(page=self.browser.page)
             self.brain.llm.model = "llama3.2"
-            self.dom_observer = DOMObserver()
+            self.loop.create_task(self.residency.prefill(self.brain.router.model_for("decision"), self.brain.session.system))
+            self.dom_observer = create_dom_observer()
             self.append_thought("Motores Online. Sistema pronto.")
             self.append_message("Hipno", "Saudações, Maestro. O console v5.1 está operacional. Como posso servir à sua estratégia hoje?")
         except Exception as e:
             self.append_thought(f"Falha ao iniciar motores: {e}")
 
+    def _on_model_status(self, model, state, detail):
+        """Prontidão por modelo (aquecimento e verificações periódicas) na Thought Box."""
+        self.append_thought(f"🔥 Modelo {model}: {state}" + (f" ({detail})" if detail else ""))
+        if self.residency and self.residency.ready() and state == "pronto":
+            self.append_thought(f"🟢 Todos os modelos residentes: {self.residency.summary()}")
+
     def append_thought(self, msg):
         self.after(0, lambda: self._update_thought_ui(msg))
 
     def _update_thought_ui(self, msg):
         self.thought_box.configure(state="normal")
+        if self._stream_open:
+            self.thought_box.insert("end", "\n")
+            self._stream_open = False
         self.thought_box.insert("end", f"[{datetime.now().strftime('%H:%M:%S')}] > {msg}\n")
         self.thought_box.see("end")
         self.thought_box.configure(state="disabled")
 
+    def append_stream(self, token):
+        """Tokens do LLM chegando em streaming: escritos na mesma linha da Thought Box."""
+        self.after(0, lambda: self._update_stream_ui(token))
+
+    def _update_stream_ui(self, token):
+        self.thought_box.configure(state="normal")
+        if not self._stream_open:
+            self.thought_box.insert("end", f"[{datetime.now().strftime('%H:%M:%S')}] ✍️ ")
+            self._stream_open = True
+        self.thought_box.insert("end", token.replace("\n", " "))
+        self.thought_box.see("end")
+        self.thought_box.configure(state="disabled")
+
     def append_message(self, sender, text):
         def update():
             self.chat_display.configure(state="normal")
@@ -179,19 +207,9 @@ class HipnoLawrenceGUI(ctk.CTk):
                 if ext == ".csv":
                     self.brain.registry.memory.add_csv_knowledge(f_path)
                     self.append_message("Sistema", f"Relatório CSV '{os.path.basename(f_path)}' integrado à inteligência.")
-                elif ext == ".pdf":
-                    text = ""
-                    reader = PdfReader(f_path)
-                    for page in reader.pages: text += page.extract_text() or ""
-                    if text.strip(): self.brain.registry.memory.add_knowledge(text, source=os.path.basename(f_path))
-                elif ext == ".docx":
-                    doc = Document(f_path)
-                    text = "\n".join([p.text for p in doc.paragraphs])
-                    if text.strip(): self.brain.registry.memory.add_knowledge(text, source=os.path.basename(f_path))
-                else: # TXT, MD
-                    with open(f_path, "r", encoding="utf-8", errors="ignore") as f:
-                        text = f.read()
-                    if text.strip(): self.brain.registry.memory.add_knowledge(text, source=os.path.basename(f_path))
+                else: # PDF, DOCX, TXT, MD (streaming em trechos sobrepostos)
+                    added = self.brain.registry.memory.add_document_knowledge(f_path)
+                    self.append_thought(f"{added} trechos indexados.")
                 
                 self.append_thought("Assimilado com sucesso.")
             except Exception as e:
@@ -204,7 +222,8 @@ class HipnoLawrenceGUI(ctk.CTk):
             if os.path.exists(cache_path):
                 os.remove(cache_path)
             self.brain.registry.memory.action_cache = {}
-            self.append_thought("🧹 Cache de automação (FastPath) limpo com sucesso.")
+            self.brain.decision_cache.clear()
+            self.append_thought("🧹 Cache de automação (FastPath) e de decisões limpos com sucesso.")
         except Exception as e:
             self.append_thought(f"❌ Erro ao limpar cache: {e}")
 
@@ -218,30 +237,13 @@ class HipnoLawrenceGUI(ctk.CTk):
             if sm.connect():
                 matrix = sm.get_full_matrix()
                 if matrix:
-                    # 1. Processa Performance (Gerador de Fatos Dinâmicos)
-                    for row in matrix['performance']:
-                        details = ", ".join([f"{k}: {v}" for k, v in row.items() if v])
-                        fact = f"Performance Mega-Report: {details}"
-                        self.brain.registry.memory.add_knowledge(fact, source="sheet_perf")
-                    
-                    # 2. Processa Intenção (Fatos de Termos e CPA)
-                    for row in matrix['demand']:
-                        details = ", ".join([f"{k}: {v}" for k, v in row.items() if v])
-                        fact = f"Estratégia/Intenção: {details}"
-                        self.brain.registry.memory.add_knowledge(fact, source="sheet_demand")
-                    
-                    # 3. Processa Competitividade (Leilão)
-                    for row in matrix['competitive']:
-                        fact = f"Concorrência: Na campanha {row.get('Campanha')}, perdemos {row.get('Perda IS (Orçamento)')} de visualizações por falta de verba."
-                        self.brain.registry.memory.add_knowledge(fact, source="sheet_comp")
-                    
-                    # 4. Processa Configurações (Mega-Matrix v2)
-                    if matrix.get('config'):
-                        for row in matrix['config']:
-                            # Filtra apenas campos com valores para não poluir o prompt
-                            active_data = {k: v for k, v in row.items() if v and v != '--'}
-                            knowledge_chunk = f"AUDITORIA COMPLETA CAMPANHA {row.get('Campanha_ID', row.get('Campanha'))}: " + json.dumps(active_data)
-                            self.brain.registry.memory.add_knowledge(knowledge_chunk, source="mega_matrix_v2")
+                    # Sync incremental: só linhas novas/alteradas são vetorizadas (fora do event loop)
+                    self.append_thought("🧬 Comparando impressões digitais das linhas...")
+                    report = await asyncio.to_thread(MatrixSync(self.brain.registry.memory).sync, matrix)
+                    self.append_thought(
+                        f"💾 Linhas: {report['added']} novas | {report['changed']} alteradas | "
+                        f"{report['unchanged']} inalteradas | {report['removed']} removidas."
+                    )
 
                     self.append_message("Sistema", "Mega-Matrix Sincronizada. 57 variáveis integradas ao Cérebro.")
                     self.append_thought("✅ Sincronização profunda concluída com sucesso.")
@@ -270,19 +272,64 @@ class HipnoLawrenceGUI(ctk.CTk):
                 await self._sync_spreadsheet_data()
                 return
             
-            # 1. Radar DOM
-            self.append_thought("📡 Mapeando Árvore de Acessibilidade...")
-            dom_elements = await self.dom_observer.observe_page(self.browser.page)
-            self.append_thought(f"👁️ {len(dom_elements)} elementos capturados.")
+            # 1. Radar DOM + Recuperação na Biblioteca (em paralelo, sem bloquear o loop)
+            self.append_thought("📡 Mapeando Árvore de Acessibilidade e consultando a Biblioteca...")
+            dom_elements, knowledge = await asyncio.gather(
+                self.dom_observer.observe_page(self.browser.page),
+                self.brain.registry.memory.aquery_knowledge(user_input)
+            )
+            self.append_thought(f"👁️ {len(dom_elements)} elementos capturados | 📚 {len(knowledge)} fatos recuperados.")
+            obs = self.dom_observer.last_stats
+            if obs and obs["mode"] == "incremental":
+                self.append_thought(f"🛰️ DOM incremental: {'índice novo' if obs['full'] else 'delta'} +{obs['changed']}/-{obs['removed']} "
+                                    f"em {obs['page_ms']:.0f} ms na página")
 
             # 2. Inferência
             self.append_thought("🧠 Enviando contexto para IA (Aguardando inferência assíncrona)...")
             current_url = self.browser.page.url if self.browser.page else ""
-            result = await self.brain.process_command(user_input, dom_elements=dom_elements, current_url=current_url)
+            calls_before = self.brain.session.calls
+            hits_before = self.brain.decision_cache.hits
+            result = await self.brain.process_command(user_input, dom_elements=dom_elements, current_url=current_url,
+                                                      knowledge=knowledge, on_token=self.append_stream,
+                                                      on_section=lambda name, text: self.append_message("Hipno", text))
+            if self.brain.last_route == "intent":
+                it = self.brain.intent.last
+                self.append_thought(f"🎯 Atalho de intenção: [{it['tool']}] score {it['score']:.2f} "
+                                    f"| {self.brain.intent.hits} diretos / {self.brain.intent.misses} via LLM")
+            cache = self.brain.decision_cache.stats()
+            self.append_thought(f"🗃️ Cache de decisões: {'ACERTO (sem inferência)' if cache['hits'] > hits_before else 'falha'} "
+                                f"| {cache['hits']} acertos / {cache['misses']} falhas")
+            decision = get_telemetry().summary(caller="decision")
+            for name, t in decision.items():
+                self.append_thought(f"⏱️ {name}: p50 {t['p50_total_ms'] / 1000:.1f}s / p95 {t['p95_total_ms'] / 1000:.1f}s "
+                                    f"| prefill {t['prompt_tps']:.0f} tok/s | geração {t['eval_tps']:.0f} tok/s | gargalo: {t['bottleneck']}")
+            route = self.brain.router.stats().get("decision")
+            if route and route["escalate_to"]:
+                self.append_thought(f"🔀 Roteador: {route['model']} → {route['escalate_to']} | escalonamento "
+                                    f"{route['escalation_rate']:.0%} ({route['escalated']}/{route['calls']}) "
+                                    f"| economia estimada {route['latency_saved_s']:+.1f}s")
+            if self.brain.session.calls > calls_before:
+                last = self.brain.session.last
+                reused = last["reused"] if last["reused"] is not None else "?"
+                self.append_thought(f"🔁 Prompt: {last['evaluated']} tokens avaliados | {reused} reaproveitados "
+                                    f"({last['prompt_eval_ms']:.0f} ms de prefill)")
             
             # 3. Resposta
             self.append_thought(f"✅ Ação Concluída: {result.get('action_taken')}")
-            self.append_message("Hipno", result.get("response"))
+            timings = result.get("timings")
+            if timings:
+                stages = " | ".join(f"{name} {d:.1f}s" for name, d in timings["stages"].items())
+                self.append_thought(f"⏱️ Ads: {stages} | total {timings['total_s']:.1f}s "
+                                    f"(sequencial seria {timings['sequential_s']:.1f}s)")
+            if not result.get("sections_emitted"):  # Seções já apareceram no chat conforme ficaram prontas
+                self.append_message("Hipno", result.get("response"))
+
+            # 4. Saúde do transporte Ollama (fila por modelo)
+            waiting = [f"{m}: fila {s['queued']}, espera média {s['wait_avg_s']:.1f}s"
+                       for m, s in self.brain.transport.stats()["models"].items()
+                       if s["saturated"] or s["wait_avg_s"] > 1.0]
+            if waiting:
+                self.append_thought(f"🚦 Ollama congestionado — {' | '.join(waiting)}")
             
         except Exception as e:
             self.append_thought(f"❌ ERRO: {e}")
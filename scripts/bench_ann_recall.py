@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Garante acesso ao core
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from hipnolawrence.core.vector_index import VectorIndex
+from hipnolawrence.core.ann_index import IVFIndex
+
+def synthetic_library(n, dim, clusters, rng):
+    """Vetores agrupados (como trechos de PDFs/relatórios sobre poucos temas) + ruído."""
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+
+def bench():
+    parser = argparse.ArgumentParser(description="Recall@k do IVF contra a varredura exata.")
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"Gerando {args.n} vetores sintéticos (dim={args.dim})...")
+    data = synthetic_library(args.n, args.dim, clusters=max(32, args.n // 2000), rng=rng)
+    queries = data[rng.choice(args.n, size=args.queries, replace=False)] + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    index = VectorIndex()
+    index.add_batch(data)
+    t0 = time.perf_counter()
+    ivf = IVFIndex(index, min_train=0)
+    ivf.train()
+    print(f"Treino IVF: {time.perf_counter() - t0:.2f}s ({len(ivf.centroids)} listas)")
+
+    t0 = time.perf_counter()
+    truth = [{r for r, _ in index.search(q, k=args.k)} for q in queries]
+    exact_ms = (time.perf_counter() - t0) * 1000 / args.queries
+    print(f"\n{'modo':<14}{'recall@' + str(args.k):>12}{'ms/consulta':>14}{'speedup':>10}")
+    print(f"{'exato':<14}{1.0:>12.3f}{exact_ms:>14.2f}{1.0:>10.1f}")
+
+    for nprobe in args.nprobe:
+        t0 = time.perf_counter()
+        found = [{r for r, _ in ivf.search(q, k=args.k, nprobe=nprobe)} for q in queries]
+        ms = (time.perf_counter() - t0) * 1000 / args.queries
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        print(f"{'ivf nprobe=' + str(nprobe):<14}{recall:>12.3f}{ms:>14.2f}{exact_ms / ms:>10.1f}")
+
+if __name__ == "__main__":
+    bench()
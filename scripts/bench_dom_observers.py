@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+# Garante acesso ao core
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from playwright.async_api import async_playwright
+from hipnolawrence.core.dom_observer import DOMObserver
+from hipnolawrence.core.ax_observer import AXTreeObserver
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "dom"
+
+def recall(reference, candidate):
+    """Fração dos elementos do radar JS encontrados pelo outro motor (por xpath; senão por tag + texto)."""
+    if not reference: return 1.0, 0
+    by_xpath = {e["xpath"] for e in candidate}
+    by_label = {(e["tag"], e["text"]) for e in candidate}
+    hits = sum(1 for e in reference if e["xpath"] in by_xpath or (e["tag"], e["text"]) in by_label)
+    ref_xpaths = {e["xpath"] for e in reference}
+    extra = sum(1 for e in candidate if e["xpath"] not in ref_xpaths)
+    return hits / len(reference), extra
+
+async def timed(observer, page, repeat):
+    times, elements = [], []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        elements = await observer.observe_page(page, full=True)
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return times[len(times) // 2], elements
+
+async def bench():
+    parser = argparse.ArgumentParser(description="DOMObserver (JS) vs. AXTreeObserver (CDP) em páginas salvas.")
+    parser.add_argument("--fixtures", nargs="*", default=None, help="Arquivos .html (padrão: scripts/fixtures/dom)")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+    files = [Path(f) for f in args.fixtures] if args.fixtures else sorted(FIXTURES_DIR.glob("*.html"))
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page(viewport={"width": 1920, "height": 1080})
+        js, ax = DOMObserver(incremental=False), AXTreeObserver()
+        print(f"{'página':<24}{'js ms':>8}{'ax ms':>8}{'js elem':>9}{'ax elem':>9}{'recall':>8}{'extras':>8}")
+        for path in files:
+            await page.goto(path.resolve().as_uri())
+            js_ms, reference = await timed(js, page, args.repeat)
+            ax_ms, found = await timed(ax, page, args.repeat)
+            if ax.last_stats and ax.last_stats["mode"] != "ax":
+                print(f"{path.name:<24} CDP indisponível (AX caiu para o radar JS)")
+                continue
+            r, extra = recall(reference, found)
+            print(f"{path.name:<24}{js_ms:>8.1f}{ax_ms:>8.1f}{len(reference):>9}{len(found):>9}{r:>8.1%}{extra:>8}")
+            missed = [e for e in reference if e["xpath"] not in {f["xpath"] for f in found}][:3]
+            for e in missed:
+                print(f"{'':<4}ausente no AX: <{e['tag']}> {e['text'][:40]!r} {e['xpath']}")
+        await browser.close()
+
+if __name__ == "__main__":
+    asyncio.run(bench())
@@ -0,0 +1,124 @@
+import os
+import sys
+import asyncio
+import argparse
+
+# Garante acesso ao core
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from playwright.async_api import async_playwright
+from hipnolawrence.core.dom_observer import SELECTOR_INDEX_JS, INTERACTIVE_SELECTOR, STABLE_ATTRIBUTES
+
+# DOM sintético: "grade" = milhares de linhas irmãs (tabelas do Google Ads); "arvore" = aninhamento profundo
+BUILD_DOM_JS = r"""
+([kind, nodes]) => {
+    document.body.innerHTML = '';
+    let made = 0;
+    const el = (tag, attrs, text) => {
+        const e = document.createElement(tag);
+        for (const [k, v] of Object.entries(attrs || {})) e.setAttribute(k, v);
+        if (text) e.textContent = text;
+        made++;
+        return e;
+    };
+    if (kind === 'grade') {
+        const grid = el('div', { role: 'grid' });
+        document.body.appendChild(grid);
+        for (let r = 0; made < nodes; r++) {
+            const row = el('div', { role: 'row' });
+            row.appendChild(el('span', {}, `Campanha ${r}`));
+            row.appendChild(el('a', {}, `Editar ${r}`));
+            // Parte das linhas tem atributo estável (como os data-* de alguns componentes)
+            row.appendChild(el('button', r % 10 === 0 ? { 'data-testid': `pausar-${r}` } : {}, 'Pausar'));
+            grid.appendChild(row);
+        }
+    } else {
+        const grow = (parent, depth) => {
+            if (made >= nodes) return;
+            const width = depth < 3 ? 8 : 3;
+            for (let i = 0; i < width && made < nodes; i++) {
+                const leaf = depth >= 12 || Math.random() < 0.15;
+                const node = leaf ? el(i % 2 ? 'button' : 'a', {}, `Item ${made}`) : el('div');
+                parent.appendChild(node);
+                if (!leaf) grow(node, depth + 1);
+            }
+        };
+        while (made < nodes) grow(document.body, 0);
+    }
+    return made;
+}
+"""
+
+# getXPath original (de baixo para cima, contando irmãos anteriores a cada nível)
+LEGACY_JS = r"""
+(selector) => {
+    function getXPath(el) {
+        if (el.id) return `//*[@id="${el.id}"]`;
+        const parts = [];
+        while (el && el.nodeType === Node.ELEMENT_NODE) {
+            let sibling = el;
+            let count = 1;
+            while ((sibling = sibling.previousElementSibling) != null) {
+                if (sibling.nodeName === el.nodeName) count++;
+            }
+            parts.unshift(`${el.nodeName.toLowerCase()}[${count}]`);
+            el = el.parentNode;
+        }
+        return parts.length ? '/' + parts.join('/') : null;
+    }
+    const t0 = performance.now();
+    const els = document.querySelectorAll(selector);
+    for (const el of els) getXPath(el);
+    return { ms: performance.now() - t0, elements: els.length };
+}
+"""
+
+# Gerador novo + conferência: cada seletor amostrado precisa resolver exatamente para o próprio elemento
+SINGLE_PASS_JS = r"""
+([selector, stableAttrs, sample]) => {
+    const buildSelectors = /*SELECTOR_INDEX*/;
+    const t0 = performance.now();
+    const index = buildSelectors(document.documentElement, selector, stableAttrs);
+    const paths = index.interactives.map(index.pathOf);
+    const ms = performance.now() - t0;
+
+    let wrong = 0, stable = 0;
+    const step = Math.max(1, Math.floor(paths.length / sample));
+    for (let i = 0; i < paths.length; i += step) {
+        const hit = document.evaluate(paths[i], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        if (hit.snapshotLength !== 1 || hit.snapshotItem(0) !== index.interactives[i]) wrong++;
+    }
+    for (const p of paths) if (p.startsWith('//*[@')) stable++;
+    return { ms, elements: paths.length, wrong, stable };
+}
+""".replace("/*SELECTOR_INDEX*/", SELECTOR_INDEX_JS.strip())
+
+async def bench():
+    parser = argparse.ArgumentParser(description="Geração de seletores: getXPath original vs. descida única.")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1_000, 5_000, 10_000, 25_000, 50_000])
+    parser.add_argument("--kinds", nargs="+", default=["grade", "arvore"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sample", type=int, default=500, help="Seletores conferidos com document.evaluate")
+    args = parser.parse_args()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.set_content("<html><body></body></html>")
+        print(f"{'dom':<8}{'nós':>8}{'interativos':>13}{'original ms':>14}{'descida ms':>13}{'speedup':>9}{'estáveis':>10}{'erros':>7}")
+        for kind in args.kinds:
+            for nodes in args.nodes:
+                made = await page.evaluate(BUILD_DOM_JS, [kind, nodes])
+                legacy, single = [], []
+                for _ in range(args.repeat):
+                    legacy.append(await page.evaluate(LEGACY_JS, INTERACTIVE_SELECTOR))
+                    single.append(await page.evaluate(SINGLE_PASS_JS, [INTERACTIVE_SELECTOR, STABLE_ATTRIBUTES, args.sample]))
+                old_ms = min(r["ms"] for r in legacy)
+                new_ms = min(r["ms"] for r in single)
+                last = single[-1]
+                print(f"{kind:<8}{made:>8}{last['elements']:>13}{old_ms:>14.1f}{new_ms:>13.1f}"
+                      f"{old_ms / max(new_ms, 1e-3):>9.1f}{last['stable']:>10}{last['wrong']:>7}")
+        await browser.close()
+
+if __name__ == "__main__":
+    asyncio.run(bench())
@@ -0,0 +1,53 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+from pathlib import Path
+
+# Garante acesso ao core
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from playwright.async_api import async_playwright
+from hipnolawrence.core.doctoralia_intelligence import DoctoraliaIntelligence, CARD_SCHEMA_VERSION, diff_cards
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "doctoralia"
+
+async def check():
+    parser = argparse.ArgumentParser(description="Confere a extração de cards da Doctoralia contra os arquivos golden.")
+    parser.add_argument("--update", action="store_true", help="Regrava os .golden.json com a saída atual")
+    args = parser.parse_args()
+
+    fixtures = sorted(FIXTURES_DIR.glob("*.html"))
+    failures = 0
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        intel = DoctoraliaIntelligence(page)
+        for html in fixtures:
+            golden_path = html.with_suffix(".golden.json")
+            golden = json.loads(golden_path.read_text(encoding="utf-8")) if golden_path.exists() else {"offset": 0}
+            await page.set_content(html.read_text(encoding="utf-8"))
+            got = await intel.extract_cards(offset=golden["offset"])
+
+            if args.update:
+                golden["expected"] = got
+                golden_path.write_text(json.dumps(golden, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+                print(f"[ATUALIZADO] {html.name}: {len(got['cards'])} cards")
+                continue
+            if "expected" not in golden:
+                print(f"[SEM GOLDEN] {html.name} (rode com --update)")
+                failures += 1
+                continue
+            problems = diff_cards(golden["expected"], got)
+            print(f"[{'OK' if not problems else 'FALHA'}] {html.name}: {len(got['cards'])} cards")
+            for problem in problems:
+                print(f"    {problem}")
+            failures += bool(problems)
+        await browser.close()
+
+    print(f"\nEsquema v{CARD_SCHEMA_VERSION}: {len(fixtures) - failures}/{len(fixtures)} fixtures conferem.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(check()))
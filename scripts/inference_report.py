@@ -0,0 +1,31 @@
+import os
+import sys
+import argparse
+
+# Garante acesso ao core
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from hipnolawrence.core.telemetry import InferenceTelemetry, metrics_path
+
+def report():
+    parser = argparse.ArgumentParser(description="Resumo da telemetria de inferência (p50/p95, tokens/s, gargalo).")
+    parser.add_argument("--path", default=metrics_path())
+    parser.add_argument("--window", type=int, default=200, help="Últimas N chamadas por modelo/chamador.")
+    parser.add_argument("--model")
+    parser.add_argument("--caller")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"Nenhuma métrica em {args.path}.")
+        return
+    telemetry = InferenceTelemetry(path=args.path, window=args.window)
+    summary = telemetry.summary(model=args.model, caller=args.caller)
+
+    print(f"{'modelo/chamador':<32} {'n':>5} {'total p50/p95 (ms)':>20} {'load p50':>9} {'prefill p50':>12} "
+          f"{'geração p50':>12} {'prompt tok/s':>13} {'geração tok/s':>14}  gargalo")
+    for name, s in summary.items():
+        print(f"{name:<32} {s['calls']:>5} {s['p50_total_ms']:>9.0f}/{s['p95_total_ms']:<10.0f} {s['p50_load_ms']:>9.0f} "
+              f"{s['p50_prompt_ms']:>12.0f} {s['p50_eval_ms']:>12.0f} {s['prompt_tps']:>13.1f} {s['eval_tps']:>14.1f}  {s['bottleneck']}")
+
+if __name__ == "__main__":
+    report()
@@ -6,8 +6,10 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 's
 
 try:
     from hipnolawrence.core.memory import MemoryManager
+    from hipnolawrence.core.chunker import iter_document_chunks, SUPPORTED_EXTENSIONS
 except ImportError:
     from src.hipnolawrence.core.memory import MemoryManager
+    from src.hipnolawrence.core.chunker import iter_document_chunks, SUPPORTED_EXTENSIONS
 
 def ingest():
     memory = MemoryManager()
@@ -18,25 +20,25 @@ def ingest():
         print(f"Pasta criada em {library_path}. Coloque seus arquivos .txt lá.")
         return
 
-    files = [f for f in os.listdir(library_path) if f.endswith(".txt")]
+    files = [f for f in os.listdir(library_path) if f.lower().endswith(SUPPORTED_EXTENSIONS)]
     
     if not files:
-        print("Nenhum arquivo .txt encontrado para ingestão.")
+        print("Nenhum arquivo (.txt, .md, .pdf, .docx) encontrado para ingestão.")
         return
 
-    for file_name in files:
-        path = os.path.join(library_path, file_name)
-        print(f"📖 Lendo {file_name}...")
-        
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
-            # Quebra por parágrafos para não estourar o limite de contexto
-            paragraphs = [p.strip() for p in content.split('\n\n') if len(p.strip()) > 10]
-            
-            for p in paragraphs:
-                memory.add_knowledge(p, source=f"file:{file_name}")
+    def chunks():
+        for file_name in files:
+            path = os.path.join(library_path, file_name)
+            print(f"📖 Lendo {file_name}...")
+            # Trechos sobrepostos, lidos em streaming para não estourar o limite de contexto
+            for chunk in iter_document_chunks(path):
+                chunk["source"] = f"file:{file_name}"
+                yield chunk
+
+    # Embeddings em lote + uma única gravação no store
+    added = memory.add_knowledge_batch(chunks(), commit_every=1024)
                 
-    print("✅ Ingestão concluída. Sua biblioteca de inteligência foi atualizada.")
+    print(f"✅ Ingestão concluída ({added} trechos). Sua biblioteca de inteligência foi atualizada.")
 
 if __name__ == "__main__":
     ingest()
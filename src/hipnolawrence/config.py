@@ -17,3 +17,71 @@ DOCTORALIA_URL = "https://www.doctoralia.com.br"
 # Browser Configuration
 HEADLESS = False
 VIEWPORT = {"width": 1920, "height": 1080}
+
+# Biblioteca de conhecimento (RAG)
+# "exact" (varredura vetorizada) ou "ivf" (aproximado; compensa a partir de ~100k fatos)
+LIBRARY_INDEX_MODE = "exact"
+# nlist (listas; padrão √N), nprobe (listas por consulta), min_train (linhas antes do 1º treino)
+LIBRARY_ANN_PARAMS = {"nprobe": 8, "min_train": 20_000}
+# "hybrid" (BM25 pré-filtra, vetor reordena) ou "vector" (só cosseno). O BM25 é um dicionário
+# em RAM, salvo em data/library_store/bm25.pkl; com milhões de trechos, prefira "vector".
+LIBRARY_RETRIEVAL_MODE = "hybrid"
+# Formato do índice vetorial: "float32", "float16" (2x menor) ou "int8" (~4x menor).
+# Reduz a RAM/page cache e o custo da varredura, NÃO o disco: a cópia float32 (.vec) continua
+# gravada para a reordenação exata, então float16/int8 somam +50%/+25% (+escala) ao disco.
+LIBRARY_STORAGE = "float32"
+
+# Ollama (Servidor Local de Modelos)
+OLLAMA_HOST = "http://localhost:11434"
+OLLAMA_TIMEOUT = 180.0          # Leitura (inferência longa)
+OLLAMA_CONNECT_TIMEOUT = 5.0
+OLLAMA_MAX_CONNECTIONS = 8
+# Requisições simultâneas por modelo (o resto espera na fila do transporte)
+OLLAMA_MODEL_CONCURRENCY = {"llama3.2:1b": 2, "llama3.2": 1, "llama3.1:8b": 1, "moondream": 1, "nomic-embed-text": 4}
+OLLAMA_DEFAULT_CONCURRENCY = 2
+# Mantém o modelo (e o KV-cache do prefixo estático) carregado entre turnos
+OLLAMA_KEEP_ALIVE = "30m"
+
+# Modelos aquecidos na inicialização (em paralelo ao navegador) e mantidos carregados
+# tipo: "generate" (LLM/visão) ou "embed". O llama3.1:8b (síntese) carrega sob demanda.
+RESIDENT_MODELS = {"llama3.2:1b": "generate", "llama3.2": "generate", "moondream": "generate", "nomic-embed-text": "embed"}
+RESIDENCY_CHECK_INTERVAL = 60  # segundos entre verificações de saúde (/api/ps)
+RESIDENCY_MAX_RELOADS = 3      # Recarregamentos após despejo antes de desistir (memória insuficiente?)
+
+# Streaming da decisão do LLM: tokens vão para a Thought Box e a ferramenta é
+# despachada assim que "tool" e "args" estiverem completos no JSON; o resto do stream é lido
+# em segundo plano até o "done" (que traz as métricas do prompt)
+LLM_STREAMING = True
+
+# Cache de decisões (comando + URL + digest do DOM -> ferramenta escolhida)
+DECISION_CACHE_SIZE = 256
+DECISION_CACHE_TTL = 600  # segundos
+
+# DOM Observer incremental (índice mantido na página por MutationObserver/IntersectionObserver);
+# False volta à varredura completa a cada comando
+DOM_OBSERVER_INCREMENTAL = True
+# Motor do observador: "js" (radar injetado na página) ou "ax" (árvore de acessibilidade via CDP, só Chromium)
+DOM_OBSERVER_ENGINE = "js"
+
+# Orçamento (tokens estimados) do DOM serializado no prompt
+DOM_CONTEXT_TOKENS = 600
+
+# Telemetria de inferência (uma linha JSON por chamada ao Ollama, em data/logs/inference_metrics.jsonl)
+INFERENCE_METRICS_WINDOW = 200          # Chamadas por (modelo, chamador) nas estatísticas móveis
+INFERENCE_METRICS_MAX_BYTES = 5_000_000 # Acima disso o arquivo é rotacionado
+
+# Roteamento de modelos por ponto de chamada (ver core/model_router.py)
+DEFAULT_MODEL = "llama3.2"
+MODEL_ROUTES = {
+    # Escolha de ferramenta: modelo mínimo; escala se o JSON/ferramenta for inválido ou a confiança baixa
+    "decision": {"model": "llama3.2:1b", "escalate_to": "llama3.2", "min_confidence": 0.6},
+    # Conselho estratégico em texto livre: modelo mais forte, com o padrão como reserva
+    "synthesis": {"model": "llama3.1:8b", "fallback": "llama3.2"},
+    "vision": {"model": "moondream"},
+}
+
+# Atalho de intenção por embeddings (comando -> ferramenta sem LLM)
+INTENT_FAST_PATH = True
+INTENT_THRESHOLD = 0.80   # Cosseno mínimo com o protótipo mais próximo
+INTENT_MARGIN = 0.05      # Folga mínima sobre a segunda ferramenta
+INTENT_MAX_LEARNED = 50   # Protótipos confirmados guardados por ferramenta
@@ -0,0 +1,102 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger("HipnoLawrence.AdsPipeline")
+
+VISION_PROMPT = "Resuma os números de Cliques e Impressões desta tela. Há algum aviso de erro ou configuração pendente?"
+
+
+class StageTimer:
+    """Cronômetro por estágio (início/fim relativos ao começo do pipeline)."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.stages = {}
+
+    async def run(self, name, coro):
+        start = time.perf_counter() - self.t0
+        try:
+            return await coro
+        finally:
+            self.stages[name] = (start, time.perf_counter() - self.t0)
+
+    def breakdown(self) -> Dict[str, Any]:
+        """Duração de cada estágio, total real e soma sequencial (o que custaria sem sobreposição)."""
+        durations = {name: end - start for name, (start, end) in self.stages.items()}
+        total = max((end for _, end in self.stages.values()), default=0.0)
+        return {"stages": durations, "total_s": total, "sequential_s": sum(durations.values())}
+
+    def summary(self) -> str:
+        b = self.breakdown()
+        parts = " | ".join(f"{name} {d:.1f}s" for name, d in b["stages"].items())
+        return f"{parts} | total {b['total_s']:.1f}s (sequencial seria {b['sequential_s']:.1f}s)"
+
+
+class AdsAuditPipeline:
+    """
+    Auditoria Google Ads em Pipeline.
+    1. Navega até as campanhas e captura o screenshot assim que a tabela aparece.
+    2. O screenshot segue para o modelo de visão enquanto as linhas da tabela são lidas.
+    3. Cada seção do relatório (campanhas, visão) é emitida via on_section ao ficar pronta.
+    A latência passa a ser navegação + screenshot + max(tabela, visão), não a soma de tudo.
+    """
+
+    def __init__(self, ads, vision, on_section: Optional[Callable[[str, str], None]] = None,
+                 snapshot_path: str = "kpi_snapshot.png"):
+        self.ads = ads
+        self.vision = vision
+        self.on_section = on_section
+        self.snapshot_path = snapshot_path
+        self.timer = StageTimer()
+
+    def emit(self, name, text):
+        if self.on_section:
+            try: self.on_section(name, text)
+            except Exception as e: logger.warning(f"Falha ao emitir seção {name}: {e}")
+
+    async def _vision(self, snap_path):
+        if not snap_path or not os.path.exists(snap_path):
+            return "Análise visual indisponível."
+        analysis = await self.timer.run("visão", self.vision.analyze_screenshot(snap_path, VISION_PROMPT))
+        self.emit("vision", format_vision_section(analysis))
+        return analysis
+
+    async def _rows(self):
+        rows = await self.timer.run("tabela", self.ads.extract_campaigns_data(navigate=False))
+        self.emit("campaigns", format_campaigns_section(filter_rows(rows)))
+        return rows
+
+    async def run(self) -> Dict[str, Any]:
+        await self.timer.run("navegação", self.ads.navigate_to_campaigns())
+        snap_path = await self.timer.run("screenshot", self.ads.capture_kpi_snapshot(self.snapshot_path))
+
+        vision_task = asyncio.create_task(self._vision(snap_path))
+        try:
+            rows = await self._rows()
+        except BaseException:
+            vision_task.cancel()
+            raise
+        visual_analysis = await vision_task
+
+        return {"table_data": rows, "snapshot_path": snap_path,
+                "visual_analysis": visual_analysis, "timer": self.timer}
+
+
+def filter_rows(rows):
+    """Remove linhas que parecem ser apenas ícones ou lixo de interface."""
+    return [r for r in rows if len(r['name']) > 5 and "expand_more" not in r['name']]
+
+def format_campaigns_section(rows):
+    text = f"✅ **Campanhas Ativas Identificadas:** {len(rows)}\n"
+    for r in rows:
+        text += f"- **{r['name']}**: Status {r['status']} | Orçamento {r['budget']}\n"
+    return text
+
+def format_vision_section(analysis):
+    return f"👁️ **VISÃO COMPUTACIONAL:**\n{analysis}\n"
+
+def format_insight_section(advice):
+    return f"💡 **INSIGHT DO ESPECIALISTA:**\n{advice}"
@@ -0,0 +1,204 @@
+import os
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger("HipnoLawrence.ANNIndex")
+
+class IVFIndex:
+    """
+    Índice Aproximado IVF (Inverted File) em NumPy puro, sem serviço externo.
+
+    1. Treina centróides por k-means esférico numa amostra da biblioteca.
+    2. Cada linha do VectorIndex é atribuída ao centróide mais próximo (lista invertida).
+    3. A consulta pontua só as nprobe listas mais próximas da pergunta.
+
+    Botões de recall/velocidade: nlist (nº de listas), nprobe (listas visitadas por consulta).
+    Abaixo de min_train linhas, ou antes do treino, a busca é exata (delegada ao VectorIndex).
+
+    Com path, centróides e listas são gravados após cada treino (e em save()), junto com o
+    layout dos segmentos do store. No boot, load() reaproveita o estado se o layout ainda
+    confere (sem compactação desde então) e só atribui as linhas acrescentadas depois.
+
+    Treinos disparados por add() rodam em thread daemon (train_async): o k-means acontece fora
+    de lock, e só a troca dos centróides/listas (mais a atribuição das linhas que chegaram
+    durante o treino) acontece sob lock, o mesmo que protege buscas e inserções (store.lock).
+    """
+
+    def __init__(self, index, nlist=None, nprobe=8, min_train=20_000, retrain_growth=4.0,
+                 train_sample=64, iterations=10, seed=0, path=None, layout=None, lock=None):
+        self.index = index
+        self.lock = lock or threading.RLock()
+        self._train_thread = None
+        self.path = path
+        self.layout = layout or (lambda: [])
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self.retrain_growth = retrain_growth
+        self.train_sample = train_sample
+        self.iterations = iterations
+        self._rng = np.random.default_rng(seed)
+        self.centroids = None
+        self._lists = []
+        self._arrays = []
+        self._trained_at = 0
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def _assign(self, vectors, centroids=None, chunk=16_384):
+        """Centróide mais próximo para cada vetor (em blocos para limitar a memória temporária)."""
+        centroids = self.centroids if centroids is None else centroids
+        out = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            out[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+        return out
+
+    def _fit(self, total, chunk=65_536):
+        """K-means sobre as primeiras total linhas. Não altera o índice: retorna (centróides, listas)."""
+        nlist = min(self.nlist or max(16, int(np.sqrt(total))), total)
+        sample_size = min(total, nlist * self.train_sample)
+        sample_rows = np.sort(self._rng.choice(total, size=sample_size, replace=False))
+        sample = self.index.take(sample_rows)
+
+        centroids = sample[self._rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(self.iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            # Listas vazias recebem um ponto aleatório da amostra (evita centróides mortos)
+            sums[empty] = sample[self._rng.choice(len(sample), size=int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = np.divide(sums, norms, out=np.zeros_like(sums), where=norms > 0)
+        centroids = centroids.astype(np.float32)
+
+        labels = np.concatenate([self._assign(self.index.take(np.arange(s, min(s + chunk, total))), centroids)
+                                 for s in range(0, total, chunk)])
+        order = np.argsort(labels, kind="stable")
+        bounds = np.cumsum(np.bincount(labels, minlength=nlist))[:-1]
+        return centroids, [part.tolist() for part in np.split(order, bounds)]
+
+    def _install(self, centroids, lists, total):
+        """Troca o estado treinado e atribui as linhas inseridas depois de total (chamar sob lock)."""
+        self.centroids = centroids
+        self._lists = lists
+        self._arrays = [None] * len(lists)
+        self._trained_at = total
+        if len(self.index) > total: self._add_rows(np.arange(total, len(self.index)))
+        logger.info(f"IVF treinado: {total} linhas em {len(lists)} listas.")
+
+    def train(self):
+        """(Re)treina os centróides e redistribui todas as linhas nas listas invertidas (bloqueante)."""
+        with self.lock:
+            total = len(self.index)
+            centroids, lists = self._fit(total)
+            self._install(centroids, lists, total)
+        self.save()
+
+    def train_async(self):
+        """Treina em thread daemon (no máximo um treino por vez); o índice atual segue atendendo."""
+        if self._train_thread and self._train_thread.is_alive(): return
+        self._train_thread = threading.Thread(target=self._train_background, daemon=True)
+        self._train_thread.start()
+
+    def _train_background(self):
+        try:
+            with self.lock:
+                total, layout = len(self.index), self.layout()
+            centroids, lists = self._fit(total)
+            with self.lock:
+                # Compactação durante o treino renumera as linhas: o resultado é descartado
+                if self.layout()[:len(layout)] != layout: return
+                self._install(centroids, lists, total)
+            self.save()
+        except Exception as e:
+            logger.warning(f"Falha no treino do IVF: {e}")
+
+    def save(self):
+        """Grava centróides + listas invertidas (linhas concatenadas e tamanhos) e o layout coberto."""
+        with self.lock:
+            if not self.path or not self.trained: return
+            sizes = np.array([len(rows) for rows in self._lists], dtype=np.int64)
+            rows = np.concatenate([self._list_array(i) for i in range(len(self._lists))]) if len(self._lists) else np.zeros(0, dtype=np.int64)
+            state = {"centroids": self.centroids, "rows": rows, "sizes": sizes, "trained_at": self._trained_at,
+                     "covered": len(self.index), "layout": np.array(self.layout(), dtype=str)}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, **state)
+        os.replace(tmp, self.path)
+
+    def load(self):
+        """Restaura o estado salvo. False se não existe, está ilegível ou o store foi compactado."""
+        if not self.path or not os.path.exists(self.path): return False
+        try:
+            with np.load(self.path) as data:
+                saved_layout = [str(name) for name in data["layout"]]
+                covered = int(data["covered"])
+                # Compactação renumera as linhas: o layout salvo precisa ser prefixo do atual
+                if self.layout()[:len(saved_layout)] != saved_layout or covered > len(self.index): return False
+                centroids = data["centroids"]
+                if centroids.shape[1] != self.index.dim: return False
+                bounds = np.cumsum(data["sizes"])[:-1]
+                self._lists = [part.tolist() for part in np.split(data["rows"], bounds)]
+                self._arrays = [None] * len(self._lists)
+                self.centroids = centroids.astype(np.float32)
+                self._trained_at = int(data["trained_at"])
+        except Exception as e:
+            logger.warning(f"Estado IVF ilegível ({e}). Retreinando.")
+            self.centroids = None
+            return False
+        if covered < len(self.index): self._add_rows(np.arange(covered, len(self.index)))
+        logger.info(f"IVF restaurado: {len(self.centroids)} listas, {len(self.index) - covered} linhas novas atribuídas.")
+        return True
+
+    def _add_rows(self, rows, chunk=65_536):
+        for start in range(0, len(rows), chunk):
+            part = rows[start:start + chunk]
+            labels = self._assign(self.index.take(part))
+            for row, label in zip(part.tolist(), labels.tolist()):
+                self._lists[label].append(row)
+                self._arrays[label] = None
+
+    def add(self, rows):
+        """
+        Chamado após inserções no VectorIndex: atribui as novas linhas e, ao cruzar o limiar,
+        dispara o (re)treino em segundo plano. Antes do primeiro treino a busca é exata.
+        """
+        if self.trained and rows: self._add_rows(np.asarray(rows, dtype=np.int64))
+        if not self.trained:
+            if len(self.index) and len(self.index) >= self.min_train: self.train_async()
+        elif len(self.index) >= self._trained_at * self.retrain_growth:
+            self.train_async()
+
+    def _list_array(self, label):
+        if self._arrays[label] is None:
+            self._arrays[label] = np.asarray(self._lists[label], dtype=np.int64)
+        return self._arrays[label]
+
+    def candidates(self, query_vec, nprobe=None):
+        """Linhas das nprobe listas mais próximas da consulta."""
+        q = self.index.normalize(query_vec)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        probe = np.argpartition(self.centroids @ q, -nprobe)[-nprobe:]
+        parts = [self._list_array(int(label)) for label in probe]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def search(self, query_vec, k=2, threshold=None, nprobe=None):
+        """Mesmo contrato do VectorIndex.search: [(linha, score)] em ordem decrescente."""
+        if not self.trained or len(self.index) < self.min_train:
+            return self.index.search(query_vec, k=k, threshold=threshold)
+        if np.shape(query_vec)[-1] != self.index.dim: return []
+
+        rows = self.candidates(query_vec, nprobe)
+        rows = rows[~self.index.deleted_mask(rows)]
+        if not len(rows): return []
+        scores = self.index.take(rows) @ self.index.normalize(query_vec)
+        # Mesmo corte do índice exato (inclui a reordenação float32 em formatos compactos)
+        results = self.index.select(scores, query_vec, k, rows=rows)
+        if threshold is not None:
+            results = [(r, s) for r, s in results if s > threshold]
+        return results
@@ -0,0 +1,176 @@
+import re
+import time
+import logging
+from typing import Dict, Any, List, Optional
+
+from hipnolawrence.core.dom_observer import DOMObserver, STABLE_ATTRIBUTES
+
+logger = logging.getLogger("HipnoLawrence.AXObserver")
+
+# Papéis da árvore de acessibilidade tratados como acionáveis (equivalentes ao seletor do DOMObserver)
+INTERACTIVE_ROLES = {
+    "button", "link", "textbox", "searchbox", "combobox", "listbox", "checkbox", "radio", "switch",
+    "menuitem", "menuitemcheckbox", "menuitemradio", "tab", "option", "slider", "spinbutton", "treeitem",
+}
+# Mesma heurística do gerador de seletores em JS: valores gerados não servem de âncora
+VOLATILE = re.compile(r"\d{4,}|^[a-f0-9]{8,}$|^(ember|gwt-uid|react-|mui-|:r)", re.IGNORECASE)
+
+
+def _ax_value(node, field):
+    return (node.get(field) or {}).get("value")
+
+def _ax_property(node, name):
+    for prop in node.get("properties", []):
+        if prop.get("name") == name:
+            return (prop.get("value") or {}).get("value")
+    return None
+
+def _literal(value):
+    if '"' not in value: return f'"{value}"'
+    if "'" not in value: return f"'{value}'"
+    return None
+
+
+class SnapshotDocument:
+    """
+    Documento principal de um DOMSnapshot.captureSnapshot (arrays paralelos indexados por nó).
+    Gera seletores com o mesmo algoritmo do SELECTOR_INDEX_JS: uma passada registra segmento
+    tag[n] e pai, conta atributos estáveis, e o caminho é montado a partir do ancestral memorizado.
+    """
+
+    def __init__(self, snapshot: Dict[str, Any]):
+        strings = snapshot["strings"]
+        doc = snapshot["documents"][0]
+        nodes = doc["nodes"]
+        self.scroll_x = doc.get("scrollOffsetX", 0)
+        self.scroll_y = doc.get("scrollOffsetY", 0)
+        string = lambda i: strings[i] if i is not None and i >= 0 else ""
+
+        self.parent = nodes["parentIndex"]
+        self.name = [string(i).lower() for i in nodes["nodeName"]]
+        self.type = nodes["nodeType"]
+        self.by_backend = {b: i for i, b in enumerate(nodes["backendNodeId"])}
+        self.attrs = [{string(flat[k]): string(flat[k + 1]) for k in range(0, len(flat), 2)}
+                      for flat in nodes.get("attributes", [[] for _ in self.parent])]
+
+        layout = doc["layout"]
+        self.bounds = dict(zip(layout["nodeIndex"], layout["bounds"]))
+        # Estilos pedidos em captureSnapshot(computedStyles=["visibility", "opacity"])
+        self.styles = {i: [string(s) for s in st] for i, st in zip(layout["nodeIndex"], layout.get("styles", []))}
+
+        self.seg = {}
+        self.counts = {}
+        per_tag = {}
+        for i, parent in enumerate(self.parent):
+            if self.type[i] != 1 or self.name[i].startswith("::"): continue  # Só elementos (sem pseudo-elementos)
+            key = (parent, self.name[i])
+            per_tag[key] = per_tag.get(key, 0) + 1
+            self.seg[i] = f"{self.name[i]}[{per_tag[key]}]"
+            for attr in STABLE_ATTRIBUTES:
+                value = self.attrs[i].get(attr)
+                if value: self.counts[(attr, value)] = self.counts.get((attr, value), 0) + 1
+        self._memo = {}
+
+    def _stable(self, i):
+        for attr in STABLE_ATTRIBUTES:
+            value = self.attrs[i].get(attr)
+            if not value or VOLATILE.search(value) or self.counts.get((attr, value)) != 1: continue
+            quoted = _literal(value)
+            if quoted: return f"//*[@{attr}={quoted}]"
+        return None
+
+    def path(self, i) -> Optional[str]:
+        if i not in self.seg: return None
+        chain, base, cur = [], "", i
+        while cur is not None and cur >= 0 and cur in self.seg:
+            if cur in self._memo:
+                base = self._memo[cur]
+                break
+            stable = self._stable(cur)
+            if stable:
+                self._memo[cur] = base = stable
+                break
+            chain.append(cur)
+            cur = self.parent[cur]
+        for node in reversed(chain):
+            base += "/" + self.seg[node]
+            self._memo[node] = base
+        return base
+
+    def visible(self, i) -> bool:
+        box = self.bounds.get(i)
+        if not box or box[2] <= 0 or box[3] <= 0: return False
+        visibility, opacity = (self.styles.get(i) or ["", ""])[:2]
+        return visibility != "hidden" and opacity != "0"
+
+
+class AXTreeObserver:
+    """
+    Observador pela Árvore de Acessibilidade (CDP, só Chromium).
+    1. Accessibility.getFullAXTree: papel e nome acessível de cada nó, já sem os ignorados.
+    2. DOMSnapshot.captureSnapshot: retângulos, visibilidade/opacidade e estrutura de todos os nós
+       numa única chamada (a árvore de acessibilidade não traz coordenadas).
+    Sem JavaScript na página nem getComputedStyle por elemento. Retorna o mesmo esquema do
+    DOMObserver (id, tag, text, x, y, xpath); sem CDP, cai para a varredura completa em JS.
+    """
+
+    def __init__(self):
+        self.fallback = DOMObserver(incremental=False)
+        self.last_stats = None
+        self._page = None
+        self._session = None
+
+    async def _cdp(self, page):
+        if self._session is None or self._page is not page:
+            self._session = await page.context.new_cdp_session(page)
+            self._page = page
+            try: await self._session.send("Accessibility.enable")
+            except Exception: pass
+        return self._session
+
+    async def observe_page(self, page, full=False):
+        if not page: return []
+        try:
+            return await self._observe(page)
+        except Exception as e:
+            logger.warning(f"Árvore de acessibilidade indisponível, usando varredura JS: {e}")
+            self._session = None
+            elements = await self.fallback.observe_page(page, full=True)
+            self.last_stats = self.fallback.last_stats
+            return elements
+
+    async def _observe(self, page):
+        started = time.perf_counter()
+        session = await self._cdp(page)
+        ax = await session.send("Accessibility.getFullAXTree")
+        snapshot = await session.send("DOMSnapshot.captureSnapshot", {"computedStyles": ["visibility", "opacity"]})
+        elements = self.build(ax.get("nodes", []), snapshot)
+        self.last_stats = {"mode": "ax", "elements": len(elements), "ms": (time.perf_counter() - started) * 1000}
+        return elements
+
+    @staticmethod
+    def build(ax_nodes: List[Dict[str, Any]], snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Cruza a árvore de acessibilidade com o snapshot do DOM (por backendDOMNodeId), na ordem do documento."""
+        doc = SnapshotDocument(snapshot)
+        found = {}
+        for node in ax_nodes:
+            if node.get("ignored"): continue
+            index = doc.by_backend.get(node.get("backendDOMNodeId"))
+            if index is None or index in found or index not in doc.seg: continue
+            role = _ax_value(node, "role")
+            if role not in INTERACTIVE_ROLES and not _ax_property(node, "focusable"): continue
+            if not doc.visible(index): continue
+            tag = doc.name[index]
+            text = str(_ax_value(node, "name") or _ax_value(node, "value") or "")
+            text = " ".join(text.split())[:60]
+            if not text and tag != "input": continue
+            found[index] = (tag, text)
+
+        elements = []
+        for index in sorted(found):
+            tag, text = found[index]
+            x, y, w, h = doc.bounds[index]
+            elements.append({"id": len(elements), "tag": tag, "text": text,
+                             "x": x + w / 2 - doc.scroll_x, "y": y + h / 2 - doc.scroll_y,
+                             "xpath": doc.path(index)})
+        return elements
@@ -1,5 +1,6 @@
 import json
-import httpx  # Substitui urllib para não bloquear o event loop
+import time
+import asyncio
 import sys
 import os
 import logging
@@ -8,7 +9,16 @@ from typing import Dict, Any, Optional
 # Integração com Ferramentas, Interpretador e LLM
 from hipnolawrence.core.tools import ToolRegistry
 from hipnolawrence.core.interpreter import ActionInterpreter
-from hipnolawrence.core.llm import OllamaClient
+from hipnolawrence.core.llm import OllamaClient, PromptSession
+from hipnolawrence.core.ollama_transport import get_transport
+from hipnolawrence.core.json_stream import IncrementalJSONObject
+from hipnolawrence.core.decision_cache import DecisionCache
+from hipnolawrence.core.dom_context import serialize_dom
+from hipnolawrence.core.model_router import ModelRouter
+from hipnolawrence.core.intent_router import IntentRouter
+from hipnolawrence.core.ads_pipeline import (StageTimer, VISION_PROMPT, filter_rows, format_campaigns_section,
+                                              format_vision_section, format_insight_section)
+from hipnolawrence.config import OLLAMA_HOST, LLM_STREAMING, INTENT_FAST_PATH
 
 # Configuração de Logs
 logger = logging.getLogger("HipnoLawrence.Brain")
@@ -23,7 +33,9 @@ class BrainManager:
         self.registry = ToolRegistry(browser_page=page)
         self.interpreter = ActionInterpreter(self.registry)
         self.model = "llama3.2"
-        self.host = "http://localhost:11434"
+        self.host = OLLAMA_HOST
+        self.router = ModelRouter(default_model=self.model)  # Modelo por ponto de chamada (decision, synthesis, vision)
+        self.transport = get_transport(self.host)  # Pool HTTP compartilhado (LLM, visão, embeddings)
         self.llm = OllamaClient(model=self.model, base_url=self.host)
         
         # INJEÇÃO DE IDENTIDADE (Nível 5.5 - Cientista de Dados LAM)
@@ -34,102 +46,266 @@ class BrainManager:
         Exemplo: 'O CTR está alto (X%), mas a Experiência na Página de Destino é Baixa (Y), o que explica o CPA de R$ Z.'
         GROUNDING: Se o dado na tela divergir da Mega-Matrix, priorize a Matrix como fonte histórica de verdade.
         """
+        # Prefixo estático (identidade + ferramentas + formato) idêntico a cada turno: o Ollama reaproveita o prefill
+        self.session = PromptSession(self._static_prefix())
+        # Comandos repetidos (macros da sidebar) sobre a mesma página reaproveitam a decisão
+        self.decision_cache = DecisionCache()
+        self.dom_context = None  # Último DOM serializado (id_map resolve ids citados pelo modelo)
+        # Comandos claros vão direto à ferramenta por similaridade com protótipos (sem LLM)
+        self.intent = IntentRouter(self.registry.memory)
+        self.last_route = None  # Origem da última decisão: cache, intent ou llm
+        self._drains = set()  # Streams lidos até o "done" em segundo plano após o despacho antecipado
 
-    async def process_command(self, user_input, dom_elements=None, current_url="", history=""):
+    def _static_prefix(self):
+        """Parte fixa do prompt. Nada que muda por turno (URL, DOM, conhecimento) pode entrar aqui."""
+        tools = json.dumps(self.registry.get_available_tools(), indent=2, ensure_ascii=False)
+        return (
+            f"{self.identity_prompt}\n\n"
+            f"FERRAMENTAS DISPONÍVEIS:\n{tools}\n\n"
+            'RESPOSTA: apenas JSON no formato {"confidence": 0.0 a 1.0, "tool": "nome_da_tool", "args": {...}}, '
+            'com "confidence" primeiro (sua certeza de que a ferramenta e os argumentos estão corretos). '
+            'Sem ferramenta adequada: {"confidence": 1.0, "tool": "none", "args": {"text": "resposta ao Maestro"}}.'
+        )
+
+    async def process_command(self, user_input, dom_elements=None, current_url="", history="", knowledge=None, on_token=None,
+                              on_section=None):
         """
         Versão Assíncrona da Inferência Brain.
+        knowledge: contexto já recuperado (ex.: buscado em paralelo à observação do DOM).
+        on_token: callback chamado com cada pedaço de texto gerado (modo streaming).
+        on_section: callback (nome, texto) chamado com cada seção do relatório assim que fica pronta.
         """
         user_input_lower = user_input.lower()
         if dom_elements is None: dom_elements = []
+        self.registry.on_section = on_section
 
         # 1. Obter Ferramentas e Contexto
-        tools_desc = self.registry.get_available_tools()
-        context_list = self.registry.memory.query_knowledge(user_input)
-        context = "\n".join(context_list) if context_list else "Sem dados históricos."
-        
-        # 2. Montar Prompt
-        full_prompt = (
-            f"{self.identity_prompt}\n\n"
-            f"URL ATUAL: {current_url}\n"
-            f"DOM RELEVANTE: {dom_elements}\n"
-            f"CONHECIMENTO RECUPERADO:\n{context}\n\n"
-            f"ORDEM DO MAESTRO: {user_input}"
-        )
+        self.session.set_system(self._static_prefix())
+        cache_key = self.decision_cache.key(user_input, current_url, dom_elements, self.session.prefix_id)
+        cached = self.decision_cache.get(cache_key)
+        self.last_route = "cache" if cached is not None else "llm"
+        if cached is None and INTENT_FAST_PATH:
+            try:
+                intent = await self.intent.classify(user_input)
+            except Exception as e:
+                logger.warning(f"Atalho de intenção indisponível: {e}")
+                intent = None
+            if intent is not None:
+                cached = {"tool": intent["tool"], "args": intent["args"]}
+                self.last_route = "intent"
+        if cached is None:
+            context_list = knowledge if knowledge is not None else await self.registry.memory.aquery_knowledge(user_input)
+            context = "\n".join(context_list) if context_list else "Sem dados históricos."
+            self.dom_context = serialize_dom(dom_elements, user_input)
+            logger.info(f"DOM serializado: {self.dom_context.kept}/{self.dom_context.total} elementos, ~{self.dom_context.tokens} tokens.")
+            
+            # 2. Montar Prompt (só a parte variável; identidade e ferramentas vão no prefixo da sessão)
+            full_prompt = (
+                f"URL ATUAL: {current_url}\n"
+                f"DOM RELEVANTE ({self.dom_context.kept} de {self.dom_context.total} elementos):\n{self.dom_context.text}\n"
+                f"CONHECIMENTO RECUPERADO:\n{context}\n\n"
+                f"ORDEM DO MAESTRO: {user_input}"
+            )
 
         # --- CAMADA 3: INFERÊNCIA LLM (AGORA 100% ASSÍNCRONA) ---
         try:
-            url = self.host + "/api/generate"
-            payload = {"model": self.model, "prompt": full_prompt, "stream": False, "format": "json"}
-
-            # Utiliza httpx com timeout adequado para não bloquear a GUI
-            async with httpx.AsyncClient(timeout=180.0) as client:
-                response = await client.post(url, json=payload)
-                response.raise_for_status()
-                result = response.json()
-                
-                try: 
-                    action_json = json.loads(result.get("response", "{}"))
-                except: 
+            pending = None
+            if cached is not None:
+                logger.info(f"♻️ Decisão sem inferência ({self.last_route}): [{cached.get('tool')}].")
+                action_json = cached
+            else:
+                action_json, pending = await self._decide(full_prompt, on_token)
+                if action_json is None:
                     return {"response": "Erro no parse do JSON gerado.", "action_taken": "error"}
+                if action_json.get("tool") not in (None, "", "error"):
+                    self.decision_cache.put(cache_key, {"tool": action_json["tool"], "args": action_json.get("args", {})})
+            
+            # Para compatibilidade com gui_app.py atual, executamos a ferramenta se decidida
+            if action_json.get("tool") and action_json.get("tool") != "none":
+                tool_name = action_json.get("tool")
+                logger.info(f"🤖 LLM Decidiu: Executar [{tool_name}]")
                 
-                # Para compatibilidade com gui_app.py atual, executamos a ferramenta se decidida
-                if action_json.get("tool") and action_json.get("tool") != "none":
-                    tool_name = action_json.get("tool")
-                    logger.info(f"🤖 LLM Decidiu: Executar [{tool_name}]")
-                    
-                    action_result = await self.interpreter.execute_action(json.dumps(action_json))
-                    if action_result["status"] == "success":
-                        return await self._synthesize_result(tool_name, action_result["result"])
-                    else:
-                        return {"response": f"Erro na execução: {action_result.get('message')}", "action_taken": tool_name}
-
-                return {"response": action_json.get("args", {}).get("text", "Não entendi a ordem ou ferramenta indisponível."), "action_taken": "none"}
+                # No streaming a ferramenta já foi despachada durante a geração
+                if not pending and self.last_route == "llm": action_json = self._resolve_element(action_json)
+                action_result = await pending if pending else await self.interpreter.execute_action(json.dumps(action_json))
+                if action_result["status"] == "success":
+                    if self.last_route == "llm":
+                        self.intent.learn(user_input, tool_name)  # Execução confirmada vira protótipo
+                    return await self._synthesize_result(tool_name, action_result["result"])
+                else:
+                    self.decision_cache.discard(cache_key)  # Decisão que falhou não deve se repetir
+                    return {"response": f"Erro na execução: {action_result.get('message')}", "action_taken": tool_name}
+
+            return {"response": action_json.get("args", {}).get("text", "Não entendi a ordem ou ferramenta indisponível."), "action_taken": "none"}
 
         except Exception as e:
             return {"response": f"Erro de Inferência Brain: {str(e)}", "action_taken": "error"}
 
+    def _resolve_element(self, action):
+        """
+        Ids de elemento citados pelo modelo (args.id) referem-se ao DOM serializado deste turno:
+        resolve pelo id_map e anexa o elemento real (xpath, x, y) em args.element.
+        """
+        args = action.get("args")
+        if not isinstance(args, dict) or "id" not in args or self.dom_context is None: return action
+        element = self.dom_context.resolve(args["id"])
+        if element is None:
+            logger.warning(f"Elemento {args['id']} citado pelo modelo não estava no DOM enviado.")
+            return action
+        target = {k: element.get(k) for k in ("xpath", "x", "y", "tag", "text")}
+        return {**action, "args": {**args, "element": target}}
+
+    async def _decide(self, prompt, on_token=None):
+        """
+        Decisão roteada: primeiro o modelo barato da rota "decision"; se o JSON vier inválido,
+        a ferramenta não existir, a confiança ficar baixa ou o modelo falhar, repete no modelo
+        de escalonamento. Retorna (ação | None, tarefa já despachada | None).
+        """
+        tools = self.registry.get_available_tools()
+        model = self.router.model_for("decision")
+        escalate = self.router.escalation_for("decision")
+        started = time.perf_counter()
+        try:
+            action, pending = await self._infer(model, prompt, on_token, strict=escalate is not None)
+            reason = None if pending else self.router.check("decision", action, tools)
+        except Exception as e:
+            if not escalate: raise
+            logger.warning(f"Modelo de decisão {model} falhou: {e}")
+            action, pending, reason = None, None, "model_error"
+        latency = time.perf_counter() - started
+
+        if reason and escalate:
+            started = time.perf_counter()
+            action, pending = await self._infer(escalate, prompt, on_token, strict=False)
+            self.router.record("decision", model, latency, escalated_to=escalate,
+                               escalated_latency_s=time.perf_counter() - started, reason=reason)
+        else:
+            self.router.record("decision", model, latency)
+        return action, pending
+
+    async def _infer(self, model, prompt, on_token=None, strict=False):
+        """Uma inferência de decisão no modelo informado (streaming ou não)."""
+        payload = self.session.payload(model, prompt, stream=False, format="json")
+        # Transporte compartilhado: conexão keep-alive e fila por modelo (não bloqueia a GUI)
+        if LLM_STREAMING:
+            return await self._stream_action(payload, on_token, strict)
+        result = await self.transport.generate(payload, caller="decision")
+        self.session.record(result)
+        try:
+            return json.loads(result.get("response", "{}")), None
+        except json.JSONDecodeError:
+            return None, None
+
+    async def _stream_action(self, payload, on_token=None, strict=False):
+        """
+        Inferência em streaming com despacho antecipado.
+        O JSON é lido incrementalmente; assim que "tool" e "args" estão completos a ferramenta
+        começa a executar em paralelo, sem esperar o fim da geração. O restante do stream é lido
+        por uma tarefa em segundo plano até o "done" (métricas de prompt da sessão e telemetria).
+        strict: só despacha se a rota aceitaria a decisão (ferramenta conhecida e confiança
+        declarada acima do limiar); senão a decisão é avaliada no fim e pode ser escalonada.
+        Retorna (ação | None, tarefa da ferramenta já despachada | None).
+        """
+        tools = self.registry.get_available_tools()
+        parser = IncrementalJSONObject()
+        pending = None
+        chunks = self.transport.generate_stream(payload, caller="decision")
+        try:
+            async for chunk in chunks:
+                if chunk.get("done"):
+                    self.session.record(chunk)
+                    break
+                token = chunk.get("response", "")
+                if token:
+                    parser.feed(token)
+                    if on_token: on_token(token)
+                if parser.has("tool", "args"):
+                    tool = parser.fields["tool"]
+                    ready = self.router.dispatchable("decision", parser.fields, tools) if strict else tool in tools
+                    if ready and tool != "none":
+                        logger.info(f"⚡ Ação completa no stream ({len(parser.text)} caracteres): despachando [{tool}].")
+                        action = self._resolve_element({"tool": tool, "args": parser.fields["args"]})
+                        pending = asyncio.create_task(self.interpreter.execute_action(json.dumps(action)))
+                        # O gerador passa para a tarefa de drenagem (que o fecha ao terminar)
+                        drain = asyncio.create_task(self._drain_stream(chunks))
+                        self._drains.add(drain)
+                        drain.add_done_callback(self._drains.discard)
+                        break
+        except Exception as e:
+            # Falha depois do despacho (ex.: conexão caiu no final) não invalida a ação já decidida
+            if pending is None: raise
+            logger.warning(f"Stream encerrado com erro após o despacho: {e}")
+        finally:
+            if pending is None: await chunks.aclose()
+
+        if parser.has("tool", "args"):
+            return dict(parser.fields), pending
+        try:
+            return json.loads(parser.text or "{}"), None
+        except json.JSONDecodeError:
+            fallback = self.llm._fallback_json_parsing(parser.text)
+            return (None if fallback.get("tool") == "error" else fallback), None
+
+    async def _drain_stream(self, chunks):
+        """Lê o resto da geração após o despacho até o "done" (registra a sessão) e fecha o stream."""
+        try:
+            async for chunk in chunks:
+                if chunk.get("done"):
+                    self.session.record(chunk)
+                    break
+        except Exception as e:
+            logger.debug(f"Drenagem do stream interrompida: {e}")
+        finally:
+            await chunks.aclose()
+
     async def _synthesize_result(self, tool_name: str, raw_data: Any) -> Dict:
         """Motor de Síntese: Transforma dados brutos em Relatório Estratégico."""
         
         if tool_name == "google_ads_visual":
-            rows = raw_data.get("table_data", [])
-            # FILTRO: Remove linhas que parecem ser apenas ícones ou lixo de interface
-            filtered_rows = [r for r in rows if len(r['name']) > 5 and "expand_more" not in r['name']]
-            
+            filtered_rows = filter_rows(raw_data.get("table_data", []))
             snap_path = raw_data.get("snapshot_path")
-            
-            # 1. Chamada de Visão Computacional (Moondream) para análise qualitativa
-            logger.info("Solicitando análise qualitativa ao Moondream...")
-            visual_analysis = "Análise visual indisponível."
-            if os.path.exists(snap_path):
-                from hipnolawrence.core.vision import VisionManager
-                vision = VisionManager() # Instancia localmente para o relatório
-                visual_analysis = await vision.analyze_screenshot(
-                    snap_path, 
-                    "Resuma os números de Cliques e Impressões desta tela. Há algum aviso de erro ou configuração pendente?"
-                )
-
-            # 2. Construção do Relatório Final
-            report = f"📊 **AUDITORIA ESTRATÉGICA GOOGLE ADS**\n\n"
-            report += f"✅ **Campanhas Ativas Identificadas:** {len(filtered_rows)}\n"
-            for r in filtered_rows:
-                report += f"- **{r['name']}**: Status {r['status']} | Orçamento {r['budget']}\n"
-            
-            report += f"\n👁️ **VISÃO COMPUTACIONAL:**\n{visual_analysis}\n"
-            report += f"\n💡 **INSIGHT DO ESPECIALISTA:**\n"
-            
-            # Feedback do Llama 3.2
+            timer = raw_data.pop("timer", None) or StageTimer()
+            # Seções só são emitidas aos poucos quando o pipeline já enviou campanhas e visão
+            streamed = self.registry.on_section is not None and "visual_analysis" in raw_data
+
+            # 1. Visão Computacional (Moondream): normalmente já rodou em paralelo à leitura da tabela
+            visual_analysis = raw_data.get("visual_analysis")
+            if visual_analysis is None:
+                logger.info("Solicitando análise qualitativa ao Moondream...")
+                visual_analysis = "Análise visual indisponível."
+                if snap_path and os.path.exists(snap_path):
+                    from hipnolawrence.core.vision import VisionManager
+                    vision = VisionManager(model=self.router.model_for("vision")) # Instancia localmente para o relatório
+                    visual_analysis = await timer.run("visão", vision.analyze_screenshot(snap_path, VISION_PROMPT))
+
+            # 2. Feedback do modelo de síntese (única etapa que depende de tabela e visão)
             try:
                 final_prompt = f"Com base nessas campanhas: {filtered_rows} e nesta visão: {visual_analysis}, dê um conselho estratégico curto para o Dr. Victor."
-                feedback = await self.llm.decide_action(final_prompt, {"reply": "texto"})
-                report += feedback.get("args", {}).get("text", "O sistema está processando os dados para o próximo passo.")
+                feedback = await timer.run("conselho", self.llm.decide_action(final_prompt, {"reply": "texto"}, caller="synthesis",
+                                                                              model=self.router.model_for("synthesis")))
+                fallback = self.router.fallback_for("synthesis")
+                if feedback.get("tool") == "error" and fallback:
+                    # Modelo forte indisponível (não baixado/sem memória): usa o modelo padrão
+                    feedback = await timer.run("conselho", self.llm.decide_action(final_prompt, {"reply": "texto"}, caller="synthesis", model=fallback))
+                advice = feedback.get("args", {}).get("text", "O sistema está processando os dados para o próximo passo.")
             except:
-                report += "A análise visual foi concluída, mas o feedback textual expirou. Tente novamente."
+                advice = "A análise visual foi concluída, mas o feedback textual expirou. Tente novamente."
+            if streamed:
+                self.registry.on_section("insight", format_insight_section(advice))
+
+            # 3. Construção do Relatório Final
+            report = f"📊 **AUDITORIA ESTRATÉGICA GOOGLE ADS**\n\n"
+            report += format_campaigns_section(filtered_rows)
+            report += "\n" + format_vision_section(visual_analysis)
+            report += "\n" + format_insight_section(advice)
+            logger.info(f"Tempos da auditoria: {timer.summary()}")
 
             return {
                 "response": report,
                 "data": raw_data,
-                "action_taken": tool_name
+                "action_taken": tool_name,
+                "timings": timer.breakdown(),
+                "sections_emitted": streamed,
             }
         
         summary = "Ação concluída."
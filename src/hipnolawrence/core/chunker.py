@@ -0,0 +1,82 @@
+import os
+import logging
+from collections import deque
+
+logger = logging.getLogger("HipnoLawrence.Chunker")
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".md", ".txt")
+
+def _iter_text_paragraphs(path):
+    """TXT/MD: lê linha a linha e emite parágrafos (blocos separados por linha em branco)."""
+    buffer = []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if line.strip():
+                buffer.append(line.strip())
+            elif buffer:
+                yield " ".join(buffer)
+                buffer = []
+    if buffer: yield " ".join(buffer)
+
+def iter_units(path):
+    """
+    Gera (texto, página) na granularidade natural do formato, sem carregar o documento inteiro:
+    PDF página a página; DOCX, MD e TXT parágrafo a parágrafo (página None).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        from PyPDF2 import PdfReader
+        reader = PdfReader(path)
+        for number, page in enumerate(reader.pages, start=1):
+            text = page.extract_text() or ""
+            if text.strip(): yield text, number
+    elif ext == ".docx":
+        from docx import Document
+        for paragraph in Document(path).paragraphs:
+            if paragraph.text.strip(): yield paragraph.text, None
+    else:
+        for paragraph in _iter_text_paragraphs(path):
+            yield paragraph, None
+
+def iter_chunks(units, source, max_tokens=200, overlap=40):
+    """
+    Janela deslizante sobre as palavras das unidades: trechos de até max_tokens palavras,
+    com overlap palavras repetidas entre trechos vizinhos. Memória limitada a uma janela.
+
+    Cada trecho: {"text", "source", "page", "page_end", "offset", "chunk"}
+    (offset = posição da primeira palavra no documento).
+    """
+    if overlap >= max_tokens:
+        raise ValueError("overlap deve ser menor que max_tokens.")
+    window = deque()  # (palavra, página)
+    position = 0      # índice global da primeira palavra da janela
+    chunk_number = 0
+
+    def emit(count):
+        words = [window[i] for i in range(count)]
+        return {
+            "text": " ".join(w for w, _ in words),
+            "source": source,
+            "page": words[0][1],
+            "page_end": words[-1][1],
+            "offset": position,
+            "chunk": chunk_number,
+        }
+
+    for text, page in units:
+        for word in text.split():
+            window.append((word, page))
+            if len(window) >= max_tokens:
+                yield emit(max_tokens)
+                chunk_number += 1
+                step = max_tokens - overlap
+                for _ in range(step): window.popleft()
+                position += step
+
+    # Resto: só emite se trouxer palavras além do overlap já emitido
+    if window and (chunk_number == 0 or len(window) > overlap):
+        yield emit(len(window))
+
+def iter_document_chunks(path, max_tokens=200, overlap=40):
+    """Atalho: trechos de um arquivo (PDF, DOCX, MD, TXT) com a fonte = nome do arquivo."""
+    return iter_chunks(iter_units(path), os.path.basename(path), max_tokens=max_tokens, overlap=overlap)
@@ -0,0 +1,88 @@
+import re
+import json
+import time
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qsl, urlencode, urlunsplit
+from typing import Dict, Any, Optional, List
+
+from hipnolawrence.config import DECISION_CACHE_SIZE, DECISION_CACHE_TTL
+
+logger = logging.getLogger("HipnoLawrence.DecisionCache")
+
+# Campos do DOM Observer que identificam o estado da página (coordenadas mudam com scroll/zoom)
+DOM_DIGEST_FIELDS = ("tag", "text", "xpath")
+
+def normalize_command(command: str) -> str:
+    """Minúsculas, sem acentos, pontuação final e espaços repetidos."""
+    folded = unicodedata.normalize("NFKD", command.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", folded).strip(" .!?")
+
+def normalize_url(url: str) -> str:
+    """Sem fragmento e com a query ordenada (mesma página, mesma chave)."""
+    if not url: return ""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+def dom_digest(dom_elements: Optional[List[Dict[str, Any]]]) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    for el in dom_elements or []:
+        h.update(json.dumps([el.get(f) for f in DOM_DIGEST_FIELDS], ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()
+
+
+class DecisionCache:
+    """
+    Cache de Decisões do LLM (em memória).
+    Chave = comando normalizado + URL normalizada + digest do DOM (+ prefixo do prompt).
+    Um acerto devolve a decisão anterior ({"tool", "args"}) sem inferência; a ferramenta
+    continua sendo executada normalmente. Entradas expiram após ttl segundos; acima da
+    capacidade, sai a usada há mais tempo (LRU).
+    """
+
+    def __init__(self, capacity=DECISION_CACHE_SIZE, ttl=DECISION_CACHE_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()  # chave -> (instante, decisão)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(command, url, dom_elements, prefix_id=""):
+        return f"{prefix_id}|{normalize_url(url)}|{dom_digest(dom_elements)}|{normalize_command(command)}"
+
+    def get(self, key) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return json.loads(entry[1])  # Cópia: quem executa pode mutar os args
+
+    def put(self, key, decision: Dict[str, Any]):
+        self._entries[key] = (time.monotonic(), json.dumps(decision, ensure_ascii=False))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def discard(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0}
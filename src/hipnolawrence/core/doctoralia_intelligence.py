@@ -1,12 +1,40 @@
 import logging
 import asyncio
 import random
-from typing import List, Dict
+from typing import List, Dict, Any
+from urllib.parse import urljoin
 from playwright.async_api import Page
 
 # Configuração de Logs
 logger = logging.getLogger("HipnoLawrence.Doctoralia")
 
+# Versão do esquema dos cards extraídos; incrementar ao mudar campos ou seus significados
+CARD_SCHEMA_VERSION = 1
+
+# Extração em uma única chamada: todos os cards (li[data-id]) da página de resultados + presença do "próximo"
+CARD_EXTRACT_JS = r"""
+() => {
+    const clean = (t) => (t || '').replace(/\s+/g, ' ').trim();
+    const cards = [];
+    document.querySelectorAll('li[data-id]').forEach((card, i) => {
+        const link = card.querySelector('a.rank-element-name');
+        if (!link) return;
+        const scoreEl = card.querySelector('[data-score]');
+        const reviews = clean(card.textContent).match(/(\d[\d.]*)\s+opini/i);
+        cards.push({
+            position: i,
+            name: clean(link.textContent),
+            id: card.getAttribute('data-id'),
+            is_sponsored: card.querySelector('.badge-ad') !== null,
+            score: scoreEl ? scoreEl.getAttribute('data-score') : null,
+            reviews: reviews ? reviews[1] : null,
+            profile_url: link.getAttribute('href'),
+        });
+    });
+    return { schema: /*SCHEMA*/, cards, has_next: document.querySelector("a[aria-label='next']") !== null };
+}
+""".replace("/*SCHEMA*/", str(CARD_SCHEMA_VERSION))
+
 class DoctoraliaIntelligence:
     """
     Módulo de Inteligência Competitiva e Auditoria de Ranking.
@@ -61,6 +89,14 @@ class DoctoraliaIntelligence:
         logger.info(f"Encontrados {len(results)} links da Doctoralia no Google.")
         return results
 
+    async def extract_cards(self, offset: int = 0) -> Dict[str, Any]:
+        """
+        Cards da página de resultados atual numa única chamada à página.
+        offset: posições das páginas anteriores. Retorna {"cards": [...], "has_next": bool}.
+        """
+        payload = await self.page.evaluate(CARD_EXTRACT_JS)
+        return normalize_cards(payload, offset, self.DOCTORALIA_URL)
+
     async def scan_ranking_direct(self, specialty: str, city: str, max_pages: int = 2) -> List[Dict]:
         """
         Varredura direta no site (Modo Comet).
@@ -83,29 +119,13 @@ class DoctoraliaIntelligence:
                 # Comportamento Humano: Rolar a página antes de extrair
                 await self._human_scroll()
                 
-                # Extração
-                cards = await self.page.locator("li[data-id]").all()
-                for index, card in enumerate(cards):
-                    try:
-                        data_id = await card.get_attribute("data-id")
-                        name_locator = card.locator("a.rank-element-name")
-                        
-                        if await name_locator.count() > 0:
-                            name = await name_locator.first.text_content()
-                            is_ad = await card.locator(".badge-ad").count() > 0
-                            
-                            results.append({
-                                "rank": (current_page - 1) * 20 + (index + 1),
-                                "name": name.strip(),
-                                "is_sponsored": is_ad,
-                                "id": data_id
-                            })
-                    except:
-                        continue
+                # Extração (uma chamada por página)
+                page_data = await self.extract_cards(offset=(current_page - 1) * 20)
+                results.extend(page_data["cards"])
                 
                 # Paginação
                 next_button = self.page.locator("a[aria-label='next']")
-                if await next_button.count() > 0 and current_page < max_pages:
+                if page_data["has_next"] and current_page < max_pages:
                     # Move o mouse até o botão (simulado) e clica
                     await next_button.scroll_into_view_if_needed()
                     await self._human_delay(1, 2)
@@ -119,3 +139,45 @@ class DoctoraliaIntelligence:
             logger.error(f"Erro no scan direto: {e}")
         
         return results
+
+
+def _parse_number(text, count=False):
+    """Número da página: nota "4,8"/"4.9" -> float; contagem ("1.204", count=True) -> int. Vazio/ilegível -> None."""
+    if not text: return None
+    try:
+        return int(text.replace(".", "")) if count else float(text.replace(",", "."))
+    except ValueError:
+        return None
+
+def normalize_cards(payload: Dict[str, Any], offset: int = 0, base_url: str = DoctoraliaIntelligence.DOCTORALIA_URL) -> Dict[str, Any]:
+    """
+    Converte o retorno bruto de CARD_EXTRACT_JS nos cards do esquema: posição -> rank (somando o
+    offset das páginas anteriores), nota e nº de opiniões em número, URL de perfil absoluta.
+    """
+    cards = []
+    for card in payload.get("cards", []):
+        url = card.get("profile_url")
+        cards.append({
+            "rank": offset + card["position"] + 1,
+            "name": card.get("name"),
+            "id": card.get("id"),
+            "is_sponsored": bool(card.get("is_sponsored")),
+            "rating": _parse_number(card.get("score")),
+            "reviews": _parse_number(card.get("reviews"), count=True),
+            "profile_url": urljoin(base_url, url) if url else None,
+            "schema_version": payload.get("schema", CARD_SCHEMA_VERSION),
+        })
+    return {"cards": cards, "has_next": bool(payload.get("has_next"))}
+
+def diff_cards(expected: Dict[str, Any], got: Dict[str, Any]) -> List[str]:
+    """Diferenças legíveis entre o esperado e o extraído (campo a campo, por posição)."""
+    problems = []
+    if expected["has_next"] != got["has_next"]:
+        problems.append(f"has_next: esperado {expected['has_next']}, obtido {got['has_next']}")
+    if len(expected["cards"]) != len(got["cards"]):
+        problems.append(f"cards: esperado {len(expected['cards'])}, obtido {len(got['cards'])}")
+    for i, (exp, card) in enumerate(zip(expected["cards"], got["cards"])):
+        for field in sorted(set(exp) | set(card)):
+            if exp.get(field) != card.get(field):
+                problems.append(f"card {i} {field}: esperado {exp.get(field)!r}, obtido {card.get(field)!r}")
+    return problems
@@ -0,0 +1,82 @@
+import logging
+from typing import Dict, Any, List, Optional
+
+from hipnolawrence.config import DOM_CONTEXT_TOKENS
+from hipnolawrence.core.lexical_index import tokenize
+
+logger = logging.getLogger("HipnoLawrence.DOMContext")
+
+# Peso por tipo de elemento: o que o agente costuma acionar vem antes
+TAG_PRIOR = {"button": 1.0, "a": 0.8, "input": 0.8, "select": 0.8, "textarea": 0.6}
+CHARS_PER_TOKEN = 4  # Estimativa conservadora para PT-BR nos tokenizers dos modelos locais
+STEM = 5             # Prefixo comparado entre termos ("campanha" ~ "campanhas")
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class DOMContext:
+    """Contexto do DOM pronto para o prompt + mapa id -> elemento original (xpath, x, y)."""
+
+    def __init__(self, text, id_map=None, total=0, kept=0, tokens=0):
+        self.text = text
+        self.id_map = id_map or {}
+        self.total = total      # Elementos observados
+        self.kept = kept        # Linhas que couberam no orçamento
+        self.tokens = tokens    # Tokens estimados do texto
+
+    def resolve(self, element_id) -> Optional[Dict[str, Any]]:
+        """Elemento original a partir do id citado pelo modelo."""
+        try:
+            return self.id_map.get(int(element_id))
+        except (TypeError, ValueError):
+            return None
+
+
+def _score(element, index, total, query_stems):
+    text_stems = {t[:STEM] for t in tokenize(element.get("text", ""))}
+    overlap = len(query_stems & text_stems) / len(query_stems) if query_stems else 0.0
+    position = 1.0 - index / max(total, 1)  # Topo da página (menus, filtros) pesa um pouco mais
+    return 3.0 * overlap + TAG_PRIOR.get(element.get("tag"), 0.4) + 0.5 * position
+
+
+def serialize_dom(dom_elements: List[Dict[str, Any]], command: str = "", budget_tokens: int = DOM_CONTEXT_TOKENS) -> DOMContext:
+    """
+    Serializa os elementos do DOM Observer dentro de um orçamento de tokens.
+    1. Rótulos repetidos (mesma tag + texto) viram uma linha só, com contagem.
+    2. Ranking por relevância léxica ao comando + tipo de elemento + posição.
+    3. Só id, tag e texto entram no prompt; xpath e coordenadas ficam no id_map.
+    4. As linhas escolhidas saem na ordem do documento.
+    """
+    dom_elements = dom_elements or []
+    groups = {}
+    for index, el in enumerate(dom_elements):
+        label = (el.get("tag", ""), " ".join(str(el.get("text", "")).split()))
+        if label in groups:
+            groups[label]["count"] += 1
+        else:
+            groups[label] = {"element": el, "index": index, "count": 1}
+
+    query_stems = {t[:STEM] for t in tokenize(command)}
+    ranked = sorted(groups.values(),
+                    key=lambda g: _score(g["element"], g["index"], len(dom_elements), query_stems),
+                    reverse=True)
+
+    header = "id|tag|texto"
+    used = estimate_tokens(header)
+    chosen = []
+    for group in ranked:
+        el = group["element"]
+        line = f"{el.get('id')}|{el.get('tag', '')}|{' '.join(str(el.get('text', '')).split())}"
+        if group["count"] > 1: line += f" (x{group['count']})"
+        cost = estimate_tokens(line)
+        if used + cost > budget_tokens: continue  # Linhas menores ainda podem caber
+        used += cost
+        chosen.append((group["index"], line, el))
+
+    chosen.sort(key=lambda c: c[0])
+    text = "\n".join([header] + [line for _, line, _ in chosen]) if chosen else "(nenhum elemento interativo)"
+    id_map = {el.get("id"): el for _, _, el in chosen}
+    if len(chosen) < len(groups):
+        logger.debug(f"DOM: {len(chosen)}/{len(groups)} rótulos únicos couberam em {budget_tokens} tokens.")
+    return DOMContext(text=text, id_map=id_map, total=len(dom_elements), kept=len(chosen), tokens=used)
@@ -1,55 +1,347 @@
-import json
+import time
+import logging
 
-class DOMObserver:
-    """
-    Injeta um radar JavaScript na página para extrair elementos interativos.
-    """
-    async def observe_page(self, page):
-        js_code = """
-        () => {
-            const elements = [];
-            const interactives = document.querySelectorAll('a, button, input, select, textarea, [role="button"], [role="link"], [tabindex]:not([tabindex="-1"])');
-            let id_counter = 0;
-
-            function getXPath(el) {
-                if (el.id) return `//*[@id="${el.id}"]`;
-                const parts = [];
-                while (el && el.nodeType === Node.ELEMENT_NODE) {
-                    let sibling = el;
-                    let count = 1;
-                    while ((sibling = sibling.previousElementSibling) != null) {
-                        if (sibling.nodeName === el.nodeName) count++;
-                    }
-                    parts.unshift(`${el.nodeName.toLowerCase()}[${count}]`);
-                    el = el.parentNode;
-                }
-                return parts.length ? '/' + parts.join('/') : null;
+from hipnolawrence.config import DOM_OBSERVER_INCREMENTAL, DOM_OBSERVER_ENGINE
+
+logger = logging.getLogger("HipnoLawrence.DOMObserver")
+
+INTERACTIVE_SELECTOR = 'a, button, input, select, textarea, [role="button"], [role="link"], [tabindex]:not([tabindex="-1"])'
+
+# Atributos estáveis preferidos para ancorar o seletor (na ordem), quando o valor é único no documento
+STABLE_ATTRIBUTES = ["id", "data-testid", "data-test", "data-qa", "data-cy", "aria-label", "role", "name"]
+
+# Gerador de seletores: uma única descida na árvore registra segmento (tag[n]) e pai de cada elemento
+# e conta os valores dos atributos estáveis. O caminho de um elemento é montado sob demanda a partir
+# do ancestral mais próximo já memorizado ou com atributo estável único: O(nós) no total, em vez de
+# O(elementos × profundidade × irmãos) do getXPath de baixo para cima.
+SELECTOR_INDEX_JS = r"""
+(root, selector, stableAttrs) => {
+    const info = new Map();     // elemento -> {seg, parent}
+    const counts = new Map();   // "atributo\u0000valor" -> ocorrências
+    const memo = new Map();     // elemento -> caminho já montado
+    const interactives = [];    // elementos interativos na ordem do documento
+    // Valores gerados (ids numéricos, hashes, prefixos de frameworks) mudam a cada carga
+    const volatile = /\d{4,}|^[a-f0-9]{8,}$|^(ember|gwt-uid|react-|mui-|:r)/i;
+    const literal = (v) => !v.includes('"') ? `"${v}"` : (!v.includes("'") ? `'${v}'` : null);
+
+    info.set(root, { seg: `${root.nodeName.toLowerCase()}[1]`, parent: null });
+    const stack = [root];
+    while (stack.length) {
+        const el = stack.pop();
+        if (el.hasAttributes()) {
+            for (const a of stableAttrs) {
+                const v = el.getAttribute(a);
+                if (v) { const k = a + '\u0000' + v; counts.set(k, (counts.get(k) || 0) + 1); }
+            }
+        }
+        if (el.matches(selector)) interactives.push(el);
+        const kids = el.children;
+        const perTag = {};
+        for (let i = 0; i < kids.length; i++) {
+            const tag = kids[i].nodeName.toLowerCase();
+            perTag[tag] = (perTag[tag] || 0) + 1;
+            info.set(kids[i], { seg: `${tag}[${perTag[tag]}]`, parent: el });
+        }
+        for (let i = kids.length - 1; i >= 0; i--) stack.push(kids[i]);  // Pré-ordem = ordem do documento
+    }
+
+    const stableOf = (el) => {
+        if (!el.hasAttributes()) return null;
+        for (const a of stableAttrs) {
+            const v = el.getAttribute(a);
+            if (!v || volatile.test(v) || counts.get(a + '\u0000' + v) !== 1) continue;
+            const q = literal(v);
+            if (q) return `//*[@${a}=${q}]`;
+        }
+        return null;
+    };
+    const pathOf = (el) => {
+        if (!info.has(el)) return null;
+        const chain = [];
+        let base = '';
+        for (let cur = el; cur; cur = info.get(cur).parent) {
+            if (memo.has(cur)) { base = memo.get(cur); break; }
+            const stable = stableOf(cur);
+            if (stable) { memo.set(cur, stable); base = stable; break; }
+            chain.push(cur);
+        }
+        for (let i = chain.length - 1; i >= 0; i--) {
+            base += '/' + info.get(chain[i]).seg;
+            memo.set(chain[i], base);
+        }
+        return base;
+    };
+    return { pathOf, interactives };
+}
+"""
+
+# Varredura completa (modo original e fallback): estilo e retângulo de todos os elementos interativos
+FULL_SCAN_JS = r"""
+([selector, stableAttrs]) => {
+    const buildSelectors = /*SELECTOR_INDEX*/;
+    const elements = [];
+    const selectors = buildSelectors(document.documentElement, selector, stableAttrs);
+    let id_counter = 0;
+
+    for (let el of selectors.interactives) {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        if (rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.opacity !== '0') {
+            let text = (el.innerText || el.value || el.placeholder || el.getAttribute('aria-label') || el.title || '').trim().replace(/\n/g, ' ').substring(0, 60);
+            if (!text && el.tagName !== 'INPUT') continue;
+
+            elements.push({
+                id: id_counter++,
+                tag: el.tagName.toLowerCase(),
+                text: text,
+                x: rect.left + (rect.width / 2),
+                y: rect.top + (rect.height / 2),
+                xpath: selectors.pathOf(el)
+            });
+        }
+    }
+    return elements;
+}
+""".replace("/*SELECTOR_INDEX*/", SELECTOR_INDEX_JS.strip())
+
+# Índice incremental: instalado uma vez por documento (window.__hlDomIndex) e consultado por número de sequência.
+# MutationObserver marca elementos "sujos"; só eles são reavaliados (estilo, texto) na próxima consulta.
+# Após mudanças de estrutura ou de atributos estáveis, os seletores são regerados numa descida só e
+# conferidos contra todos os registros (posição entre irmãos e unicidade de atributos são globais).
+# IntersectionObserver mantém o conjunto na viewport, cujas coordenadas são relidas a cada consulta.
+INCREMENTAL_JS = r"""
+([selector, stableAttrs, epoch, since]) => {
+    const started = performance.now();
+    let idx = window.__hlDomIndex;
+    if (!idx) {
+        const buildSelectors = /*SELECTOR_INDEX*/;
+        const state = {
+            epoch: Math.random().toString(36).slice(2) + Date.now().toString(36),
+            seq: 0, nextKey: 0,
+            keys: new WeakMap(),   // elemento -> chave estável (id exposto ao Python)
+            records: new Map(),    // chave -> {el, rec}
+            dirty: new Set(),      // elementos a reavaliar na próxima consulta
+            removed: [],           // [{key, seq}] ainda não confirmados pelo Python
+            inView: new Set(),     // chaves perto da viewport
+            orderDirty: true,
+            selectors: null,       // Gerador de seletores; null = estrutura mudou desde a última geração
+        };
+
+        const getXPath = (el) => {
+            if (!state.selectors) state.selectors = buildSelectors(document.documentElement, selector, stableAttrs);
+            return state.selectors.pathOf(el);
+        };
+        const keyOf = (el) => {
+            let k = state.keys.get(el);
+            if (k === undefined) { k = state.nextKey++; state.keys.set(el, k); }
+            return k;
+        };
+        const markSubtree = (node) => {
+            if (!node || node.nodeType !== Node.ELEMENT_NODE) return;
+            if (node.matches(selector)) state.dirty.add(node);
+            for (const el of node.querySelectorAll(selector)) state.dirty.add(el);
+        };
+        const setPoint = (entry, rect) => {
+            const x = rect.left + rect.width / 2 + window.scrollX;
+            const y = rect.top + rect.height / 2 + window.scrollY;
+            if (Math.abs(x - entry.rec.dx) > 1 || Math.abs(y - entry.rec.dy) > 1) {
+                entry.rec.dx = x; entry.rec.dy = y; entry.rec.seq = ++state.seq;
             }
+        };
+        const io = new IntersectionObserver((entries) => {
+            for (const e of entries) {
+                const k = state.keys.get(e.target);
+                const entry = state.records.get(k);
+                if (!entry) continue;
+                if (e.isIntersecting) state.inView.add(k); else state.inView.delete(k);
+                setPoint(entry, e.boundingClientRect);
+            }
+        }, { rootMargin: '200px' });
+        const drop = (el) => {
+            const k = state.keys.get(el);
+            if (k === undefined || !state.records.has(k)) return;
+            state.records.delete(k);
+            state.inView.delete(k);
+            io.unobserve(el);
+            state.removed.push({ key: k, seq: ++state.seq });
+            state.orderDirty = true;
+        };
+        const evaluate = (el) => {
+            if (!el.isConnected || !el.matches(selector)) return drop(el);
+            const rect = el.getBoundingClientRect();
+            const style = window.getComputedStyle(el);
+            if (!(rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.opacity !== '0')) return drop(el);
+            const text = (el.innerText || el.value || el.placeholder || el.getAttribute('aria-label') || el.title || '').trim().replace(/\n/g, ' ').substring(0, 60);
+            if (!text && el.tagName !== 'INPUT') return drop(el);
 
-            for (let el of interactives) {
-                const rect = el.getBoundingClientRect();
-                const style = window.getComputedStyle(el);
-                if (rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.opacity !== '0') {
-                    let text = (el.innerText || el.value || el.placeholder || el.getAttribute('aria-label') || el.title || '').trim().replace(/\\n/g, ' ').substring(0, 60);
-                    if (!text && el.tagName !== 'INPUT') continue;
-
-                    elements.push({
-                        id: id_counter++,
-                        tag: el.tagName.toLowerCase(),
-                        text: text,
-                        x: rect.left + (rect.width / 2),
-                        y: rect.top + (rect.height / 2),
-                        xpath: getXPath(el)
-                    });
+            const k = keyOf(el);
+            let entry = state.records.get(k);
+            const rec = {
+                id: k, tag: el.tagName.toLowerCase(), text: text, xpath: getXPath(el),
+                dx: rect.left + rect.width / 2 + window.scrollX, dy: rect.top + rect.height / 2 + window.scrollY,
+            };
+            if (entry && entry.rec.text === rec.text && entry.rec.xpath === rec.xpath && entry.rec.tag === rec.tag) {
+                setPoint(entry, rect);
+                return;
+            }
+            rec.seq = ++state.seq;
+            if (!entry) {
+                entry = { el: el, rec: rec };
+                state.records.set(k, entry);
+                state.orderDirty = true;
+                io.observe(el);
+            }
+            entry.rec = rec;
+        };
+        const handle = (mutations) => {
+            for (const m of mutations) {
+                if (m.type === 'childList') {
+                    for (const n of m.addedNodes) markSubtree(n);
+                    for (const n of m.removedNodes) markSubtree(n);  // Desconectados: saem do índice
+                    state.orderDirty = true;
+                    state.selectors = null;
+                } else if (m.type === 'attributes' && stableAttrs.includes(m.attributeName)) {
+                    state.selectors = null;
+                }
+                const target = m.target.nodeType === Node.ELEMENT_NODE ? m.target : m.target.parentElement;
+                if (!target) continue;
+                if (m.type === 'attributes' && (m.attributeName === 'class' || m.attributeName === 'style' || m.attributeName === 'hidden')) {
+                    markSubtree(target);  // Visibilidade dos descendentes pode ter mudado
+                } else {
+                    const owner = target.closest(selector);  // Texto/atributo de um elemento interativo
+                    if (owner) state.dirty.add(owner);
                 }
             }
-            return elements;
+        };
+        const mo = new MutationObserver(handle);
+        mo.observe(document.documentElement, {
+            childList: true, subtree: true, characterData: true, attributes: true,
+            attributeFilter: [...new Set(['class', 'style', 'hidden', 'value', 'placeholder', 'title', 'tabindex', 'disabled', ...stableAttrs])],
+        });
+        window.addEventListener('resize', () => { for (const { el } of state.records.values()) state.dirty.add(el); });
+        markSubtree(document.documentElement);
+
+        idx = window.__hlDomIndex = {
+            state: state,
+            pull: (since) => {
+                handle(mo.takeRecords());
+                const regenerate = !state.selectors;
+                for (const el of state.dirty) evaluate(el);
+                state.dirty.clear();
+                if (regenerate) {
+                    // Seletores de elementos não tocados também podem ter mudado (irmãos, unicidade)
+                    for (const entry of state.records.values()) {
+                        const xpath = getXPath(entry.el);
+                        if (xpath !== entry.rec.xpath) { entry.rec.xpath = xpath; entry.rec.seq = ++state.seq; }
+                    }
+                }
+                // Deslocamentos de layout sem mutação nos próprios elementos: relê só o que está na viewport
+                for (const k of state.inView) {
+                    const entry = state.records.get(k);
+                    if (entry) setPoint(entry, entry.el.getBoundingClientRect());
+                }
+                const upserts = [];
+                for (const { rec } of state.records.values()) if (rec.seq > since) upserts.push(rec);
+                const removed = state.removed.filter(r => r.seq > since).map(r => r.key);
+                state.removed = state.removed.filter(r => r.seq > since);  // O Python já tem até "since"
+                let order = null;
+                if (state.orderDirty) {
+                    order = [];
+                    for (const el of document.querySelectorAll(selector)) {
+                        const k = state.keys.get(el);
+                        if (k !== undefined && state.records.has(k)) order.push(k);
+                    }
+                    state.orderDirty = false;
+                }
+                return { upserts, removed, order };
+            },
+        };
+    }
+    const full = epoch !== idx.state.epoch;
+    const out = idx.pull(full ? 0 : since);
+    if (full && out.order === null) {
+        out.order = [];
+        for (const el of document.querySelectorAll(selector)) {
+            const k = idx.state.keys.get(el);
+            if (k !== undefined && idx.state.records.has(k)) out.order.push(k);
         }
-        """
+    }
+    return {
+        ...out, full: full, epoch: idx.state.epoch, seq: idx.state.seq,
+        scrollX: window.scrollX, scrollY: window.scrollY, ms: performance.now() - started,
+    };
+}
+""".replace("/*SELECTOR_INDEX*/", SELECTOR_INDEX_JS.strip())
+
+
+class DOMObserver:
+    """
+    Injeta um radar JavaScript na página para extrair elementos interativos.
+    Modo incremental (padrão): o índice vive na página e o Python só recebe o que mudou
+    desde a última sequência. observe_page(page, full=True) força a varredura completa,
+    que também é usada se o modo incremental falhar.
+    """
+
+    def __init__(self, incremental=DOM_OBSERVER_INCREMENTAL):
+        self.incremental = incremental
+        self.last_stats = None
+        self.reset()
+
+    def reset(self):
+        """Descarta o espelho local do índice (a próxima consulta incremental vem completa)."""
+        self._epoch = None
+        self._seq = 0
+        self._records = {}
+        self._order = []
+
+    async def observe_page(self, page, full=False):
+        if not page: return []
+        if self.incremental and not full:
+            try:
+                return await self._observe_incremental(page)
+            except Exception as e:
+                logger.warning(f"DOM Observer incremental falhou, usando varredura completa: {e}")
+                self.reset()
+        return await self._full_scan(page)
+
+    async def _full_scan(self, page):
+        started = time.perf_counter()
         try:
-            if not page: return []
-            elements = await page.evaluate(js_code)
-            return elements
+            elements = await page.evaluate(FULL_SCAN_JS, [INTERACTIVE_SELECTOR, STABLE_ATTRIBUTES])
         except Exception as e:
-            print(f"Erro no DOM Observer: {e}")
+            logger.error(f"Erro no DOM Observer: {e}")
             return []
+        self.last_stats = {"mode": "full", "elements": len(elements), "ms": (time.perf_counter() - started) * 1000}
+        return elements
+
+    async def _observe_incremental(self, page):
+        started = time.perf_counter()
+        delta = await page.evaluate(INCREMENTAL_JS, [INTERACTIVE_SELECTOR, STABLE_ATTRIBUTES, self._epoch, self._seq])
+        if delta["full"]:
+            # Índice novo (navegação, recarga) ou primeira consulta: espelho recomeça do zero
+            self.reset()
+            self._epoch = delta["epoch"]
+        for key in delta["removed"]:
+            self._records.pop(key, None)
+        for rec in delta["upserts"]:
+            self._records[rec["id"]] = rec
+        if delta["order"] is not None:
+            self._order = delta["order"]
+        self._seq = delta["seq"]
+
+        sx, sy = delta["scrollX"], delta["scrollY"]
+        elements = [{"id": r["id"], "tag": r["tag"], "text": r["text"],
+                     "x": r["dx"] - sx, "y": r["dy"] - sy, "xpath": r["xpath"]}
+                    for r in (self._records.get(k) for k in self._order) if r]
+        self.last_stats = {"mode": "incremental", "elements": len(elements), "full": delta["full"],
+                           "changed": len(delta["upserts"]), "removed": len(delta["removed"]),
+                           "page_ms": delta["ms"], "ms": (time.perf_counter() - started) * 1000}
+        return elements
+
+
+def create_dom_observer(engine=DOM_OBSERVER_ENGINE):
+    """Observador configurado: "ax" (árvore de acessibilidade) ou "js". Ambos retornam o mesmo esquema."""
+    if engine == "ax":
+        from hipnolawrence.core.ax_observer import AXTreeObserver
+        return AXTreeObserver()
+    return DOMObserver()
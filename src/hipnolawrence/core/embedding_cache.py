@@ -0,0 +1,99 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger("HipnoLawrence.EmbeddingCache")
+
+def normalize_text(text):
+    """Normalização usada como identidade de conteúdo: NFC + espaços colapsados + strip."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+def content_hash(text):
+    """Digest de 64 bits do texto normalizado (chave de deduplicação da biblioteca)."""
+    digest = hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class EmbeddingCache:
+    """
+    Cache Persistente de Embeddings (Endereçado por Conteúdo).
+    Chave = (modelo, hash do texto normalizado). Evicção LRU ao atingir a capacidade.
+    Persistido em data/embedding_cache/<modelo>.npz (chaves + matriz float32).
+    A gravação reescreve o arquivo inteiro: maybe_save só grava após flush_every inserções
+    (custo amortizado), e o restante vai para o disco no save do atexit.
+    """
+
+    def __init__(self, cache_dir, model, capacity=50_000, flush_every=2_000):
+        self.model = model
+        self.capacity = capacity
+        self.flush_every = flush_every
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        self.path = os.path.join(cache_dir, f"{safe_name}.npz")
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._pending = 0  # Inserções ainda não gravadas
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def key(self, text):
+        return hashlib.sha1(f"{self.model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _load(self):
+        if not os.path.exists(self.path): return
+        try:
+            with np.load(self.path) as data:
+                for k, vec in zip(data["keys"], data["vectors"]):
+                    self._entries[str(k)] = vec
+        except Exception as e:
+            logger.warning(f"Cache de embeddings ilegível ({e}). Recomeçando vazio.")
+            self._entries = OrderedDict()
+
+    def save(self):
+        """Grava o cache em disco (só quando houve inserções desde a última gravação)."""
+        with self._lock:
+            if not self._dirty or not self._entries: return
+            keys = np.array(list(self._entries.keys()))
+            vectors = np.stack(list(self._entries.values()))
+            self._dirty = False
+            self._pending = 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, keys=keys, vectors=vectors)
+        os.replace(tmp, self.path)
+
+    def maybe_save(self):
+        """Grava só quando as inserções pendentes atingem flush_every."""
+        if self._pending >= self.flush_every: self.save()
+
+    def get(self, text):
+        """Retorna o vetor (lista de floats) ou None. Atualiza a ordem LRU."""
+        k = self.key(text)
+        with self._lock:
+            vec = self._entries.get(k)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(k)
+            self.hits += 1
+            return vec.tolist()
+
+    def put(self, text, vec):
+        if not vec: return
+        k = self.key(text)
+        with self._lock:
+            self._entries[k] = np.asarray(vec, dtype=np.float32)
+            self._entries.move_to_end(k)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            self._pending += 1
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,40 @@
+import asyncio
+import logging
+from typing import List
+
+from hipnolawrence.config import OLLAMA_HOST, OLLAMA_KEEP_ALIVE
+from hipnolawrence.core.ollama_transport import get_transport
+
+logger = logging.getLogger("HipnoLawrence.EmbeddingClient")
+
+class AsyncEmbeddingClient:
+    """
+    Cliente Assíncrono de Embeddings (Ollama /api/embed).
+    Usa o transporte compartilhado do processo (pool keep-alive, fila por modelo),
+    com timeout próprio e suporte a cancelamento (asyncio.CancelledError é propagado).
+    Um transporte passado em transport passa a ser do cliente e é fechado em aclose;
+    o compartilhado nunca (OllamaClient e a residência de modelos continuam usando o pool).
+    """
+
+    def __init__(self, model="nomic-embed-text", host=OLLAMA_HOST, timeout=30.0, transport=None):
+        self.model = model
+        self.timeout = timeout
+        self._owns_transport = transport is not None
+        self.transport = transport or get_transport(host)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings de vários textos numa requisição. Em erro (exceto cancelamento), [] por texto."""
+        if not texts: return []
+        try:
+            result = await self.transport.embed({"model": self.model, "input": list(texts), "keep_alive": OLLAMA_KEEP_ALIVE}, timeout=self.timeout)
+            vectors = result.get("embeddings", [])
+            if len(vectors) == len(texts): return vectors
+            logger.warning(f"Ollama retornou {len(vectors)} embeddings para {len(texts)} textos.")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro no embedding assíncrono: {e}")
+        return [[] for _ in texts]
+
+    async def aclose(self):
+        if self._owns_transport: await self.transport.aclose()
@@ -0,0 +1,201 @@
+import os
+import re
+import json
+import asyncio
+import logging
+import unicodedata
+from typing import Dict, Any, Optional, List
+import numpy as np
+
+from hipnolawrence.config import INTENT_THRESHOLD, INTENT_MARGIN, INTENT_MAX_LEARNED
+from hipnolawrence.core.embedding_cache import content_hash
+from hipnolawrence.core.vector_index import VectorIndex
+
+logger = logging.getLogger("HipnoLawrence.IntentRouter")
+
+# Frases-protótipo por ferramenta (sementes; exemplos confirmados são acrescentados em data/intent_prototypes.json)
+SEED_PROTOTYPES = {
+    "google_ads_visual": [
+        "Faça um diagnóstico completo desta tela do Google Ads.",
+        "Analise o custo e conversões desta tela.",
+        "Extraia os dados das campanhas do Google Ads",
+        "Como estão minhas campanhas no Ads?",
+        "Mostre o desempenho das campanhas ativas e o orçamento",
+        "Audite o painel do Google Ads",
+    ],
+    "doctoralia_ranking": [
+        "Veja o ranking de cardiologista em São Paulo na Doctoralia",
+        "Quem aparece primeiro para psicólogo em Curitiba?",
+        "Busque os concorrentes de hipnoterapeuta em Belo Horizonte",
+        "Ranking da Doctoralia para psiquiatra no Rio de Janeiro",
+        "Liste os médicos melhor posicionados de dermatologista em Campinas",
+    ],
+    "doctoralia_serp": [
+        "Pesquise no Google os perfis da Doctoralia de hipnose clínica",
+        "Busca indireta no Google por psicólogo Doctoralia",
+        "Procure pelo Google quem aparece na Doctoralia para ansiedade",
+    ],
+    "spreadsheet_sync": [
+        "Sincronize os dados da Planilha NeuroStrategy",
+        "Atualize a matriz do banco de dados com a planilha",
+        "Puxe os dados do Google Sheets",
+    ],
+}
+
+SPECIALTIES = [
+    "hipnoterapeuta", "psicologo", "psiquiatra", "psicanalista", "neurologista", "cardiologista",
+    "dermatologista", "ginecologista", "pediatra", "ortopedista", "endocrinologista", "nutricionista",
+    "oftalmologista", "urologista", "fisioterapeuta", "clinico geral", "gastroenterologista",
+]
+
+# Cidade canônica (como a Doctoralia espera no parâmetro loc) <- variações aceitas no comando
+CITIES = {
+    "sao paulo": ["sao paulo", "sp", "sampa"], "rio de janeiro": ["rio de janeiro", "rio", "rj"],
+    "belo horizonte": ["belo horizonte", "bh"], "brasilia": ["brasilia", "df"], "curitiba": ["curitiba"],
+    "porto alegre": ["porto alegre", "poa"], "salvador": ["salvador"], "recife": ["recife"],
+    "fortaleza": ["fortaleza"], "goiania": ["goiania"], "campinas": ["campinas"], "florianopolis": ["florianopolis", "floripa"],
+    "manaus": ["manaus"], "belem": ["belem"], "vitoria": ["vitoria"], "santos": ["santos"], "natal": ["natal"],
+}
+
+# Argumentos obrigatórios para o atalho; sem eles a decisão volta para o LLM
+REQUIRED_ARGS = {"doctoralia_ranking": ("specialty", "city"), "doctoralia_serp": ("query",), "doctoralia_profile": ("url",)}
+
+# Comandos de vários passos (ex.: macros da GUI "navegue para <url> e extraia...") precisam do plano
+# do LLM mesmo quando citam especialidade e cidade: navegação, URL fora de perfil ou verbos encadeados
+MULTI_STEP = re.compile(r"\bnavegu?e\b|\bnavegar\b|\babra\b|\bacesse\b|"
+                        r"\b(e|depois|em seguida),? (extraia|verifique|compare|analise|liste|salve|envie)\b")
+
+def _fold(text):
+    folded = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in folded if not unicodedata.combining(c))
+
+def is_multi_step(tool: str, command: str) -> bool:
+    """True se o comando encadeia ações (navegação, URL ou verbos em sequência): fica com o LLM."""
+    folded = _fold(command)
+    if tool != "doctoralia_profile" and re.search(r"https?://", folded): return True
+    return bool(MULTI_STEP.search(folded))
+
+def extract_args(tool: str, command: str) -> Dict[str, Any]:
+    """Extração simples de argumentos (cidade, especialidade, URL, consulta) a partir do comando."""
+    folded = _fold(command)
+    args = {}
+    if tool in ("doctoralia_ranking", "doctoralia_serp"):
+        for specialty in SPECIALTIES:
+            # Aceita plural e feminino simples: psicologo(s)/psicologa(s)
+            if re.search(rf"\b{specialty[:-1]}[oa]s?\b" if specialty.endswith("o") else rf"\b{specialty}s?\b", folded):
+                args["specialty"] = specialty
+                break
+        for city, variants in CITIES.items():
+            if any(re.search(rf"\b{re.escape(v)}\b", folded) for v in variants):
+                args["city"] = city
+                break
+    if tool == "doctoralia_serp":
+        args["query"] = command.strip()
+    if tool == "doctoralia_profile":
+        match = re.search(r"https?://\S+", command)
+        if match: args["url"] = match.group(0)
+    return args
+
+
+class IntentRouter:
+    """
+    Atalho de Intenção por Embeddings (sem LLM).
+    1. Cada ferramenta tem frases-protótipo (sementes + execuções confirmadas).
+    2. O comando é vetorizado e comparado (cosseno) com todos os protótipos.
+    3. Despacha direto quando o melhor score passa de INTENT_THRESHOLD, com folga de
+       INTENT_MARGIN sobre a segunda ferramenta, e os argumentos obrigatórios foram extraídos.
+    4. Comandos de vários passos (macros) nunca usam o atalho.
+    """
+
+    def __init__(self, memory, path=None):
+        self.memory = memory
+        self.path = path or os.path.join(os.getcwd(), "data", "intent_prototypes.json")
+        self.learned = self._load()  # ferramenta -> [frases confirmadas]
+        self.labels: List[str] = []
+        self.matrix = None
+        self.hits = 0
+        self.misses = 0
+        self.last: Optional[Dict[str, Any]] = None
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except: pass
+        return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.learned, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def prototypes(self) -> Dict[str, List[str]]:
+        merged = {tool: list(texts) for tool, texts in SEED_PROTOTYPES.items()}
+        for tool, texts in self.learned.items():
+            merged.setdefault(tool, []).extend(texts)
+        return merged
+
+    def _build(self):
+        """Vetoriza os protótipos (embeddings vêm do cache da biblioteca após a primeira vez)."""
+        labels, texts = [], []
+        for tool, utterances in self.prototypes().items():
+            for text in utterances:
+                labels.append(tool)
+                texts.append(text)
+        vectors = self.memory.get_embeddings(texts)
+        keep = [i for i, v in enumerate(vectors) if len(v)]
+        if not keep:
+            logger.warning("Protótipos de intenção sem embedding (Ollama indisponível?).")
+            return
+        dims = {len(vectors[i]) for i in keep}
+        if len(dims) > 1: return
+        self.labels = [labels[i] for i in keep]
+        self.matrix = VectorIndex.normalize(np.asarray([vectors[i] for i in keep], dtype=np.float32))
+
+    async def classify(self, command: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna {"tool", "args", "score", "margin"} se o atalho é seguro; senão None.
+        self.last guarda o resultado da última classificação (inclusive rejeitada).
+        """
+        if self.matrix is None:
+            await asyncio.to_thread(self._build)
+            if self.matrix is None: return None
+        vec = await self.memory.aget_embedding(command)
+        if not len(vec) or len(vec) != self.matrix.shape[1]:
+            return None
+
+        scores = self.matrix @ VectorIndex.normalize(vec)
+        best = {}
+        for label, score in zip(self.labels, scores):
+            best[label] = max(best.get(label, -1.0), float(score))
+        ranked = sorted(best.items(), key=lambda x: x[1], reverse=True)
+        tool, score = ranked[0]
+        margin = score - (ranked[1][1] if len(ranked) > 1 else -1.0)
+        args = extract_args(tool, command)
+        missing = [a for a in REQUIRED_ARGS.get(tool, ()) if not args.get(a)]
+        multi_step = is_multi_step(tool, command)
+
+        self.last = {"tool": tool, "args": args, "score": score, "margin": margin, "missing": missing, "multi_step": multi_step}
+        if score < INTENT_THRESHOLD or margin < INTENT_MARGIN or missing or multi_step:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(f"🎯 Intenção direta: [{tool}] score {score:.2f} (folga {margin:.2f}) args {args}")
+        return self.last
+
+    def learn(self, command: str, tool: str):
+        """Acrescenta um comando cuja execução foi confirmada como protótipo da ferramenta."""
+        if tool not in SEED_PROTOTYPES and tool not in self.learned: return
+        if is_multi_step(tool, command): return  # Macro não vira protótipo de ferramenta única
+        key = content_hash(_fold(command))
+        known = {content_hash(_fold(t)) for t in self.prototypes().get(tool, [])}
+        if key in known: return
+        texts = self.learned.setdefault(tool, [])
+        texts.append(command.strip())
+        del texts[:-INTENT_MAX_LEARNED]  # Mantém só os mais recentes
+        self._save()
+        self.matrix = None  # Reconstruído (com embeddings em cache) na próxima classificação
+        logger.info(f"Protótipo aprendido para [{tool}]: {command.strip()[:60]}")
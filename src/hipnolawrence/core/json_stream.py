@@ -0,0 +1,89 @@
+import json
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger("HipnoLawrence.JSONStream")
+
+_WS = " \t\r\n"
+
+class IncrementalJSONObject:
+    """
+    Parser Incremental de um objeto JSON (saída do LLM em streaming).
+
+    Recebe o texto em pedaços (feed) e, a cada campo de primeiro nível cujo valor
+    terminou, decodifica só aquele valor e o expõe em `fields`. Permite agir sobre
+    "tool"/"args" sem esperar o restante da geração. Texto antes do primeiro "{"
+    (modelo "falador") é ignorado.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.closed = False     # Objeto de primeiro nível terminou ("}")
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._key = None        # Chave de primeiro nível cujo valor está sendo lido
+        self._expect_key = False
+        self._value_start = None
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """Acrescenta texto e retorna os campos completos até agora."""
+        self.text += chunk
+        text = self.text
+        while self._pos < len(text) and not self.closed:
+            ch = text[self._pos]
+            i = self._pos
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape: self._escape = False
+                elif ch == "\\": self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = json.loads(text[self._string_start:i + 1])
+                        self._expect_key = False
+                    elif self._depth == 1 and self._value_start is not None:
+                        self._finish(i + 1)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._depth == 1 and self._key is not None and self._value_start is None:
+                    self._value_start = i
+            elif ch in "{[":
+                if self._depth == 0:
+                    if ch == "{": self._expect_key = True
+                elif self._depth == 1 and self._key is not None and self._value_start is None:
+                    self._value_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    self._finish(i + 1)
+                elif self._depth == 0:
+                    if self._value_start is not None: self._finish(i)  # Literal/número antes do "}"
+                    self.closed = True
+            elif self._depth == 1:
+                if ch == ",":
+                    if self._value_start is not None: self._finish(i)
+                    self._expect_key = True
+                elif ch not in _WS and ch != ":" and self._key is not None and self._value_start is None:
+                    self._value_start = i  # Número, true/false/null
+        return self.fields
+
+    def _finish(self, end):
+        raw = self.text[self._value_start:end].strip()
+        try:
+            self.fields[self._key] = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.debug(f"Valor parcial inválido para '{self._key}': {raw[:80]}")
+        self._key = None
+        self._value_start = None
+
+    def has(self, *keys) -> bool:
+        return all(k in self.fields for k in keys)
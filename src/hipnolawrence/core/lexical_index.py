@@ -0,0 +1,110 @@
+import os
+import re
+import math
+import heapq
+import pickle
+import logging
+import unicodedata
+from collections import Counter, defaultdict
+
+logger = logging.getLogger("HipnoLawrence.LexicalIndex")
+
+# Palavras vazias (PT-BR) que só diluem o BM25
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "de", "do", "da", "dos", "das", "em", "no", "na", "nos", "nas",
+    "e", "ou", "que", "para", "por", "com", "sem", "se", "ao", "aos", "à", "às", "é", "foi", "ser",
+    "sua", "seu", "suas", "seus", "me", "meu", "minha", "esta", "este", "essa", "esse", "isso", "desta",
+    "deste", "dessa", "desse", "tela", "the", "of", "and", "to", "in",
+}
+
+def tokenize(text):
+    """Minúsculas, sem acentos; preserva números com separadores (ex.: 12,50 / 3.2 / R$)."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return [t for t in re.findall(r"\w+(?:[.,/-]\w+)*", folded) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Índice Invertido Léxico (BM25 Okapi), atualizado incrementalmente a cada inserção.
+    Complementa o índice vetorial em comandos que citam campanha, palavra-chave ou valores exatos.
+    Persistido com o layout de segmentos coberto (save/load): no boot só as linhas acrescentadas
+    depois da gravação são tokenizadas.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # termo -> {linha: tf}
+        self.doc_len = {}
+        self.total_len = 0
+        self.deleted = set()
+        self.covered = 0     # Próxima linha global ainda não indexada
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.doc_len) - len(self.deleted)
+
+    def add(self, row, text):
+        terms = Counter(tokenize(text))
+        for term, tf in terms.items():
+            self.postings[term][row] = tf
+        length = sum(terms.values())
+        self.doc_len[row] = length
+        self.total_len += length
+        self.covered = max(self.covered, row + 1)
+        self.dirty = True
+
+    def remove(self, rows):
+        for row in rows:
+            if row in self.doc_len and row not in self.deleted:
+                self.deleted.add(row)
+                self.total_len -= self.doc_len[row]
+                self.dirty = True
+
+    def save(self, path, layout):
+        """Grava o índice (pickle) marcado com o layout de segmentos que ele cobre."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        state = {"layout": list(layout), "k1": self.k1, "b": self.b, "postings": dict(self.postings),
+                 "doc_len": self.doc_len, "total_len": self.total_len, "deleted": self.deleted, "covered": self.covered}
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path, layout):
+        """Índice salvo, ou None se não existe, está ilegível ou o layout não é prefixo do atual (compactação)."""
+        if not os.path.exists(path): return None
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            if list(layout)[:len(state["layout"])] != state["layout"]: return None
+            index = cls(k1=state["k1"], b=state["b"])
+            index.postings = defaultdict(dict, state["postings"])
+            index.doc_len = state["doc_len"]
+            index.total_len = state["total_len"]
+            index.deleted = state["deleted"]
+            index.covered = state["covered"]
+            return index
+        except Exception as e:
+            logger.warning(f"Índice BM25 ilegível ({e}). Reconstruindo.")
+            return None
+
+    def search(self, query, k=200):
+        """Retorna [(linha, score_bm25)] decrescente; [] se nenhum termo da consulta é conhecido."""
+        n = len(self)
+        if not n: return []
+        avg_len = self.total_len / n if n else 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting: continue
+            df = len(posting)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for row, tf in posting.items():
+                if row in self.deleted: continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[row] / avg_len)
+                scores[row] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda x: x[1])
@@ -0,0 +1,543 @@
+import os
+import json
+import bisect
+import logging
+import threading
+import numpy as np
+
+from hipnolawrence.core.vector_index import VectorIndex, STORAGE_DTYPES, quantize
+
+logger = logging.getLogger("HipnoLawrence.LibraryStore")
+
+class _Segment:
+    """
+    Um segmento append-only da biblioteca:
+    - <nome>.meta.jsonl : uma linha JSON compacta por fato (id, texto, fonte...).
+    - <nome>.vec        : embeddings float32 normalizados, linha a linha.
+    - <nome>.float16 | <nome>.int8 (+ .int8s): códigos compactos para busca (opcional).
+    - <nome>.key        : chave de conteúdo (uint64) de cada linha, para deduplicação.
+    - <nome>.off        : offset (uint64) de cada linha no .meta.jsonl. Gravado por último = commit.
+    """
+
+    def __init__(self, root, name, dim, storage="float32"):
+        self.name = name
+        self.dim = dim
+        self.storage = storage
+        self.meta_path = os.path.join(root, f"{name}.meta.jsonl")
+        self.vec_path = os.path.join(root, f"{name}.vec")
+        self.code_path = os.path.join(root, f"{name}.{storage}") if storage != "float32" else None
+        self.scale_path = os.path.join(root, f"{name}.int8s") if storage == "int8" else None
+        self.key_path = os.path.join(root, f"{name}.key")
+        self.off_path = os.path.join(root, f"{name}.off")
+        self.rows = 0
+        self.offsets = None
+        self.vectors = None
+        self.codes = None
+        self.scales = None
+        self.keys = None
+
+    @property
+    def row_bytes(self):
+        return self.dim * 4
+
+    @property
+    def code_bytes(self):
+        return self.dim * np.dtype(STORAGE_DTYPES[self.storage]).itemsize
+
+    def paths(self):
+        """Na ordem de escrita de um append: o .off (commit) é sempre o último."""
+        sidecars = [p for p in (self.code_path, self.scale_path) if p]
+        return [self.meta_path, self.vec_path] + sidecars + [self.key_path, self.off_path]
+
+    def recover(self, key_fn=None):
+        """Descarta escritas parciais (queda no meio de um append) e retorna o nº de linhas válidas."""
+        if key_fn and not os.path.exists(self.key_path) and os.path.exists(self.off_path):
+            self._backfill_keys(key_fn)
+        if self.code_path and not os.path.exists(self.code_path) and os.path.exists(self.vec_path):
+            self._backfill_codes()
+        for path in self.paths():
+            if not os.path.exists(path): open(path, "ab").close()
+        off_rows = os.path.getsize(self.off_path) // 8
+        vec_rows = os.path.getsize(self.vec_path) // self.row_bytes if self.dim else 0
+        key_rows = os.path.getsize(self.key_path) // 8
+        self.rows = min(off_rows, vec_rows, key_rows)
+        if self.code_path:
+            self.rows = min(self.rows, os.path.getsize(self.code_path) // self.code_bytes)
+        if self.scale_path:
+            self.rows = min(self.rows, os.path.getsize(self.scale_path) // 4)
+
+        with open(self.off_path, "r+b") as f: f.truncate(self.rows * 8)
+        with open(self.key_path, "r+b") as f: f.truncate(self.rows * 8)
+        with open(self.vec_path, "r+b") as f: f.truncate(self.rows * self.row_bytes)
+        if self.code_path:
+            with open(self.code_path, "r+b") as f: f.truncate(self.rows * self.code_bytes)
+        if self.scale_path:
+            with open(self.scale_path, "r+b") as f: f.truncate(self.rows * 4)
+        meta_end = 0
+        if self.rows:
+            last = int(np.fromfile(self.off_path, dtype=np.uint64, count=1, offset=(self.rows - 1) * 8)[0])
+            with open(self.meta_path, "rb") as f:
+                f.seek(last)
+                f.readline()
+                meta_end = f.tell()
+        with open(self.meta_path, "r+b") as f: f.truncate(meta_end)
+        return self.rows
+
+    def _backfill_keys(self, key_fn):
+        """Segmentos gravados antes da deduplicação: gera o .key a partir do log de metadados."""
+        keys = []
+        with open(self.meta_path, "rb") as f:
+            for line in f:
+                try: keys.append(key_fn(json.loads(line)))
+                except json.JSONDecodeError: break
+        np.asarray(keys, dtype=np.uint64).tofile(self.key_path)
+
+    def _backfill_codes(self, chunk=65_536):
+        """Formato compacto ativado depois: gera os códigos a partir do .vec (uma passada em fatias)."""
+        rows = os.path.getsize(self.vec_path) // self.row_bytes
+        vectors = np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else []
+        with open(self.code_path, "wb") as code_f, open(self.scale_path or os.devnull, "wb") as scale_f:
+            for start in range(0, rows, chunk):
+                codes, scales = quantize(vectors[start:start + chunk], self.storage)
+                code_f.write(codes.tobytes())
+                if scales is not None: scale_f.write(scales.tobytes())
+        del vectors
+
+    def map(self):
+        """Mapeia vetores, códigos e offsets em memória (sem leitura completa do arquivo)."""
+        if not self.rows:
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self.codes = np.zeros((0, self.dim), dtype=STORAGE_DTYPES[self.storage])
+            self.scales = np.zeros(0, dtype=np.float32) if self.scale_path else None
+            self.offsets = np.zeros(0, dtype=np.uint64)
+            self.keys = np.zeros(0, dtype=np.uint64)
+            return
+        self.vectors = np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+        self.codes = self.vectors
+        if self.code_path:
+            self.codes = np.memmap(self.code_path, dtype=STORAGE_DTYPES[self.storage], mode="r", shape=(self.rows, self.dim))
+        if self.scale_path:
+            self.scales = np.memmap(self.scale_path, dtype=np.float32, mode="r", shape=(self.rows,))
+        self.offsets = np.memmap(self.off_path, dtype=np.uint64, mode="r", shape=(self.rows,))
+        self.keys = np.memmap(self.key_path, dtype=np.uint64, mode="r", shape=(self.rows,))
+
+    def load(self):
+        """Segmento ativo: só offsets e chaves ficam em RAM (limitado a segment_rows linhas)."""
+        self.vectors = None
+        self.offsets = [int(o) for o in np.fromfile(self.off_path, dtype=np.uint64, count=self.rows)]
+        self.keys = [int(k) for k in np.fromfile(self.key_path, dtype=np.uint64, count=self.rows)]
+
+    def read_vectors(self):
+        return np.fromfile(self.vec_path, dtype=np.float32, count=self.rows * self.dim).reshape(self.rows, self.dim)
+
+    def release(self):
+        self.vectors = None
+        self.codes = None
+        self.scales = None
+        self.offsets = None
+        self.keys = None
+
+    def read(self, local_row):
+        with open(self.meta_path, "rb") as f:
+            f.seek(int(self.offsets[local_row]))
+            return json.loads(f.readline())
+
+
+class LibraryStore:
+    """
+    Motor de Armazenamento da Biblioteca (Segmentos Append-Only).
+
+    Cada inserção custa O(fato): uma linha no log de metadados, uma linha binária de
+    embedding e um offset. Segmentos cheios são selados e, no boot, apenas mapeados em
+    memória (np.memmap), de modo que abrir uma biblioteca grande é quase instantâneo.
+    Remoções viram tombstones; a compactação em segundo plano reescreve os segmentos
+    selados sem as linhas removidas.
+    """
+
+    MANIFEST = "manifest.json"
+    TOMBSTONES = "tombstones.jsonl"
+
+    def __init__(self, root, segment_rows=50_000, on_compacted=None, key_fn=None, storage="float32"):
+        self.root = root
+        self.storage = storage
+        self.segment_rows = segment_rows
+        self.on_compacted = on_compacted
+        self.key_fn = key_fn or (lambda record: 0)
+        self.lock = threading.RLock()
+        self.dim = None
+        self.sealed = []
+        self.active = None
+        self.deleted = set()
+        self._next_segment = 1
+        self._starts = []
+        self._handles = None
+        self._key_rows = None
+        self._compaction_thread = None
+        self._compaction_lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._open()
+
+    # --- CICLO DE VIDA ---
+    def _open(self):
+        manifest_path = os.path.join(self.root, self.MANIFEST)
+        manifest = {"version": 1, "dim": None, "segments": [], "next_segment": 1}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest.update(json.load(f))
+
+        self.dim = manifest["dim"]
+        self._next_segment = manifest["next_segment"]
+        names = manifest["segments"]
+        if self.dim:
+            for name in names[:-1]:
+                seg = _Segment(self.root, name, self.dim, self.storage)
+                seg.recover(self.key_fn)
+                seg.map()
+                self.sealed.append(seg)
+            if names:
+                self.active = _Segment(self.root, names[-1], self.dim, self.storage)
+                self.active.recover(self.key_fn)
+                self.active.load()
+        self._reindex_starts()
+        self._load_tombstones()
+        self._collect_garbage(names)
+
+    def _write_manifest(self):
+        names = [s.name for s in self.sealed] + ([self.active.name] if self.active else [])
+        manifest = {"version": 1, "dim": self.dim, "segments": names, "next_segment": self._next_segment}
+        path = os.path.join(self.root, self.MANIFEST)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
+
+    def _collect_garbage(self, live_names):
+        """Remove arquivos de segmentos órfãos (ex.: compactação cujo delete falhou no Windows)."""
+        live = set(live_names)
+        wanted = {"meta", "vec", "key", "off", self.storage, "int8s" if self.storage == "int8" else None}
+        for fname in os.listdir(self.root):
+            if not fname.startswith("seg-"): continue
+            name, ext = fname.split(".", 1)
+            # Segmentos órfãos ou códigos de um formato compacto que não está mais em uso
+            if name not in live or ext.split(".")[0] not in wanted:
+                try: os.remove(os.path.join(self.root, fname))
+                except OSError: pass
+
+    def _reindex_starts(self):
+        self._starts = []
+        total = 0
+        for seg in self.segments():
+            self._starts.append(total)
+            total += seg.rows
+
+    def segments(self):
+        return self.sealed + ([self.active] if self.active else [])
+
+    def close(self):
+        with self.lock:
+            if self._handles:
+                for h in self._handles: h.close()
+                self._handles = None
+
+    def __len__(self):
+        return sum(s.rows for s in self.segments())
+
+    @property
+    def live_count(self):
+        return len(self) - len(self.deleted)
+
+    # --- ESCRITA ---
+    def _new_active(self):
+        name = f"seg-{self._next_segment:06d}"
+        self._next_segment += 1
+        self.active = _Segment(self.root, name, self.dim, self.storage)
+        self.active.recover()
+        self.active.load()
+        self._write_manifest()
+        self._reindex_starts()
+
+    def _seal_active(self):
+        self.close()
+        self.active.map()
+        self.sealed.append(self.active)
+        self.active = None
+        self._new_active()
+
+    def _open_handles(self):
+        if not self._handles:
+            self._handles = [open(p, "ab") for p in self.active.paths()]
+        return self._handles
+
+    def append(self, records, vectors):
+        """
+        Acrescenta fatos ao segmento ativo numa única escrita sequencial.
+        records: lista de dicts (id, text, source, ...). vectors: matriz/listas de embeddings.
+        Retorna as linhas globais atribuídas.
+        """
+        if not records: return []
+        block = VectorIndex.normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        if len(block) != len(records):
+            raise ValueError("Quantidade de registros e vetores diverge.")
+
+        with self.lock:
+            if self.dim is None:
+                self.dim = block.shape[1]
+            if self.active is None:
+                self._new_active()
+            if block.shape[1] != self.dim:
+                raise ValueError(f"Dimensão incompatível: esperado {self.dim}, recebido {block.shape[1]}.")
+
+            rows = []
+            pos = 0
+            while pos < len(records):
+                if self.active.rows >= self.segment_rows:
+                    self._seal_active()
+                take = min(len(records) - pos, self.segment_rows - self.active.rows)
+                rows.extend(self._append_to_active(records[pos:pos + take], block[pos:pos + take]))
+                pos += take
+            return rows
+
+    def _append_to_active(self, records, block):
+        meta_f, vec_f, *sidecar_f, key_f, off_f = self._open_handles()
+        seg = self.active
+        offset = meta_f.tell()
+        lines, offsets = [], []
+        for rec in records:
+            line = (json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+            offsets.append(offset)
+            offset += len(line)
+            lines.append(line)
+
+        keys = [self.key_fn(rec) for rec in records]
+
+        # Ordem importa: metadados -> vetores -> códigos -> chaves -> offsets (o offset é o "commit" da linha)
+        meta_f.write(b"".join(lines)); meta_f.flush()
+        vec_f.write(block.tobytes()); vec_f.flush()
+        if sidecar_f:
+            codes, scales = quantize(block, self.storage)
+            sidecar_f[0].write(codes.tobytes()); sidecar_f[0].flush()
+            if scales is not None: sidecar_f[1].write(scales.tobytes()); sidecar_f[1].flush()
+        key_f.write(np.asarray(keys, dtype=np.uint64).tobytes()); key_f.flush()
+        off_f.write(np.asarray(offsets, dtype=np.uint64).tobytes()); off_f.flush()
+
+        seg.offsets.extend(offsets)
+        seg.keys.extend(keys)
+        first = self._starts[-1] + seg.rows
+        if self._key_rows is not None:
+            for i, k in enumerate(keys): self._key_rows[k] = first + i
+        seg.rows += len(records)
+        return list(range(first, first + len(records)))
+
+    # --- LEITURA ---
+    def _locate(self, row):
+        i = bisect.bisect_right(self._starts, row) - 1
+        segs = self.segments()
+        if i < 0 or row - self._starts[i] >= segs[i].rows:
+            raise IndexError(row)
+        return segs[i], row - self._starts[i]
+
+    def get(self, row):
+        with self.lock:
+            seg, local = self._locate(row)
+            return seg.read(local)
+
+    def iter_records(self, first=0):
+        """Percorre sequencialmente os fatos vivos a partir da linha global first: (linha_global, registro)."""
+        with self.lock:
+            segs = [(start, seg.meta_path, seg.rows, int(seg.offsets[max(first - start, 0)]))
+                    for start, seg in zip(self._starts, self.segments()) if start + seg.rows > first]
+            deleted = set(self.deleted)
+        for start, meta_path, rows, offset in segs:
+            with open(meta_path, "rb") as f:
+                f.seek(offset)
+                for local in range(max(first - start, 0), rows):
+                    line = f.readline()
+                    if start + local not in deleted:
+                        yield start + local, json.loads(line)
+
+    def find(self, key):
+        """Linha global viva com a chave de conteúdo informada (ou None)."""
+        with self.lock:
+            if self._key_rows is None:
+                # Construído sob demanda: o boot continua sem varrer a biblioteca
+                self._key_rows = {}
+                for start, seg in zip(self._starts, self.segments()):
+                    for i, k in enumerate(np.asarray(seg.keys, dtype=np.uint64).tolist()):
+                        if start + i not in self.deleted: self._key_rows[k] = start + i
+            return self._key_rows.get(key)
+
+    def blocks(self):
+        """Blocos (códigos, escalas) dos segmentos selados, mapeados em memória, na ordem das linhas."""
+        with self.lock:
+            return [(seg.codes, seg.scales) for seg in self.sealed]
+
+    def active_vectors(self):
+        """Vetores float32 do segmento ativo (limitado a segment_rows linhas)."""
+        with self.lock:
+            if not self.active: return np.zeros((0, self.dim or 0), dtype=np.float32)
+            return self.active.read_vectors()
+
+    def vectors(self, rows):
+        """Vetores float32 exatos das linhas globais informadas (reordenação de candidatos)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        with self.lock:
+            for start, seg in zip(self._starts, self.segments()):
+                mask = (rows >= start) & (rows < start + seg.rows)
+                if not mask.any(): continue
+                source = seg.vectors
+                if source is None:  # Segmento ativo: mapeia sob demanda (o arquivo cresce)
+                    source = np.memmap(seg.vec_path, dtype=np.float32, mode="r", shape=(seg.rows, self.dim))
+                out[mask] = source[rows[mask] - start]
+        return out
+
+    # --- REMOÇÃO & COMPACTAÇÃO ---
+    def _load_tombstones(self):
+        path = os.path.join(self.root, self.TOMBSTONES)
+        self.deleted = set()
+        if not os.path.exists(path): return
+        starts = {seg.name: (start, seg.rows) for start, seg in zip(self._starts, self.segments())}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try: t = json.loads(line)
+                except json.JSONDecodeError: continue
+                if t.get("seg") in starts and t["row"] < starts[t["seg"]][1]:
+                    self.deleted.add(starts[t["seg"]][0] + t["row"])
+
+    def delete(self, rows):
+        """Registra tombstones para as linhas globais informadas."""
+        with self.lock:
+            fresh = [r for r in rows if r not in self.deleted and 0 <= r < len(self)]
+            if not fresh: return []
+            lines = []
+            for r in fresh:
+                seg, local = self._locate(r)
+                lines.append(json.dumps({"seg": seg.name, "row": local}) + "\n")
+                if self._key_rows is not None and self._key_rows.get(int(seg.keys[local])) == r:
+                    del self._key_rows[int(seg.keys[local])]
+            with open(os.path.join(self.root, self.TOMBSTONES), "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+            self.deleted.update(fresh)
+            return fresh
+
+    def needs_compaction(self, ratio=0.2):
+        sealed_rows = sum(s.rows for s in self.sealed)
+        if not sealed_rows: return False
+        sealed_deleted = sum(1 for r in self.deleted if r < sealed_rows)
+        return sealed_deleted / sealed_rows >= ratio
+
+    def compact_async(self):
+        """Dispara a compactação em thread daemon (no máximo uma por vez)."""
+        with self.lock:
+            if self._compaction_thread and self._compaction_thread.is_alive(): return
+            self._compaction_thread = threading.Thread(target=self.compact, daemon=True)
+            self._compaction_thread.start()
+
+    def compact(self):
+        """
+        Reescreve os segmentos selados num único segmento sem tombstones.
+        A cópia acontece fora do lock; apenas a troca do manifesto é atômica.
+        """
+        with self._compaction_lock:
+            self._compact()
+
+    def _compact(self):
+        with self.lock:
+            sources = list(self.sealed)
+            if not sources: return
+            sealed_rows = sum(s.rows for s in sources)
+            snapshot_deleted = {r for r in self.deleted if r < sealed_rows}
+            name = f"seg-{self._next_segment:06d}"
+            self._next_segment += 1
+
+        logger.info(f"Compactando {len(sources)} segmento(s) ({len(snapshot_deleted)} tombstones)...")
+        merged = _Segment(self.root, name, self.dim, self.storage)
+        mapping = {}
+        with open(merged.meta_path, "wb") as meta_f, open(merged.vec_path, "wb") as vec_f, \
+                open(merged.code_path or os.devnull, "wb") as code_f, open(merged.scale_path or os.devnull, "wb") as scale_f, \
+                open(merged.key_path, "wb") as key_f, open(merged.off_path, "wb") as off_f:
+            start = 0
+            new_row = 0
+            for seg in sources:
+                keep = [i for i in range(seg.rows) if start + i not in snapshot_deleted]
+                with open(seg.meta_path, "rb") as src:
+                    lines = src.readlines()
+                offsets = []
+                for i in keep:
+                    offsets.append(meta_f.tell())
+                    meta_f.write(lines[i])
+                    mapping[start + i] = new_row
+                    new_row += 1
+                if keep:
+                    vec_f.write(np.ascontiguousarray(seg.vectors[keep]).tobytes())
+                    if merged.code_path: code_f.write(np.ascontiguousarray(seg.codes[keep]).tobytes())
+                    if merged.scale_path: scale_f.write(np.ascontiguousarray(seg.scales[keep]).tobytes())
+                    key_f.write(np.ascontiguousarray(seg.keys[keep]).tobytes())
+                    off_f.write(np.asarray(offsets, dtype=np.uint64).tobytes())
+                start += seg.rows
+        merged.rows = new_row
+
+        with self.lock:
+            # Tombstones que chegaram durante a cópia são remapeados para o novo segmento
+            late = {mapping[r] for r in self.deleted if r < sealed_rows and r not in snapshot_deleted and r in mapping}
+            shift = sealed_rows - merged.rows
+            active_deleted = {r - shift for r in self.deleted if r >= sealed_rows}
+
+            merged.map()
+            # Segmentos selados durante a cópia permanecem após o compactado
+            self.sealed = ([merged] if merged.rows else []) + self.sealed[len(sources):]
+            old_paths = [p for seg in sources for p in seg.paths()]
+            for seg in sources: seg.release()
+            self._write_manifest()
+            self._reindex_starts()
+            self.deleted = late | active_deleted
+            self._key_rows = None
+            self._rewrite_tombstones()
+            for path in old_paths:
+                try: os.remove(path)
+                except OSError: pass  # Removido no próximo boot (_collect_garbage)
+            logger.info(f"Compactação concluída: {sealed_rows} -> {merged.rows} linhas seladas.")
+            if self.on_compacted: self.on_compacted()
+
+    def _rewrite_tombstones(self):
+        path = os.path.join(self.root, self.TOMBSTONES)
+        lines = []
+        for r in sorted(self.deleted):
+            seg, local = self._locate(r)
+            lines.append(json.dumps({"seg": seg.name, "row": local}) + "\n")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("".join(lines))
+        os.replace(tmp, path)
+
+    # --- MIGRAÇÃO ---
+    def migrate_from_json(self, json_path):
+        """
+        Migração única do formato antigo (library_db.json com embeddings inline).
+        O arquivo original é renomeado para .migrated após o sucesso.
+        """
+        if not os.path.exists(json_path) or len(self): return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                collection = json.load(f)
+        except Exception as e:
+            logger.error(f"Falha ao ler {json_path} para migração: {e}")
+            return 0
+
+        entries = [d for d in collection if d.get("embedding")]
+        if entries:
+            dim = len(entries[-1]["embedding"])
+            # O JSON legado acumulou duplicatas a cada sincronização: mantém só a primeira
+            seen = set()
+            unique = []
+            for d in entries:
+                k = self.key_fn(d)
+                if len(d["embedding"]) == dim and k not in seen:
+                    seen.add(k)
+                    unique.append(d)
+            entries = unique
+            records = [{k: v for k, v in d.items() if k != "embedding"} for d in entries]
+            self.append(records, [d["embedding"] for d in entries])
+        os.replace(json_path, json_path + ".migrated")
+        logger.info(f"Migrados {len(entries)} fatos de {json_path} para o formato segmentado.")
+        return len(entries)
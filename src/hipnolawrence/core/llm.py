@@ -1,10 +1,72 @@
 import logging
 import json
-import httpx
+import hashlib
 from typing import Dict, Any, Optional
 
+from hipnolawrence.config import OLLAMA_HOST, OLLAMA_TIMEOUT, OLLAMA_KEEP_ALIVE
+from hipnolawrence.core.ollama_transport import get_transport
+
 logger = logging.getLogger("HipnoLawrence.LLM")
 
+class PromptSession:
+    """
+    Sessão de Prefixo Estável (reuso do prefill entre turnos).
+
+    O Ollama reaproveita o KV-cache do modelo carregado quando o início do prompt é
+    idêntico ao da chamada anterior. A sessão mantém o prefixo estático (identidade,
+    ferramentas, regras) byte a byte igual no campo "system", manda só a parte
+    variável em "prompt" e fixa keep_alive para o modelo não ser descarregado.
+    Cada resposta é contabilizada: tokens de prompt avaliados vs. reaproveitados.
+    """
+
+    def __init__(self, system: str = "", keep_alive=OLLAMA_KEEP_ALIVE):
+        self.keep_alive = keep_alive
+        self.system = ""
+        self.prefix_id = None
+        self.calls = 0
+        self.evaluated_total = 0
+        self.reused_total = 0
+        self.last: Optional[Dict[str, Any]] = None
+        self.set_system(system)
+
+    def set_system(self, system: str):
+        """Troca o prefixo estático. Se mudou, a próxima chamada paga o prefill completo."""
+        prefix_id = hashlib.blake2b(system.encode("utf-8"), digest_size=8).hexdigest()
+        if self.prefix_id is not None and prefix_id != self.prefix_id:
+            logger.info("Prefixo estático alterado: próxima inferência sem reuso de contexto.")
+        self.system = system
+        self.prefix_id = prefix_id
+
+    def payload(self, model: str, prompt: str, **extra) -> Dict[str, Any]:
+        return {"model": model, "system": self.system, "prompt": prompt, "keep_alive": self.keep_alive, **extra}
+
+    def record(self, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Contabiliza a resposta final do Ollama (a que traz prompt_eval_count).
+        total = len(context) - eval_count (tokens do prompt); reused = total - avaliados.
+        Sem "context" na resposta, reused fica None.
+        """
+        if "prompt_eval_count" not in result and "context" not in result:
+            return None
+        evaluated = int(result.get("prompt_eval_count") or 0)
+        context = result.get("context")
+        total = len(context) - int(result.get("eval_count") or 0) if context else None
+        reused = max(total - evaluated, 0) if total is not None else None
+        self.calls += 1
+        self.evaluated_total += evaluated
+        self.reused_total += reused or 0
+        self.last = {"evaluated": evaluated, "reused": reused, "prompt_tokens": total,
+                     "prompt_eval_ms": int(result.get("prompt_eval_duration") or 0) / 1e6}
+        logger.info(f"Prompt: {evaluated} tokens avaliados, {reused} reaproveitados "
+                    f"({self.last['prompt_eval_ms']:.0f} ms de prefill).")
+        return self.last
+
+    def stats(self) -> Dict[str, Any]:
+        seen = self.evaluated_total + self.reused_total
+        return {"calls": self.calls, "evaluated": self.evaluated_total, "reused": self.reused_total,
+                "reuse_ratio": self.reused_total / seen if seen else 0.0, "last": self.last}
+
+
 class OllamaClient:
     """
     Cliente para comunicação com modelos locais via Ollama.
@@ -13,16 +75,20 @@ class OllamaClient:
     2. Formatação estrita de saída JSON (Action Output).
     """
 
-    def __init__(self, model: str = "llama3.2", base_url: str = "http://localhost:11434"):
+    def __init__(self, model: str = "llama3.2", base_url: str = OLLAMA_HOST):
         self.model = model
-        self.base_url = f"{base_url}/api/generate"
-        self.timeout = 180.0  # Tempo limite para inferência
+        self.transport = get_transport(base_url)  # Pool HTTP compartilhado do processo
+        self.timeout = OLLAMA_TIMEOUT  # Tempo limite para inferência
+        self.session = PromptSession()  # Prefixo estável entre chamadas (reuso do prefill)
 
-    async def decide_action(self, user_context: str, available_tools: Dict[str, str]) -> Dict[str, Any]:
+    async def decide_action(self, user_context: str, available_tools: Dict[str, str], caller: str = "decision",
+                            model: Optional[str] = None) -> Dict[str, Any]:
         """
         Envia o contexto do usuário e as ferramentas disponíveis para o LLM.
-        Retorna um dicionário com a ação escolhida.
+        Retorna um dicionário com a ação escolhida. caller etiqueta a chamada na telemetria;
+        model sobrepõe o modelo padrão do cliente (ex.: rota de síntese).
         """
+        model = model or self.model
         
         # Prompt de Sistema (System Prompt) - Engenharia de Prompt para Agente
         tools_desc = json.dumps(available_tools, indent=2)
@@ -43,32 +109,29 @@ class OllamaClient:
         {{"tool": "doctoralia_ranking", "args": {{"specialty": "cardiologista", "city": "sao paulo"}} }}
         """
 
-        payload = {
-            "model": self.model,
-            "prompt": f"USUÁRIO: {user_context}\nAGENTE (JSON):",
-            "system": system_prompt,
-            "stream": False,
-            "format": "json"  # Força modo JSON do Ollama (se suportado pelo modelo)
-        }
+        self.session.set_system(system_prompt)
+        payload = self.session.payload(
+            model,
+            f"USUÁRIO: {user_context}\nAGENTE (JSON):",
+            stream=False,
+            format="json"  # Força modo JSON do Ollama (se suportado pelo modelo)
+        )
 
         try:
-            async with httpx.AsyncClient() as client:
-                logger.debug(f"Enviando prompt para Ollama ({self.model})...")
-                response = await client.post(self.base_url, json=payload, timeout=self.timeout)
-                response.raise_for_status()
-                
-                result = response.json()
-                raw_response = result.get("response", "")
-                
-                logger.debug(f"Resposta bruta do LLM: {raw_response}")
-                
-                # Tenta parsear o JSON retornado
-                try:
-                    return json.loads(raw_response)
-                except json.JSONDecodeError:
-                    # Fallback: Tenta limpar o texto caso o modelo seja "falador"
-                    logger.warning("LLM não retornou JSON puro. Tentando limpar...")
-                    return self._fallback_json_parsing(raw_response)
+            logger.debug(f"Enviando prompt para Ollama ({model})...")
+            result = await self.transport.generate(payload, timeout=self.timeout, caller=caller)
+            self.session.record(result)
+            raw_response = result.get("response", "")
+            
+            logger.debug(f"Resposta bruta do LLM: {raw_response}")
+            
+            # Tenta parsear o JSON retornado
+            try:
+                return json.loads(raw_response)
+            except json.JSONDecodeError:
+                # Fallback: Tenta limpar o texto caso o modelo seja "falador"
+                logger.warning("LLM não retornou JSON puro. Tentando limpar...")
+                return self._fallback_json_parsing(raw_response)
 
         except Exception as e:
             logger.error(f"Erro na conexão com Ollama: {e}")
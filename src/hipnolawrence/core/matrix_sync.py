@@ -0,0 +1,114 @@
+import os
+import json
+import logging
+from typing import Dict, Any
+
+from hipnolawrence.core.embedding_cache import content_hash
+
+logger = logging.getLogger("HipnoLawrence.MatrixSync")
+
+def _details(row):
+    return ", ".join([f"{k}: {v}" for k, v in row.items() if v])
+
+def _config_fact(row):
+    # Filtra apenas campos com valores para não poluir o prompt
+    active_data = {k: v for k, v in row.items() if v and v != '--'}
+    return f"AUDITORIA COMPLETA CAMPANHA {row.get('Campanha_ID', row.get('Campanha'))}: " + json.dumps(active_data)
+
+# aba -> (fonte na biblioteca, colunas que compõem a chave primária (as presentes na linha), gerador do fato)
+SHEETS = {
+    "performance": ("sheet_perf", ["Campanha_ID", "Campanha", "Data"],
+                    lambda row: f"Performance Mega-Report: {_details(row)}"),
+    "demand": ("sheet_demand", ["Termo", "Palavra-chave", "Keyword", "Campanha"],
+               lambda row: f"Estratégia/Intenção: {_details(row)}"),
+    "competitive": ("sheet_comp", ["Campanha_ID", "Campanha"],
+                    lambda row: f"Concorrência: Na campanha {row.get('Campanha')}, perdemos {row.get('Perda IS (Orçamento)')} de visualizações por falta de verba."),
+    "config": ("mega_matrix_v2", ["Campanha_ID", "Campanha"], _config_fact),
+}
+
+
+class MatrixSync:
+    """
+    Sincronização Incremental da Mega-Matrix -> Biblioteca.
+
+    Cada linha recebe uma impressão digital (aba + chave primária -> hash do fato gerado).
+    Só linhas novas ou alteradas são vetorizadas; versões antigas e linhas removidas
+    viram tombstones no store. O estado fica em data/matrix_sync_state.json.
+    """
+
+    def __init__(self, memory, state_path=None):
+        self.memory = memory
+        self.state_path = state_path or os.path.join(os.getcwd(), "data", "matrix_sync_state.json")
+        self.state = self._load_state()
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except: pass
+        return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.state_path)
+
+    @staticmethod
+    def row_key(sheet, row, key_columns):
+        """Chave estável da linha: colunas de chave presentes; sem elas, o próprio conteúdo."""
+        parts = [f"{c}={row[c]}" for c in key_columns if row.get(c) not in (None, "")]
+        if not parts:
+            parts = [json.dumps(row, sort_keys=True, ensure_ascii=False)]
+        return f"{sheet}|" + "|".join(parts)
+
+    def build_facts(self, matrix) -> Dict[str, Dict[str, Any]]:
+        """Gera {chave_linha: {"text", "source"}} para todas as abas presentes na matriz."""
+        facts = {}
+        for sheet, (source, key_columns, builder) in SHEETS.items():
+            rows = matrix.get(sheet) or []
+            keys = [self.row_key(sheet, row, key_columns) for row in rows]
+            seen = {}
+            for key in keys: seen[key] = seen.get(key, 0) + 1
+            for row, key in zip(rows, keys):
+                # Chave repetida na mesma aba (ex.: mesma campanha em datas sem coluna Data):
+                # desempata pelo conteúdo das demais colunas, não pela posição na planilha,
+                # para que inserir uma linha no meio não renumere as seguintes
+                if seen[key] > 1:
+                    rest = {c: v for c, v in row.items() if c not in key_columns}
+                    key = f"{key}#{content_hash(json.dumps(rest, sort_keys=True, ensure_ascii=False)):016x}"
+                # Linhas idênticas geram o mesmo fato: a ordem entre elas é indiferente
+                base, n = key, 2
+                while key in facts:
+                    key = f"{base}~{n}"
+                    n += 1
+                facts[key] = {"text": builder(row), "source": source}
+        return facts
+
+    def sync(self, matrix) -> Dict[str, int]:
+        """Aplica a matriz à biblioteca. Retorna contagens: added, changed, unchanged, removed, embedded."""
+        facts = self.build_facts(matrix)
+        fingerprints = {key: content_hash(fact["text"]) for key, fact in facts.items()}
+
+        added = [k for k in facts if k not in self.state]
+        changed = [k for k in facts if k in self.state and self.state[k] != fingerprints[k]]
+        removed = [k for k in self.state if k not in facts]
+        unchanged = [k for k in facts if k in self.state and self.state[k] == fingerprints[k]]
+        # Linha inalterada cujo fato sumiu da biblioteca (ex.: base apagada) volta a ser gravada
+        restored = [k for k in unchanged if not self.memory.contains(facts[k]["text"])]
+
+        embedded = self.memory.add_knowledge_batch(facts[k] for k in added + changed + restored)
+
+        # Versões antigas só saem se nenhuma linha atual gerar exatamente o mesmo fato
+        in_use = set(fingerprints.values())
+        stale = {self.state[k] for k in changed + removed} - in_use
+        forgotten = self.memory.forget_hashes(stale)
+
+        self.state = fingerprints
+        self._save_state()
+        report = {"added": len(added), "changed": len(changed), "unchanged": len(unchanged),
+                  "removed": len(removed), "embedded": embedded, "forgotten": forgotten}
+        logger.info(f"Sync incremental da Mega-Matrix: {report}")
+        return report
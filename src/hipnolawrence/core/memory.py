@@ -2,19 +2,61 @@ import os
 import json
 import uuid
 import math
+import time
+import atexit
+import asyncio
+import logging
+import threading
 import ollama
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from hipnolawrence.core.vector_index import VectorIndex
+from hipnolawrence.core.ann_index import IVFIndex
+from hipnolawrence.core.library_store import LibraryStore
+from hipnolawrence.core.embedding_cache import EmbeddingCache, content_hash
+from hipnolawrence.core.telemetry import get_telemetry
+from hipnolawrence.core.chunker import iter_document_chunks
+from hipnolawrence.core.lexical_index import BM25Index
+from hipnolawrence.core.embedding_client import AsyncEmbeddingClient
+from hipnolawrence.config import OLLAMA_KEEP_ALIVE, LIBRARY_INDEX_MODE, LIBRARY_ANN_PARAMS, LIBRARY_RETRIEVAL_MODE, LIBRARY_STORAGE
+
+logger = logging.getLogger("HipnoLawrence.Memory")
 
 class MemoryManager:
     """
     Hipocampo Híbrido v3:
-    1. Memória Vetorial (RAG) nativa via JSON/Cosine (Sem ChromaDB).
+    1. Memória Vetorial (RAG) nativa via Segmentos Append-Only + Índice NumPy (Sem ChromaDB).
     2. Memória Muscular (Fast Path) para automação determinística.
     """
-    def __init__(self):
+    def __init__(self, index_mode=None, ann_params=None, retrieval_mode=None, storage=None, rerank=4):
         # Configuração RAG (Vetores)
-        self.db_path = os.path.join(os.getcwd(), "data", "library_db.json")
+        # index_mode: "exact" (varredura vetorizada) ou "ivf" (aproximado, para bibliotecas enormes); padrão em config
+        # retrieval_mode: "vector" (só cosseno) ou "hybrid" (BM25 pré-filtra, vetor reordena); padrão em config
+        # storage: "float32", "float16" ou "int8" (índice 2x/~4x menor em RAM; reordenação float32 via disco); padrão em config
+        self.index_mode = index_mode or LIBRARY_INDEX_MODE
+        self.storage = storage or LIBRARY_STORAGE
+        self.rerank = rerank
+        self.ann_params = ann_params if ann_params is not None else dict(LIBRARY_ANN_PARAMS)
+        self.ann = None
+        self.retrieval_mode = retrieval_mode or LIBRARY_RETRIEVAL_MODE
+        self.lexical = None
+        self._lexical_thread = None
+        self._lexical_guard = threading.Lock()
+        self.lexical_pool = 200
+        self.lexical_weight = 0.3
+        self.db_path = os.path.join(os.getcwd(), "data", "library_db.json")  # Formato legado (migrado no boot)
+        self.store_path = os.path.join(os.getcwd(), "data", "library_store")
+        self.lexical_path = os.path.join(self.store_path, "bm25.pkl")
         self.embed_model = "nomic-embed-text"
-        self.collection = []
+        self.host = "http://localhost:11434"
+        self.async_embedder = AsyncEmbeddingClient(model=self.embed_model, host=self.host)
+        self.embed_cache = EmbeddingCache(os.path.join(os.getcwd(), "data", "embedding_cache"), self.embed_model)
+        atexit.register(self.embed_cache.save)
+        atexit.register(lambda: self.ann and self.ann.save())
+        atexit.register(self._save_lexical)
+        self.index = VectorIndex()
+        self.min_score = 0.3
         self._load_db()
 
         # Configuração Fast Path (Cache de Ações - Stagehand)
@@ -24,23 +66,90 @@ class MemoryManager:
 
     # --- MÉTODOS DE RAG (VETORES) ---
     def _load_db(self):
-        if os.path.exists(self.db_path):
-            try:
-                with open(self.db_path, "r", encoding="utf-8") as f:
-                    self.collection = json.load(f)
-            except: self.collection = []
+        self.store = LibraryStore(self.store_path, on_compacted=self._rebuild_index,
+                                  key_fn=lambda record: content_hash(record["text"]), storage=self.storage)
+        self.store.migrate_from_json(self.db_path)
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        """Monta o índice sobre os segmentos (selados via memmap, sem cópia) e aplica tombstones."""
+        with self.store.lock:
+            index = VectorIndex(dim=self.store.dim, storage=self.storage,
+                                exact_source=self.store.vectors, rerank=self.rerank)
+            for codes, scales in self.store.blocks(): index.attach(codes, scales)
+            index.add_batch(self.store.active_vectors())
+            index.remove(self.store.deleted)
+            self.index = index
+            self.ann = None
+            if self.index_mode == "ivf":
+                # Centróides e listas persistidos ao lado dos segmentos (retreino só após compactação)
+                self.ann = IVFIndex(index, path=os.path.join(self.store_path, "ivf.npz"),
+                                    layout=self._layout, lock=self.store.lock, **self.ann_params)
+                if not self.ann.load(): self.ann.add([])
+            self.lexical = None  # Linhas renumeradas (compactação): remontado em segundo plano
+        if self.retrieval_mode == "hybrid": self._start_lexical_build()
+
+    def _layout(self):
+        """Nomes dos segmentos na ordem das linhas (muda só na compactação; índices salvos conferem por prefixo)."""
+        return [seg.name for seg in self.store.segments()]
 
-    def _save_db(self):
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with open(self.db_path, "w", encoding="utf-8") as f:
-            json.dump(self.collection, f, indent=4)
+    def forget(self, rows):
+        """Remove fatos (tombstone) e agenda compactação quando o lixo acumulado justifica."""
+        with self.store.lock:
+            removed = self.store.delete(rows)
+            self.index.remove(removed)
+            if self.lexical is not None: self.lexical.remove(removed)
+        if self.store.needs_compaction():
+            self.store.compact_async()
+
+    def forget_hashes(self, hashes):
+        """Remove os fatos vivos cujas chaves de conteúdo (content_hash) foram informadas."""
+        rows = [r for r in (self.store.find(h) for h in hashes) if r is not None]
+        if rows: self.forget(rows)
+        return len(rows)
+
+    def contains(self, text):
+        """True se o texto (normalizado) já está vivo na biblioteca."""
+        return self.store.find(content_hash(text)) is not None
 
     def get_embedding(self, text):
+        cached = self.embed_cache.get(text)
+        if cached is not None: return cached
         try:
+            started = time.perf_counter()
             response = ollama.embeddings(model=self.embed_model, prompt=text)
+            get_telemetry().record(self.embed_model, "embedding", response, time.perf_counter() - started)
+            self.embed_cache.put(text, response["embedding"])
             return response["embedding"]
         except: return []
 
+    def get_embeddings(self, texts):
+        """Embedding em lote: consulta o cache e envia só os textos inéditos ao Ollama."""
+        vectors = [self.embed_cache.get(t) for t in texts]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = self._embed_batch([texts[i] for i in missing])
+            for i, vec in zip(missing, fresh):
+                vectors[i] = vec
+                self.embed_cache.put(texts[i], vec)
+        return vectors
+
+    def _embed_batch(self, texts):
+        """Embedding em lote (uma requisição multi-input). Em falha, retorna [] para cada texto."""
+        if not texts: return []
+        try:
+            started = time.perf_counter()
+            response = ollama.embed(model=self.embed_model, input=list(texts), keep_alive=OLLAMA_KEEP_ALIVE)
+            get_telemetry().record(self.embed_model, "embedding", response, time.perf_counter() - started)
+            vectors = response["embeddings"]
+            if len(vectors) == len(texts): return vectors
+        except AttributeError:
+            # Cliente ollama antigo (sem /api/embed): cai para uma chamada por texto
+            return [self.get_embedding(t) for t in texts]
+        except Exception as e:
+            print(f"Erro no embedding em lote: {e}")
+        return [[] for _ in texts]
+
     def cosine_similarity(self, vec1, vec2):
         dot = sum(a * b for a, b in zip(vec1, vec2))
         mag1 = math.sqrt(sum(a * a for a in vec1))
@@ -48,13 +157,74 @@ class MemoryManager:
         return dot / (mag1 * mag2) if mag1 * mag2 > 0 else 0
 
     def add_knowledge(self, text, source="maestro_chat"):
-        if not text.strip(): return
-        vec = self.get_embedding(text)
-        if not vec: return
-        self.collection.append({
-            "id": str(uuid.uuid4()), "text": text, "embedding": vec, "source": source
-        })
-        self._save_db()
+        return self.add_knowledge_batch([text], source=source)
+
+    def add_knowledge_batch(self, items, source="maestro_chat", batch_size=32, max_in_flight=4, commit_every=None):
+        """
+        Ingestão em massa: aceita um iterável de textos ou dicts {"text", "source", ...}.
+        Os textos são agrupados em lotes de batch_size, com no máximo max_in_flight requisições
+        de embedding simultâneas, e todo o resultado é gravado no store numa única escrita.
+        commit_every (opcional) grava a cada N fatos, para fluxos longos (documentos enormes).
+        Retorna a quantidade de fatos adicionados.
+        """
+        def batches():
+            batch = []
+            seen = set()
+            for item in items:
+                record = dict(item) if isinstance(item, dict) else {"text": item}
+                if not record.get("text", "").strip(): continue
+                # Deduplicação: textos já presentes (ou repetidos neste lote) não são reembedados
+                key = content_hash(record["text"])
+                if key in seen or self.store.find(key) is not None: continue
+                seen.add(key)
+                record.setdefault("source", source)
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch: yield batch
+
+        records, vectors = [], []
+        added = 0
+
+        def collect(batch, future):
+            nonlocal added
+            for record, vec in zip(batch, future.result()):
+                if not vec: continue
+                records.append({"id": str(uuid.uuid4()), **record})
+                vectors.append(vec)
+            if commit_every and len(records) >= commit_every:
+                added += self._commit(records, vectors)
+                records.clear()
+                vectors.clear()
+
+        # Janela deslizante: consome o iterável sob demanda, preservando a ordem de entrada
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            in_flight = deque()
+            for batch in batches():
+                if len(in_flight) >= max_in_flight:
+                    collect(*in_flight.popleft())
+                in_flight.append((batch, pool.submit(self.get_embeddings, [r["text"] for r in batch])))
+            while in_flight:
+                collect(*in_flight.popleft())
+
+        self.embed_cache.maybe_save()
+        return added + self._commit(records, vectors)
+
+    def _commit(self, records, vectors):
+        """Grava no store e no índice numa única operação. Retorna quantos fatos entraram."""
+        if not records: return 0
+        try:
+            with self.store.lock:
+                rows = self.store.append(records, vectors)
+                self.index.add_batch(vectors)
+                if self.ann: self.ann.add(rows)
+                if self.lexical is not None:
+                    for row, record in zip(rows, records): self.lexical.add(row, record["text"])
+        except ValueError as e:
+            print(f"Erro ao indexar conhecimento: {e}")
+            return 0
+        return len(records)
 
     def add_csv_knowledge(self, file_path: str):
         """Lê CSV e transforma cada linha em um fato para a biblioteca."""
@@ -63,18 +233,107 @@ class MemoryManager:
         try:
             with open(file_path, "r", encoding="utf-8") as f:
                 reader = csv.DictReader(f)
-                for row in reader:
-                    fact = f"Relatório Ads: Em {row.get('Data', 'N/A')}, houve {row.get('Cliques', '0')} cliques."
-                    self.add_knowledge(fact, source=os.path.basename(file_path))
+                facts = (f"Relatório Ads: Em {row.get('Data', 'N/A')}, houve {row.get('Cliques', '0')} cliques." for row in reader)
+                self.add_knowledge_batch(facts, source=os.path.basename(file_path))
         except Exception as e:
             print(f"Erro ao processar CSV: {e}")
 
-    def query_knowledge(self, query_text, n_results=2):
+    def add_document_knowledge(self, file_path: str, max_tokens=200, overlap=40):
+        """Lê PDF/DOCX/MD/TXT em streaming e memoriza trechos sobrepostos (com página e offset)."""
+        chunks = iter_document_chunks(file_path, max_tokens=max_tokens, overlap=overlap)
+        return self.add_knowledge_batch(chunks, commit_every=1024)
+
+    def _start_lexical_build(self):
+        """Dispara a montagem do BM25 em thread daemon (no máximo uma por vez)."""
+        with self._lexical_guard:
+            if self.lexical is not None or (self._lexical_thread and self._lexical_thread.is_alive()): return
+            self._lexical_thread = threading.Thread(target=self._build_lexical, daemon=True)
+            self._lexical_thread.start()
+
+    def _build_lexical(self):
+        """
+        Carrega o BM25 salvo e tokeniza só as linhas gravadas depois dele (tudo, se houve compactação).
+        A leitura dos metadados acontece fora do store.lock: inserções e buscas vetoriais seguem.
+        Sob o lock, só alcança as linhas que chegaram durante a leitura e publica o índice.
+        """
+        try:
+            layout = self._layout()
+            lexical = BM25Index.load(self.lexical_path, layout) or BM25Index()
+            for row, record in self.store.iter_records(lexical.covered):
+                lexical.add(row, record["text"])
+            if lexical.dirty: lexical.save(self.lexical_path, layout)
+            with self.store.lock:
+                if self._layout()[:len(layout)] != layout: return  # Compactado no meio: a próxima busca remonta
+                for row, record in self.store.iter_records(lexical.covered):
+                    lexical.add(row, record["text"])
+                lexical.remove(self.store.deleted)
+                self.lexical = lexical
+            logger.info(f"Índice BM25 pronto: {len(lexical)} fatos.")
+        except Exception as e:
+            logger.warning(f"Falha ao montar o índice BM25: {e}")
+
+    def _save_lexical(self):
+        with self.store.lock:
+            if self.lexical is not None and self.lexical.dirty:
+                self.lexical.save(self.lexical_path, self._layout())
+
+    def _hybrid_search(self, query_text, q_vec, n_results):
+        """
+        Fusão léxico-vetorial: o BM25 seleciona até lexical_pool candidatos e só eles recebem
+        o produto escalar. Score final = cosseno + lexical_weight * BM25 normalizado.
+        O limiar mínimo continua aplicado ao cosseno. Sem candidato útil, ou com o BM25 ainda
+        em montagem, retorna None (cai no vetor).
+        """
+        if self.lexical is None:
+            self._start_lexical_build()
+            return None
+        lexical_hits = self.lexical.search(query_text, k=self.lexical_pool)
+        if not lexical_hits: return None
+        rows = np.fromiter((r for r, _ in lexical_hits), dtype=np.int64, count=len(lexical_hits))
+        bm25 = np.fromiter((s for _, s in lexical_hits), dtype=np.float32, count=len(lexical_hits))
+        # Poucos candidatos: em formato compacto, o cosseno vem direto dos vetores float32 exatos
+        vectors = self.store.vectors(rows) if self.storage != "float32" else self.index.take(rows)
+        cosine = self.index.normalize(vectors) @ self.index.normalize(q_vec)
+        fused = cosine + self.lexical_weight * bm25 / bm25.max()
+        order = np.argsort(fused)[::-1]
+        hits = [(int(rows[i]), float(cosine[i])) for i in order if cosine[i] > self.min_score]
+        return hits[:n_results] or None
+
+    def search_knowledge(self, query_text, n_results=2, mode=None):
+        """Busca na biblioteca: retorna [(texto, score)] acima do limiar mínimo."""
         q_vec = self.get_embedding(query_text)
-        if not q_vec or not self.collection: return []
-        results = [(self.cosine_similarity(q_vec, d["embedding"]), d["text"]) for d in self.collection]
-        results.sort(key=lambda x: x[0], reverse=True)
-        return [text for sim, text in results[:n_results] if sim > 0.3]
+        if not q_vec or not len(self.index): return []
+        return self._search_with_vector(query_text, q_vec, n_results, mode)
+
+    def query_knowledge(self, query_text, n_results=2):
+        return [text for text, score in self.search_knowledge(query_text, n_results)]
+
+    # --- CAMINHO ASSÍNCRONO (NÃO BLOQUEIA O EVENT LOOP DA GUI/PLAYWRIGHT) ---
+    async def aget_embedding(self, text):
+        cached = self.embed_cache.get(text)
+        if cached is not None: return cached
+        vec = (await self.async_embedder.embed([text]))[0]
+        self.embed_cache.put(text, vec)
+        return vec
+
+    def _search_with_vector(self, query_text, q_vec, n_results, mode):
+        with self.store.lock:
+            hits = None
+            if (mode or self.retrieval_mode) == "hybrid":
+                hits = self._hybrid_search(query_text, q_vec, n_results)
+            if hits is None:
+                searcher = self.ann or self.index
+                hits = searcher.search(q_vec, k=n_results, threshold=self.min_score)
+            return [(self.store.get(row)["text"], score) for row, score in hits]
+
+    async def asearch_knowledge(self, query_text, n_results=2, mode=None):
+        """Versão assíncrona de search_knowledge: HTTP no pool keep-alive, varredura numa thread."""
+        q_vec = await self.aget_embedding(query_text)
+        if not q_vec or not len(self.index): return []
+        return await asyncio.to_thread(self._search_with_vector, query_text, q_vec, n_results, mode)
+
+    async def aquery_knowledge(self, query_text, n_results=2):
+        return [text for text, score in await self.asearch_knowledge(query_text, n_results)]
 
     # --- MÉTODOS DE FAST PATH (CACHE DETERMINÍSTICO) ---
     def _load_cache(self):
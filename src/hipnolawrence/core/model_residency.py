@@ -0,0 +1,153 @@
+import time
+import asyncio
+import logging
+import httpx
+from typing import Dict, Any, Optional, Callable
+
+from hipnolawrence.config import (
+    OLLAMA_HOST, OLLAMA_KEEP_ALIVE, RESIDENT_MODELS, RESIDENCY_CHECK_INTERVAL, RESIDENCY_MAX_RELOADS,
+)
+from hipnolawrence.core.ollama_transport import get_transport
+
+logger = logging.getLogger("HipnoLawrence.ModelResidency")
+
+# Estados por modelo
+PENDING, LOADING, READY, EVICTED, MISSING, OFFLINE, GAVE_UP = (
+    "pendente", "carregando", "pronto", "descarregado", "não instalado", "offline", "sem memória")
+
+def _tagged(name):
+    """/api/ps lista "llama3.2:latest"; a configuração usa "llama3.2"."""
+    return name if ":" in name else f"{name}:latest"
+
+
+class ModelResidency:
+    """
+    Residência de Modelos no Ollama.
+    1. Aquece os modelos de RESIDENT_MODELS em paralelo (ex.: enquanto o navegador abre),
+       com keep_alive fixo, para o primeiro comando não pagar a carga a frio.
+    2. Opcionalmente pré-avalia o prefixo estático do prompt (KV-cache pronto no 1º turno).
+    3. Verifica periodicamente /api/ps; modelo despejado é recarregado quando o Ollama está ocioso,
+       até RESIDENCY_MAX_RELOADS vezes seguidas (recargas que não sobrevivem a um intervalo
+       indicam que não há memória para todos).
+    on_status(modelo, estado, detalhe) é chamado a cada mudança de estado.
+    """
+
+    def __init__(self, models=None, host=OLLAMA_HOST, keep_alive=OLLAMA_KEEP_ALIVE,
+                 interval=RESIDENCY_CHECK_INTERVAL, max_reloads=RESIDENCY_MAX_RELOADS,
+                 on_status: Optional[Callable[[str, str, str], None]] = None):
+        self.models = dict(RESIDENT_MODELS if models is None else models)  # modelo -> "generate" | "embed"
+        self.transport = get_transport(host)
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.max_reloads = max_reloads
+        self.on_status = on_status
+        self.status = {m: {"state": PENDING, "load_s": None, "reloads": 0, "detail": ""} for m in self.models}
+        self._task = None
+
+    def _set(self, model, state, detail=""):
+        entry = self.status[model]
+        changed = entry["state"] != state
+        entry["state"], entry["detail"] = state, detail
+        if changed and self.on_status:
+            try: self.on_status(model, state, detail)
+            except Exception as e: logger.warning(f"Falha ao reportar estado de {model}: {e}")
+
+    # --- CARGA ---
+    async def warm(self, model: str) -> bool:
+        """Carrega o modelo (prompt/entrada vazia) com keep_alive. True se ficou pronto."""
+        self._set(model, LOADING)
+        started = time.perf_counter()
+        try:
+            if self.models.get(model) == "embed":
+                await self.transport.embed({"model": model, "input": "", "keep_alive": self.keep_alive}, caller="warmup")
+            else:
+                # Prompt vazio: o Ollama só carrega o modelo, sem gerar
+                await self.transport.generate({"model": model, "prompt": "", "stream": False,
+                                               "keep_alive": self.keep_alive}, caller="warmup")
+        except httpx.HTTPStatusError as e:
+            state = MISSING if e.response.status_code == 404 else OFFLINE
+            detail = f"ollama pull {model}" if state == MISSING else f"HTTP {e.response.status_code}"
+            self._set(model, state, detail)
+            return False
+        except Exception as e:
+            self._set(model, OFFLINE, str(e) or type(e).__name__)
+            return False
+        self.status[model]["load_s"] = time.perf_counter() - started
+        self._set(model, READY, f"{self.status[model]['load_s']:.1f}s")
+        logger.info(f"🔥 {model} residente em {self.status[model]['load_s']:.1f}s (keep_alive {self.keep_alive}).")
+        return True
+
+    async def warm_all(self) -> Dict[str, bool]:
+        results = await asyncio.gather(*(self.warm(m) for m in self.models))
+        return dict(zip(self.models, results))
+
+    async def prefill(self, model: str, system: str):
+        """Avalia o prefixo estático uma vez (1 token gerado) para o 1º comando já reaproveitar o KV-cache."""
+        try:
+            await self.transport.generate({"model": model, "system": system, "prompt": "ok", "stream": False,
+                                           "keep_alive": self.keep_alive, "options": {"num_predict": 1}},
+                                          caller="warmup")
+            logger.info(f"Prefixo estático pré-avaliado em {model}.")
+        except Exception as e:
+            logger.warning(f"Pré-avaliação do prefixo em {model} falhou: {e}")
+
+    # --- SAÚDE ---
+    async def loaded(self) -> Dict[str, Any]:
+        """Modelos carregados segundo o Ollama (/api/ps): nome -> entrada (expires_at, size_vram...)."""
+        data = await self.transport.get("/api/ps", timeout=10.0)
+        return {m.get("name") or m.get("model"): m for m in data.get("models", [])}
+
+    def _idle(self):
+        return all(s["in_flight"] == 0 and s["queued"] == 0 for s in self.transport.stats()["models"].values())
+
+    async def check(self):
+        """Compara o esperado com /api/ps e recarrega o que foi despejado (sem competir com inferências em curso)."""
+        try:
+            loaded = await self.loaded()
+        except Exception as e:
+            for model, entry in self.status.items():
+                if entry["state"] in (READY, EVICTED): self._set(model, OFFLINE, str(e) or type(e).__name__)
+            return
+        for model, entry in self.status.items():
+            if entry["state"] in (MISSING, GAVE_UP, LOADING): continue
+            if _tagged(model) in loaded:
+                if entry["state"] == READY: entry["reloads"] = 0  # Recarga sobreviveu a um intervalo inteiro
+                self._set(model, READY, entry["detail"] if entry["state"] == READY else "")
+                continue
+            if entry["state"] == OFFLINE:
+                if self._idle(): await self.warm(model)  # Ollama voltou? (não conta como despejo)
+                continue
+            if entry["reloads"] >= self.max_reloads:
+                self._set(model, GAVE_UP, f"despejado {entry['reloads']}x")
+                continue
+            self._set(model, EVICTED)
+            if self._idle():
+                entry["reloads"] += 1
+                await self.warm(model)
+
+    async def run(self, interval: Optional[float] = None):
+        """Aquecimento inicial seguido do monitor periódico (roda até ser cancelado)."""
+        await self.warm_all()
+        while True:
+            await asyncio.sleep(interval or self.interval)
+            await self.check()
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try: await self._task
+            except asyncio.CancelledError: pass
+            self._task = None
+
+    def ready(self) -> bool:
+        return all(s["state"] == READY for s in self.status.values())
+
+    def summary(self) -> str:
+        icons = {READY: "🟢", LOADING: "🟡", PENDING: "⚪", EVICTED: "🟠"}
+        return " | ".join(f"{icons.get(s['state'], '🔴')} {m}: {s['state']}" + (f" ({s['detail']})" if s["detail"] else "")
+                          for m, s in self.status.items())
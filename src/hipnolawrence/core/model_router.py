@@ -0,0 +1,111 @@
+import logging
+from collections import defaultdict, deque
+from typing import Dict, Any, Optional, Iterable
+import numpy as np
+
+from hipnolawrence.config import MODEL_ROUTES, DEFAULT_MODEL
+
+logger = logging.getLogger("HipnoLawrence.ModelRouter")
+
+
+class ModelRouter:
+    """
+    Roteador de Modelos em Camadas.
+
+    Cada ponto de chamada (decision, synthesis, vision...) tem uma rota em config.MODEL_ROUTES:
+      model          -> modelo da primeira tentativa (barato para decisões estruturadas)
+      escalate_to    -> modelo maior usado se o JSON vier inválido, a ferramenta não existir
+                        ou a confiança declarada ficar abaixo de min_confidence
+      min_confidence -> limiar do campo "confidence" (0-1) pedido no prompt; None = não exige
+      fallback       -> modelo usado se o principal falhar (ex.: não baixado no Ollama)
+
+    Registra, por ponto de chamada, a taxa de escalonamento e a latência economizada
+    (mediana do modelo maior menos a latência real das chamadas resolvidas no menor).
+    """
+
+    def __init__(self, routes=None, default_model=DEFAULT_MODEL, window=200):
+        self.routes = dict(MODEL_ROUTES if routes is None else routes)
+        self.default_model = default_model
+        self._latency = defaultdict(lambda: deque(maxlen=window))  # (site, modelo) -> latências (s)
+        self._stats = defaultdict(lambda: {"calls": 0, "escalated": 0, "reasons": defaultdict(int),
+                                           "saved_s": 0.0, "pending_s": []})
+
+    def route(self, site: str) -> Dict[str, Any]:
+        return self.routes.get(site, {})
+
+    def model_for(self, site: str) -> str:
+        return self.route(site).get("model", self.default_model)
+
+    def escalation_for(self, site: str) -> Optional[str]:
+        escalate = self.route(site).get("escalate_to")
+        return escalate if escalate and escalate != self.model_for(site) else None
+
+    def fallback_for(self, site: str) -> Optional[str]:
+        fallback = self.route(site).get("fallback", self.default_model)
+        return fallback if fallback != self.model_for(site) else None
+
+    # --- VALIDAÇÃO ---
+    def dispatchable(self, site: str, fields: Dict[str, Any], known_tools: Iterable[str]) -> bool:
+        """Decisão parcial (stream) já pode ser executada? Exige ferramenta válida e confiança suficiente."""
+        if "tool" not in fields or "args" not in fields: return False
+        return self.check(site, fields, known_tools, partial=True) is None
+
+    def check(self, site: str, action: Optional[Dict[str, Any]], known_tools: Iterable[str], partial=False) -> Optional[str]:
+        """Motivo para escalonar (invalid_json, unknown_tool, low_confidence) ou None se a decisão serve."""
+        if not isinstance(action, dict) or not isinstance(action.get("args", {}), dict):
+            return "invalid_json"
+        tool = action.get("tool")
+        if tool != "none" and tool not in set(known_tools):
+            return "unknown_tool"
+        threshold = self.route(site).get("min_confidence")
+        if threshold is not None:
+            confidence = action.get("confidence")
+            if confidence is None:
+                return "low_confidence" if not partial else "pending_confidence"
+            try:
+                if float(confidence) < threshold: return "low_confidence"
+            except (TypeError, ValueError):
+                return "low_confidence"
+        return None
+
+    # --- CONTABILIDADE ---
+    def record(self, site: str, model: str, latency_s: float,
+               escalated_to: Optional[str] = None, escalated_latency_s: float = 0.0, reason: Optional[str] = None):
+        """
+        Registra uma decisão concluída: primeira tentativa (model, latency_s) e, se houve,
+        o escalonamento. Resolvida no modelo menor, economiza a mediana do maior menos a
+        latência real; escalonada, a latência gasta no menor conta como custo.
+        """
+        self._latency[(site, model)].append(latency_s)
+        stats = self._stats[site]
+        stats["calls"] += 1
+        if escalated_to:
+            self._latency[(site, escalated_to)].append(escalated_latency_s)
+            stats["escalated"] += 1
+            stats["reasons"][reason or "?"] += 1
+            stats["saved_s"] -= latency_s
+            logger.info(f"⬆️ [{site}] escalonado de {model} para {escalated_to} ({reason}).")
+            return
+        escalate = self.escalation_for(site)
+        if escalate and model == self.model_for(site):
+            big = self._latency.get((site, escalate))
+            if big: stats["saved_s"] += float(np.median(big)) - latency_s
+            else: stats["pending_s"].append(latency_s)  # Sem referência do modelo maior ainda
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for site, s in self._stats.items():
+            escalate = self.escalation_for(site)
+            big = self._latency.get((site, escalate)) if escalate else None
+            # Chamadas feitas antes de haver referência do modelo maior entram quando ela existir
+            if big and s["pending_s"]:
+                median = float(np.median(big))
+                s["saved_s"] += sum(median - x for x in s["pending_s"])
+                s["pending_s"] = []
+            out[site] = {
+                "model": self.model_for(site), "escalate_to": escalate,
+                "calls": s["calls"], "escalated": s["escalated"],
+                "escalation_rate": s["escalated"] / s["calls"] if s["calls"] else 0.0,
+                "reasons": dict(s["reasons"]), "latency_saved_s": s["saved_s"],
+            }
+        return out
@@ -0,0 +1,199 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+import httpx
+from typing import AsyncIterator, Dict, Any, Optional
+
+from hipnolawrence.core.telemetry import get_telemetry
+from hipnolawrence.config import (
+    OLLAMA_HOST, OLLAMA_TIMEOUT, OLLAMA_CONNECT_TIMEOUT, OLLAMA_MAX_CONNECTIONS,
+    OLLAMA_MODEL_CONCURRENCY, OLLAMA_DEFAULT_CONCURRENCY,
+)
+
+logger = logging.getLogger("HipnoLawrence.OllamaTransport")
+
+class OllamaTransport:
+    """
+    Camada Única de Transporte para o Ollama (processo inteiro).
+    1. Um httpx.AsyncClient com pool keep-alive (por event loop).
+    2. Semáforo por modelo: limita inferências simultâneas e enfileira o excedente.
+    3. Timeouts configuráveis (globais ou por chamada).
+    4. Estatísticas de fila/pool para detectar saturação do servidor local.
+    """
+
+    def __init__(self, host=OLLAMA_HOST, timeout=OLLAMA_TIMEOUT, connect_timeout=OLLAMA_CONNECT_TIMEOUT,
+                 max_connections=OLLAMA_MAX_CONNECTIONS, model_concurrency=None,
+                 default_concurrency=OLLAMA_DEFAULT_CONCURRENCY):
+        self.host = host
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections,
+                                   keepalive_expiry=120.0)
+        self.model_concurrency = dict(OLLAMA_MODEL_CONCURRENCY if model_concurrency is None else model_concurrency)
+        self.default_concurrency = default_concurrency
+        self._client = None
+        self._loop = None
+        self._semaphores = {}
+        self._stats = {}
+
+    # --- INFRA ---
+    def _bind(self):
+        """Cliente e semáforos pertencem a um event loop; recria se o loop mudou (fechando o anterior)."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop or self._client.is_closed:
+            if self._client is not None and not self._client.is_closed:
+                self._retire(self._client, self._loop, loop)
+            self._client = httpx.AsyncClient(
+                base_url=self.host,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=self.limits,
+            )
+            self._loop = loop
+            self._semaphores = {}
+        return self._client
+
+    @staticmethod
+    def _retire(client, old_loop, loop):
+        """
+        Fecha o cliente de um loop anterior sem vazar o pool: no próprio loop, se ainda roda
+        (outra thread); senão, numa tarefa do loop atual (as conexões do loop morto são descartadas).
+        """
+        async def close():
+            try: await client.aclose()
+            except Exception as e: logger.debug(f"Cliente do loop anterior fechado com erro: {e}")
+        if old_loop is not None and old_loop is not loop and old_loop.is_running() and not old_loop.is_closed():
+            asyncio.run_coroutine_threadsafe(close(), old_loop)
+        else:
+            loop.create_task(close())
+
+    def _semaphore(self, model):
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.model_concurrency.get(model, self.default_concurrency))
+        return self._semaphores[model]
+
+    def _model_stats(self, model):
+        if model not in self._stats:
+            self._stats[model] = {"requests": 0, "errors": 0, "queued": 0, "in_flight": 0,
+                                  "wait_total_s": 0.0, "wait_max_s": 0.0, "busy_total_s": 0.0}
+        return self._stats[model]
+
+    async def _enter(self, model):
+        """Aguarda o slot do modelo. Cancelamento durante a espera apenas sai da fila."""
+        stats = self._model_stats(model)
+        semaphore = self._semaphore(model)
+        stats["queued"] += 1
+        enqueued = time.perf_counter()
+        try:
+            await semaphore.acquire()
+        finally:
+            stats["queued"] -= 1
+        waited = time.perf_counter() - enqueued
+        stats["in_flight"] += 1
+        stats["wait_total_s"] += waited
+        stats["wait_max_s"] = max(stats["wait_max_s"], waited)
+        return stats, semaphore, time.perf_counter()
+
+    @staticmethod
+    def _leave(stats, semaphore, started):
+        semaphore.release()
+        stats["in_flight"] -= 1
+        stats["requests"] += 1
+        stats["busy_total_s"] += time.perf_counter() - started
+
+    def _timeout(self, timeout):
+        return {"timeout": httpx.Timeout(timeout, connect=self.connect_timeout)} if timeout else {}
+
+    # --- API ---
+    async def post(self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None,
+                   caller: str = "other") -> Dict[str, Any]:
+        """
+        POST JSON no Ollama respeitando o limite de concorrência do modelo. Levanta em erro HTTP.
+        caller identifica a origem na telemetria (decision, synthesis, vision, embedding...).
+        """
+        client = self._bind()
+        model = payload.get("model", "?")
+        stats, semaphore, started = await self._enter(model)
+        try:
+            response = await client.post(path, json=payload, **self._timeout(timeout))
+            response.raise_for_status()
+            data = response.json()
+            get_telemetry().record(model, caller, data, time.perf_counter() - started)
+            return data
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            self._leave(stats, semaphore, started)
+
+    async def stream(self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None,
+                     caller: str = "other") -> AsyncIterator[Dict[str, Any]]:
+        """
+        POST com "stream": true; produz cada linha NDJSON do Ollama já decodificada.
+        O slot do modelo fica ocupado até o fim do stream. Fechar o gerador cedo
+        (ex.: contextlib.aclosing + break) encerra a conexão e libera o modelo.
+        """
+        client = self._bind()
+        model = payload.get("model", "?")
+        stats, semaphore, started = await self._enter(model)
+        try:
+            async with client.stream("POST", path, json={**payload, "stream": True}, **self._timeout(timeout)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        chunk = json.loads(line)
+                        if chunk.get("done"):
+                            get_telemetry().record(model, caller, chunk, time.perf_counter() - started)
+                        yield chunk
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            self._leave(stats, semaphore, started)
+
+    async def get(self, path: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """GET de consulta (ex.: /api/ps, /api/tags). Não ocupa slot de modelo."""
+        response = await self._bind().get(path, **self._timeout(timeout))
+        response.raise_for_status()
+        return response.json()
+
+    async def generate(self, payload: Dict[str, Any], timeout: Optional[float] = None, caller: str = "generate") -> Dict[str, Any]:
+        return await self.post("/api/generate", payload, timeout=timeout, caller=caller)
+
+    def generate_stream(self, payload: Dict[str, Any], timeout: Optional[float] = None, caller: str = "generate") -> AsyncIterator[Dict[str, Any]]:
+        return self.stream("/api/generate", payload, timeout=timeout, caller=caller)
+
+    async def embed(self, payload: Dict[str, Any], timeout: Optional[float] = None, caller: str = "embedding") -> Dict[str, Any]:
+        return await self.post("/api/embed", payload, timeout=timeout, caller=caller)
+
+    def stats(self) -> Dict[str, Any]:
+        """Fotografia por modelo: fila, em voo, limite, espera média/máxima. saturated = há fila."""
+        snapshot = {}
+        for model, s in self._stats.items():
+            done = max(s["requests"], 1)
+            snapshot[model] = {
+                **s,
+                "limit": self.model_concurrency.get(model, self.default_concurrency),
+                "wait_avg_s": s["wait_total_s"] / done,
+                "busy_avg_s": s["busy_total_s"] / done,
+                "saturated": s["queued"] > 0,
+            }
+        return {"host": self.host, "max_connections": self.limits.max_connections, "models": snapshot}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+def get_transport(host: str = OLLAMA_HOST) -> OllamaTransport:
+    """Transporte compartilhado do processo (um por host)."""
+    with _transports_lock:
+        if host not in _transports:
+            _transports[host] = OllamaTransport(host=host)
+        return _transports[host]
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Any, Optional
+import numpy as np
+
+from hipnolawrence.config import INFERENCE_METRICS_WINDOW, INFERENCE_METRICS_MAX_BYTES
+
+logger = logging.getLogger("HipnoLawrence.Telemetry")
+
+# Fases reportadas pelo Ollama (nanossegundos) -> nome curto em ms
+PHASES = {"load_duration": "load_ms", "prompt_eval_duration": "prompt_ms",
+          "eval_duration": "eval_ms", "total_duration": "total_ms"}
+
+def metrics_path():
+    """Arquivo padrão das métricas, em data/ relativo ao diretório de trabalho (como os demais estados)."""
+    return os.path.join(os.getcwd(), "data", "logs", "inference_metrics.jsonl")
+
+def _field(response, name):
+    """Lê um campo de dict ou dos objetos de resposta do pacote ollama."""
+    if isinstance(response, dict): return response.get(name)
+    return getattr(response, name, None)
+
+
+class InferenceTelemetry:
+    """
+    Telemetria por Chamada de Inferência (Ollama).
+    1. Cada resposta final vira um registro: modelo, chamador (decision, synthesis, vision,
+       embedding), tokens de prompt/geração e duração de carga, prefill e geração.
+       Respostas sem métricas (ex.: ollama.embeddings legado) registram só o tempo de parede.
+    2. Janela móvel por (modelo, chamador) com p50/p95 e tokens/s.
+    3. Persistido em JSONL (data/logs/inference_metrics.jsonl), recarregado na inicialização.
+    """
+
+    def __init__(self, path=None, window=INFERENCE_METRICS_WINDOW, max_bytes=INFERENCE_METRICS_MAX_BYTES):
+        self.path = str(path or metrics_path())
+        self.window = window
+        self.max_bytes = max_bytes
+        self._records = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path): return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        self._records[(rec["model"], rec["caller"])].append(rec)
+                    except (json.JSONDecodeError, KeyError): continue
+        except Exception as e:
+            logger.warning(f"Métricas de inferência não carregadas: {e}")
+
+    def _persist(self, rec):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")  # Rotação simples: um arquivo anterior
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec) + "\n")
+        except Exception as e:
+            logger.warning(f"Falha ao gravar métrica de inferência: {e}")
+
+    def record(self, model: str, caller: str, response, wall_s: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Registra a resposta final do Ollama. Sem métricas, registra só o tempo de parede (ou ignora, sem ele)."""
+        timed_only = _field(response, "total_duration") is None and _field(response, "eval_count") is None
+        if timed_only and wall_s is None: return None
+        rec = {"ts": round(time.time(), 3), "model": model, "caller": caller,
+               "prompt_tokens": int(_field(response, "prompt_eval_count") or 0),
+               "eval_tokens": int(_field(response, "eval_count") or 0)}
+        for src, dst in PHASES.items():
+            rec[dst] = round((_field(response, src) or 0) / 1e6, 2)
+        if wall_s is not None: rec["wall_ms"] = round(wall_s * 1000, 2)
+        if timed_only:
+            rec["total_ms"] = rec["wall_ms"]
+            rec["timed_only"] = True
+        with self._lock:
+            self._records[(model, caller)].append(rec)
+            self._persist(rec)
+        return rec
+
+    @staticmethod
+    def _summarize(records) -> Dict[str, Any]:
+        cols = {k: np.array([r.get(k, 0.0) for r in records], dtype=np.float64)
+                for k in ("load_ms", "prompt_ms", "eval_ms", "total_ms", "prompt_tokens", "eval_tokens")}
+        out = {"calls": len(records)}
+        for k in ("load_ms", "prompt_ms", "eval_ms", "total_ms"):
+            out[f"p50_{k}"] = float(np.percentile(cols[k], 50))
+            out[f"p95_{k}"] = float(np.percentile(cols[k], 95))
+        # tokens/s agregados na janela (soma de tokens / soma de tempo)
+        prompt_s, eval_s = cols["prompt_ms"].sum() / 1000, cols["eval_ms"].sum() / 1000
+        out["prompt_tps"] = float(cols["prompt_tokens"].sum() / prompt_s) if prompt_s else 0.0
+        out["eval_tps"] = float(cols["eval_tokens"].sum() / eval_s) if eval_s else 0.0
+        # Fase dominante pela mediana: carga do modelo, tamanho do prompt ou geração
+        phases = {"load": out["p50_load_ms"], "prompt": out["p50_prompt_ms"], "generation": out["p50_eval_ms"]}
+        out["bottleneck"] = max(phases, key=phases.get) if any(phases.values()) else "n/d"
+        return out
+
+    def summary(self, model: Optional[str] = None, caller: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """{"modelo/chamador": estatísticas da janela}, opcionalmente filtrado."""
+        with self._lock:
+            groups = {k: list(v) for k, v in self._records.items() if v}
+        return {f"{m}/{c}": self._summarize(recs) for (m, c), recs in sorted(groups.items())
+                if (model is None or m == model) and (caller is None or c == caller)}
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+def get_telemetry() -> InferenceTelemetry:
+    """Telemetria compartilhada do processo."""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = InferenceTelemetry()
+        return _telemetry
@@ -4,6 +4,9 @@ from hipnolawrence.core.doctoralia_intelligence import DoctoraliaIntelligence
 from hipnolawrence.core.visual_ads import VisualAdsManager
 from hipnolawrence.core.memory import MemoryManager
 from hipnolawrence.core.spreadsheet import SpreadsheetManager
+from hipnolawrence.core.ads_pipeline import AdsAuditPipeline
+from hipnolawrence.core.vision import VisionManager
+from hipnolawrence.config import MODEL_ROUTES
 
 logger = logging.getLogger("HipnoLawrence.Tools")
 
@@ -18,6 +21,7 @@ class ToolRegistry:
         self._browser_page = browser_page
         self.memory = MemoryManager()
         self.spreadsheet = SpreadsheetManager()
+        self.on_section = None  # Callback (nome, texto) para seções de relatório prontas antes do fim
 
     @property
     def ads(self) -> VisualAdsManager:
@@ -49,10 +53,10 @@ class ToolRegistry:
     # --- Wrappers ---
 
     async def run_ads_visual_extraction(self):
+        """Navegação + screenshot, depois visão (Moondream) em paralelo à leitura da tabela."""
         if not self.ads: return "Erro: Browser não conectado."
-        data = await self.ads.extract_campaigns_data()
-        snapshot = await self.ads.capture_kpi_snapshot()
-        return {"table_data": data, "snapshot_path": snapshot}
+        vision = VisionManager(model=MODEL_ROUTES.get("vision", {}).get("model", "moondream"))
+        return await AdsAuditPipeline(self.ads, vision, on_section=self.on_section).run()
 
     async def run_doctoralia_serp(self, query: str):
         if not self.doctoralia: return "Erro: Browser não conectado."
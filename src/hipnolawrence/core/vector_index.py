@@ -0,0 +1,243 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger("HipnoLawrence.VectorIndex")
+
+# Formatos de armazenamento do índice: bytes por dimensão 4 / 2 / 1 (+ 4 bytes de escala por linha no int8)
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+def quantize(block, storage):
+    """
+    Codifica vetores normalizados no formato compacto. Retorna (códigos, escalas | None).
+    int8: quantização escalar simétrica por linha (escala = max|v| / 127).
+    """
+    if storage == "float32": return np.asarray(block, dtype=np.float32), None
+    if storage == "float16": return np.asarray(block, dtype=np.float16), None
+    if storage != "int8": raise ValueError(f"Formato de armazenamento desconhecido: {storage}")
+    block = np.asarray(block, dtype=np.float32)
+    scales = (np.abs(block).max(axis=1) / 127.0).astype(np.float32) if len(block) else np.zeros(0, dtype=np.float32)
+    safe = np.where(scales > 0, scales, 1.0)
+    codes = np.rint(block / safe[:, None]).astype(np.int8)
+    return codes, scales
+
+def dequantize(codes, scales=None):
+    out = np.asarray(codes, dtype=np.float32)
+    if scales is not None: out = out * np.asarray(scales)[:, None]
+    return out
+
+
+class VectorIndex:
+    """
+    Índice Vetorial Denso (NumPy).
+    1. Matriz contígua, uma linha por fato da biblioteca (float32, float16 ou int8).
+    2. Linhas normalizadas uma única vez na inserção (cosseno = produto escalar).
+    3. Top-k via um único produto matriz-vetor + seleção parcial (argpartition).
+    4. Blocos somente-leitura (segmentos mapeados em memória) antes da cauda mutável.
+    5. Formatos compactos: busca sobre os códigos e, se houver exact_source, reordenação
+       float32 exata dos rerank * k melhores candidatos.
+    """
+
+    def __init__(self, dim=None, initial_capacity=1024, storage="float32", exact_source=None, rerank=4):
+        if storage not in STORAGE_DTYPES:
+            raise ValueError(f"Formato de armazenamento desconhecido: {storage}")
+        self.dim = dim
+        self.storage = storage
+        self.exact_source = exact_source
+        self.rerank = rerank
+        self._capacity = initial_capacity
+        self._blocks = []
+        self._block_rows = 0
+        self._matrix = None
+        self._scales = None
+        self._size = 0
+        self._deleted = np.zeros(0, dtype=bool)
+        self._deleted_count = 0
+
+    def __len__(self):
+        return self._block_rows + self._size
+
+    @property
+    def live_count(self):
+        return len(self) - self._deleted_count
+
+    @property
+    def nbytes(self):
+        """Memória ocupada pelos códigos da cauda (os blocos vivem no page cache via memmap)."""
+        if self._matrix is None: return 0
+        return self._matrix[:self._size].nbytes + (self._scales[:self._size].nbytes if self._scales is not None else 0)
+
+    @staticmethod
+    def normalize(vec):
+        """Converte para float32 e normaliza (L2). Vetor nulo permanece nulo."""
+        arr = np.asarray(vec, dtype=np.float32)
+        norm = np.linalg.norm(arr, axis=-1, keepdims=True)
+        return np.divide(arr, norm, out=np.zeros_like(arr), where=norm > 0)
+
+    def attach(self, block, scales=None):
+        """
+        Anexa um bloco já normalizado/codificado (ex.: np.memmap de um segmento selado) sem cópia.
+        Só é permitido antes de qualquer inserção na cauda, para preservar a numeração das linhas.
+        """
+        if self._size:
+            raise ValueError("Blocos só podem ser anexados antes de inserções na cauda.")
+        if not len(block): return
+        if block.dtype != STORAGE_DTYPES[self.storage]:
+            raise ValueError(f"Bloco em {block.dtype} não corresponde ao armazenamento {self.storage}.")
+        if self.dim is None: self.dim = block.shape[1]
+        if block.shape[1] != self.dim:
+            raise ValueError(f"Dimensão incompatível: esperado {self.dim}, recebido {block.shape[1]}.")
+        self._blocks.append((block, scales))
+        self._block_rows += len(block)
+
+    def _ensure_capacity(self, extra):
+        needed = self._size + extra
+        dtype = STORAGE_DTYPES[self.storage]
+        if self._matrix is None:
+            self._capacity = max(self._capacity, needed)
+            self._matrix = np.zeros((self._capacity, self.dim), dtype=dtype)
+            if self.storage == "int8": self._scales = np.zeros(self._capacity, dtype=np.float32)
+            return
+        if needed <= self._matrix.shape[0]:
+            return
+        # Crescimento geométrico para manter inserção amortizada O(1)
+        new_capacity = max(needed, self._matrix.shape[0] * 2)
+        grown = np.zeros((new_capacity, self.dim), dtype=dtype)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+        if self._scales is not None:
+            scales = np.zeros(new_capacity, dtype=np.float32)
+            scales[:self._size] = self._scales[:self._size]
+            self._scales = scales
+
+    def add(self, vec):
+        """Insere um vetor e retorna o índice da linha."""
+        return self.add_batch([vec])[0]
+
+    def add_batch(self, vectors):
+        """Insere vários vetores de uma vez. Retorna a lista de linhas atribuídas."""
+        block = self.normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        if block.size == 0: return []
+        if self.dim is None: self.dim = block.shape[1]
+        if block.shape[1] != self.dim:
+            raise ValueError(f"Dimensão incompatível: esperado {self.dim}, recebido {block.shape[1]}.")
+
+        codes, scales = quantize(block, self.storage)
+        self._ensure_capacity(len(block))
+        start = self._size
+        self._matrix[start:start + len(block)] = codes
+        if scales is not None: self._scales[start:start + len(block)] = scales
+        self._size += len(block)
+        first = self._block_rows + start
+        return list(range(first, first + len(block)))
+
+    def remove(self, rows):
+        """Marca linhas como removidas (tombstone). Elas deixam de aparecer nas buscas."""
+        rows = [r for r in rows if 0 <= r < len(self)]
+        if not rows: return
+        if len(self._deleted) < len(self):
+            grown = np.zeros(len(self), dtype=bool)
+            grown[:len(self._deleted)] = self._deleted
+            self._deleted = grown
+        fresh = [r for r in rows if not self._deleted[r]]
+        self._deleted[fresh] = True
+        self._deleted_count += len(fresh)
+
+    def is_deleted(self, row):
+        return row < len(self._deleted) and bool(self._deleted[row])
+
+    def _tail(self):
+        """(códigos, escalas) das linhas ocupadas da cauda, sem cópia."""
+        if self._matrix is None:
+            return np.zeros((0, self.dim or 0), dtype=STORAGE_DTYPES[self.storage]), None
+        return self._matrix[:self._size], (self._scales[:self._size] if self._scales is not None else None)
+
+    @property
+    def matrix(self):
+        """Visão float32 das linhas da cauda (sem cópia no modo float32)."""
+        return dequantize(*self._tail())
+
+    def _parts(self):
+        return self._blocks + [self._tail()]
+
+    def vector(self, row):
+        """Retorna a linha normalizada correspondente (float32, decodificada)."""
+        return self.take([row])[0]
+
+    def take(self, rows):
+        """Reúne várias linhas (float32 decodificadas) numa matriz, atravessando os blocos."""
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        start = 0
+        for codes, scales in self._parts():
+            mask = (rows >= start) & (rows < start + len(codes))
+            if mask.any():
+                local = rows[mask] - start
+                out[mask] = dequantize(codes[local], scales[local] if scales is not None else None)
+            start += len(codes)
+        return out
+
+    def deleted_mask(self, rows):
+        """Máscara booleana das linhas removidas dentre as informadas."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not self._deleted_count: return np.zeros(len(rows), dtype=bool)
+        mask = np.zeros(len(rows), dtype=bool)
+        known = rows < len(self._deleted)
+        mask[known] = self._deleted[rows[known]]
+        return mask
+
+    @staticmethod
+    def _score_part(codes, scales, q, chunk=16_384):
+        if codes.dtype == np.float32: return codes @ q
+        # Códigos compactos: decodifica em fatias para não materializar a matriz float32 inteira
+        out = np.empty(len(codes), dtype=np.float32)
+        for s in range(0, len(codes), chunk):
+            part = codes[s:s + chunk].astype(np.float32) @ q
+            if scales is not None: part *= scales[s:s + chunk]
+            out[s:s + chunk] = part
+        return out
+
+    def scores(self, query_vec):
+        """Similaridade (cosseno) da consulta contra todas as linhas, com removidas em -inf."""
+        q = self.normalize(query_vec)
+        parts = [self._score_part(codes, scales, q) for codes, scales in self._parts()]
+        scores = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        if self._deleted_count:
+            scores[:len(self._deleted)][self._deleted] = -np.inf
+        return scores
+
+    @staticmethod
+    def _top(scores, k):
+        k = min(k, len(scores))
+        top = np.argpartition(scores, -k)[-k:] if k < len(scores) else np.arange(len(scores))
+        return top[np.argsort(scores[top])[::-1]]
+
+    def select(self, scores, query_vec, k, rows=None):
+        """
+        Top-k a partir de scores sobre os códigos: [(linha, score)]. rows mapeia posição -> linha
+        (candidatos do IVF); None = todas as linhas. Em formato compacto com exact_source, os
+        rerank * k melhores candidatos recebem o cosseno float32 exato antes do corte final.
+        """
+        row_of = (lambda p: p) if rows is None else np.asarray(rows, dtype=np.int64).__getitem__
+        if self.storage != "float32" and self.exact_source and self.rerank:
+            candidates = self._top(scores, k * self.rerank)
+            candidates = row_of(candidates[scores[candidates] != -np.inf])
+            if not len(candidates): return []
+            exact = self.normalize(self.exact_source(candidates)) @ self.normalize(query_vec)
+            return [(int(candidates[i]), float(exact[i])) for i in self._top(exact, k)]
+        return [(int(row_of(i)), float(scores[i])) for i in self._top(scores, k) if scores[i] != -np.inf]
+
+    def search(self, query_vec, k=2, threshold=None):
+        """
+        Retorna [(linha, score)] ordenado por similaridade decrescente.
+        Se threshold for informado, descarta scores <= threshold.
+        """
+        total = len(self)
+        if not total or k <= 0: return []
+        if np.shape(query_vec)[-1] != self.dim:
+            logger.warning(f"Consulta com dimensão {np.shape(query_vec)[-1]} ignorada (índice em {self.dim}).")
+            return []
+
+        results = self.select(self.scores(query_vec), query_vec, k)
+        if threshold is not None:
+            results = [(i, s) for i, s in results if s > threshold]
+        return results
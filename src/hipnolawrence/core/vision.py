@@ -1,9 +1,11 @@
 import os
 import base64
 import json
-import httpx
 import logging
 
+from hipnolawrence.config import OLLAMA_HOST, OLLAMA_KEEP_ALIVE
+from hipnolawrence.core.ollama_transport import get_transport
+
 logger = logging.getLogger("HipnoLawrence.Vision")
 
 class VisionManager:
@@ -12,10 +14,10 @@ class VisionManager:
     Versão Assíncrona.
     """
 
-    def __init__(self, host="http://localhost:11434", model="moondream"):
+    def __init__(self, host=OLLAMA_HOST, model="moondream"):
         self.host = host
         self.model = model
-        self.api_url = f"{self.host}/api/generate"
+        self.transport = get_transport(host)  # Pool HTTP compartilhado do processo
 
     def _encode_image(self, image_path):
         """
@@ -42,19 +44,17 @@ class VisionManager:
                 "model": self.model,
                 "prompt": prompt,
                 "images": [image_base64],
-                "stream": False
+                "stream": False,
+                "keep_alive": OLLAMA_KEEP_ALIVE  # Sem isso o Ollama volta ao padrão (5 min) e descarrega o modelo
             }
 
             logger.info(f"Enviando para Ollama ({self.model})...")
-            async with httpx.AsyncClient(timeout=180.0) as client:
-                response = await client.post(self.api_url, json=payload)
-                response.raise_for_status()
-                result = response.json()
-                
-                if 'response' in result:
-                    return result['response']
-                else:
-                    return f"Resposta inesperada do Ollama: {result}"
+            result = await self.transport.generate(payload, caller="vision")
+            
+            if 'response' in result:
+                return result['response']
+            else:
+                return f"Resposta inesperada do Ollama: {result}"
 
         except Exception as e:
             return f"Erro ao analisar a imagem: {e}"
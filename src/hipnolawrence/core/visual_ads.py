@@ -1,13 +1,115 @@
+import re
 import logging
 import asyncio
 import random
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from playwright.async_api import Page
 
 # Configuração de Logs
 logger = logging.getLogger("HipnoLawrence.VisualAds")
 
+# Cabeçalhos (minúsculos) que identificam as colunas principais, em PT e EN
+NAME_HEADERS = ("campanha", "campaign")
+STATUS_HEADERS = ("status",)
+BUDGET_HEADERS = ("orçamento", "budget")
+
+# Extração em lote: uma chamada lê cabeçalhos e todas as linhas renderizadas (e, opcionalmente, rola a grade).
+# Linha -> {key, index, cells: {cabeçalho: texto}, lines: [textos das células não vazias]}
+# reset: só volta a grade ao topo (sem ler nada); as linhas do topo são lidas na chamada seguinte,
+# depois que a grade virtual as renderizou.
+GRID_HARVEST_JS = r"""
+({ reset, scroll }) => {
+    const clean = (t) => (t || '').replace(/\s+/g, ' ').trim();
+    const rows = Array.from(document.querySelectorAll('div[role="row"]'));
+
+    // Contêiner rolável da grade (ancestral com overflow) ou a própria janela
+    let box = rows.length ? rows[rows.length - 1].parentElement : null;
+    while (box && box !== document.body) {
+        const oy = getComputedStyle(box).overflowY;
+        if ((oy === 'auto' || oy === 'scroll') && box.scrollHeight > box.clientHeight) break;
+        box = box.parentElement;
+    }
+    const scroller = box && box !== document.body ? box : document.scrollingElement;
+    const scrollable = scroller.scrollHeight > scroller.clientHeight;
+    window.__hlGridScroller = scroller;
+    if (reset) {
+        const origin = scroller.scrollTop;
+        scroller.scrollTop = 0;
+        return { rows: [], headers: [], origin, atEnd: false, scrollable };
+    }
+
+    const headers = {};
+    const headerRow = rows.find(r => r.querySelector('[role="columnheader"]'));
+    if (headerRow) {
+        headerRow.querySelectorAll('[role="columnheader"]').forEach((h, i) => {
+            const col = h.getAttribute('aria-colindex') || String(i + 1);
+            const label = clean(h.getAttribute('aria-label') || h.innerText);
+            if (label) headers[col] = label;
+        });
+    }
+
+    const out = [];
+    for (const row of rows) {
+        if (row.querySelector('[role="columnheader"]')) continue;
+        const cellEls = row.querySelectorAll('[role="gridcell"], [role="cell"], [role="rowheader"]');
+        const cells = {}, lines = [];
+        cellEls.forEach((c, i) => {
+            const text = clean(c.innerText);
+            if (!text) return;
+            lines.push(text);
+            const header = headers[c.getAttribute('aria-colindex') || String(i + 1)];
+            if (header) cells[header] = text;
+        });
+        if (!cellEls.length) {
+            // Grade sem células marcadas: mesma leitura por linhas de texto da extração antiga
+            for (const l of (row.innerText || '').split('\n')) if (clean(l)) lines.push(clean(l));
+        }
+        if (!lines.length) continue;
+        const rowIndex = row.getAttribute('aria-rowindex');
+        const key = row.getAttribute('data-row-key') || row.getAttribute('data-id') ||
+                    (rowIndex ? 'r' + rowIndex : lines.join(' | '));
+        out.push({ key, index: rowIndex ? Number(rowIndex) : null, cells, lines });
+    }
+
+    const before = scroller.scrollTop;
+    if (scroll) scroller.scrollTop = before + Math.max(scroller.clientHeight * 0.9, 200);
+    const atEnd = scroll && scroller.scrollTop === before;
+    return { rows: out, headers: Object.values(headers), origin: before, atEnd, scrollable };
+}
+"""
+
+GRID_RESTORE_JS = "(top) => { if (window.__hlGridScroller) window.__hlGridScroller.scrollTop = top; }"
+
+def _pick(cells: Dict[str, str], names) -> Optional[str]:
+    for header, text in cells.items():
+        if any(header.lower().startswith(n) for n in names):
+            return text
+    return None
+
+def parse_cell(text: str):
+    """
+    Tipagem de célula: "R$ 1.234,56/dia" -> 1234.56, "3,45%" -> 0.0345, "1.020" -> 1020.0,
+    "0.5" -> 0.5, "—"/"--" -> None. Texto que não é número volta como está.
+
+    O ponto só é separador de milhar quando há vírgula decimal ou quando todos os grupos
+    depois dos pontos têm exatamente três dígitos; caso contrário é ponto decimal.
+    """
+    raw = (text or "").strip()
+    if raw in ("", "—", "--", "-"): return None
+    match = re.fullmatch(r"(?:R\$|US\$|\$)?\s*(-?\d+(?:\.\d+)*(?:,\d+)?)\s*(%|/dia|/day|mil)?", raw, re.IGNORECASE)
+    if not match: return raw
+    digits = match.group(1)
+    groups = digits.lstrip("-").split(",")[0].split(".")
+    if "," in digits or all(len(g) == 3 for g in groups[1:]):
+        digits = digits.replace(".", "").replace(",", ".")
+    elif len(groups) > 2: return raw
+    number = float(digits)
+    unit = (match.group(2) or "").lower()
+    if unit == "%": return number / 100
+    if unit == "mil": return number * 1000
+    return number
+
 class VisualAdsManager:
     """
     Gerenciador Visual do Google Ads (No-API / No-Token).
@@ -20,6 +122,10 @@ class VisualAdsManager:
 
     # URL base do Dashboard de Campanhas (ajustar conforme a view do usuário)
     ADS_DASHBOARD_URL = "https://ads.google.com/aw/campaigns"
+    # Colheita da grade virtualizada: limite de passos, espera de renderização e passos sem novidade tolerados
+    GRID_MAX_ROUNDS = 60
+    GRID_SETTLE_MS = 350
+    GRID_PATIENCE = 2
 
     def __init__(self, page: Page):
         self.page = page
@@ -45,37 +151,79 @@ class VisualAdsManager:
         except Exception as e:
             logger.warning(f"Não foi possível confirmar carregamento da tabela: {e}")
 
-    async def extract_campaigns_data(self) -> List[Dict[str, Any]]:
-        """Extração de alta precisão: Ignora totais e lixo de interface."""
-        await self.navigate_to_campaigns()
+    async def extract_campaigns_data(self, navigate: bool = True) -> List[Dict[str, Any]]:
+        """
+        Extração de alta precisão: Ignora totais e lixo de interface.
+        navigate=False quando a página já foi aberta (ex.: pipeline de auditoria).
+        A grade virtualizada é colhida por rolagem (harvest_grid); cada passo é uma única chamada à página.
+        """
+        if navigate:
+            await self.navigate_to_campaigns()
         data = []
-        rows = await self.page.locator("div[role='row']").all()
-
-        for row in rows:
-            text = await row.inner_text()
-            lines = [l.strip() for l in text.split('\n') if l.strip()]
-            
+        for row in await self.harvest_grid():
+            cells = row["cells"]
+            name = _pick(cells, NAME_HEADERS) or (row["lines"][0] if row["lines"] else "")
             # FILTRO DE ELITE: 
             # 1. Deve ter nome, status e orçamento.
             # 2. NÃO pode ser linha de Total ou Rascunho.
-            # 3. Deve ter um indicador de status real.
-            if len(lines) >= 3:
-                name = lines[0]
-                status = lines[1]
-                # Ignora linhas de sistema
-                if any(x in name.lower() for x in ["total", "rascunho", "help_outline", "ajuda"]):
-                    continue
-                
-                data.append({
-                    "name": name,
-                    "status": status,
-                    "budget": lines[2],
-                    "metrics_raw": " | ".join(lines[3:])
-                })
+            if not name or any(x in name.lower() for x in ["total", "rascunho", "help_outline", "ajuda"]):
+                continue
+            status = _pick(cells, STATUS_HEADERS)
+            budget = _pick(cells, BUDGET_HEADERS)
+            if status is None or budget is None:
+                # Grade sem cabeçalhos reconhecíveis: mesma leitura posicional de antes (nome, status, orçamento)
+                if len(row["lines"]) < 3: continue
+                name, status, budget = row["lines"][:3]
+            used = {name, status, budget}
+            data.append({
+                "name": name,
+                "status": status,
+                "budget": budget,
+                "metrics_raw": " | ".join(l for l in row["lines"] if l not in used),
+                "columns": {header: parse_cell(text) for header, text in cells.items()},
+                "key": row["key"],
+            })
         
         logger.info(f"Filtro aplicado: {len(data)} campanhas reais encontradas.")
         return data
 
+    async def harvest_grid(self, max_rounds: int = None, settle_ms: int = None) -> List[Dict[str, Any]]:
+        """
+        Colheita da grade virtualizada: volta a grade ao topo numa chamada própria e espera a
+        renderização; depois cada chamada extrai as linhas renderizadas e rola o contêiner,
+        deduplicando por chave de linha. Para quando a rolagem chega ao fim ou quando
+        GRID_PATIENCE passos seguidos não trazem linhas novas. Restaura a rolagem original ao final.
+        """
+        max_rounds = max_rounds or self.GRID_MAX_ROUNDS
+        settle_ms = self.GRID_SETTLE_MS if settle_ms is None else settle_ms
+        rows, idle = {}, 0
+        reset = await self.page.evaluate(GRID_HARVEST_JS, {"reset": True, "scroll": False})
+        calls, origin = 1, reset["origin"]
+        if reset["scrollable"]:
+            await self.page.wait_for_timeout(settle_ms)  # Linhas do topo renderizam antes da 1ª leitura
+        for round_ in range(max_rounds):
+            step = await self.page.evaluate(GRID_HARVEST_JS, {"reset": False, "scroll": True})
+            calls += 1
+            fresh = 0
+            for row in step["rows"]:
+                if row["key"] not in rows:
+                    rows[row["key"]] = row
+                    fresh += 1
+            idle = 0 if fresh else idle + 1
+            if step["atEnd"] or idle >= self.GRID_PATIENCE or not step["scrollable"]:
+                if step["atEnd"] and step["scrollable"]:
+                    # Última tela após a rolagem final ainda não foi lida
+                    await self.page.wait_for_timeout(settle_ms)
+                    last = await self.page.evaluate(GRID_HARVEST_JS, {"reset": False, "scroll": False})
+                    calls += 1
+                    for row in last["rows"]: rows.setdefault(row["key"], row)
+                break
+            await self.page.wait_for_timeout(settle_ms)  # Grade virtual renderiza as próximas linhas
+        await self.page.evaluate(GRID_RESTORE_JS, origin)
+        logger.info(f"Grade colhida: {len(rows)} linhas únicas em {calls} chamadas à página.")
+        # Ordem lógica da grade quando disponível (aria-rowindex); senão, ordem de descoberta
+        return sorted(rows.values(), key=lambda r: r["index"] if r["index"] is not None else float("inf"))
+
     async def capture_kpi_snapshot(self, output_path: str = "kpi_snapshot.png"):
         """
         Tira um screenshot da área superior (Visão Geral) para análise via OCR/VLM.
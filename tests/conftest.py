@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Garante acesso ao core
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
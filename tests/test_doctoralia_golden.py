@@ -0,0 +1,110 @@
+import re
+import json
+import asyncio
+from pathlib import Path
+from html.parser import HTMLParser
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from hipnolawrence.core.doctoralia_intelligence import DoctoraliaIntelligence, CARD_SCHEMA_VERSION, normalize_cards, diff_cards
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "scripts" / "fixtures" / "doctoralia"
+FIXTURES = sorted(FIXTURES_DIR.glob("*.html"))
+
+
+def load_golden(html):
+    return json.loads(html.with_suffix(".golden.json").read_text(encoding="utf-8"))
+
+
+class RawCardParser(HTMLParser):
+    """Reproduz, sem navegador, o retorno bruto de CARD_EXTRACT_JS (mesmos seletores)."""
+
+    def __init__(self):
+        super().__init__()
+        self.items, self.has_next = [], False
+        self._item = None
+        self._depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if tag == "li" and "data-id" in attrs and self._item is None:
+            self._item = {"id": attrs["data-id"], "text": [], "name": None, "href": None,
+                          "in_name": False, "sponsored": False, "score": None}
+            self._depth = 0
+        if tag == "a" and attrs.get("aria-label") == "next":
+            self.has_next = True
+        if self._item is None: return
+        if tag == "li": self._depth += 1
+        if tag == "a" and "rank-element-name" in classes and self._item["href"] is None:
+            self._item.update(href=attrs.get("href"), in_name=True, name=[])
+        if "badge-ad" in classes: self._item["sponsored"] = True
+        if "data-score" in attrs and self._item["score"] is None: self._item["score"] = attrs["data-score"]
+
+    def handle_endtag(self, tag):
+        if self._item is None: return
+        if tag == "a": self._item["in_name"] = False
+        if tag == "li":
+            self._depth -= 1
+            if self._depth == 0:
+                self.items.append(self._item)
+                self._item = None
+
+    def handle_data(self, data):
+        if self._item is None: return
+        self._item["text"].append(data)
+        if self._item["in_name"]: self._item["name"].append(data)
+
+    def payload(self):
+        clean = lambda parts: " ".join("".join(parts).split())
+        cards = []
+        for i, item in enumerate(self.items):
+            if item["href"] is None: continue
+            reviews = re.search(r"(\d[\d.]*)\s+opini", clean(item["text"]), re.IGNORECASE)
+            cards.append({"position": i, "name": clean(item["name"]), "id": item["id"],
+                          "is_sponsored": item["sponsored"], "score": item["score"],
+                          "reviews": reviews.group(1) if reviews else None, "profile_url": item["href"]})
+        return {"schema": CARD_SCHEMA_VERSION, "cards": cards, "has_next": self.has_next}
+
+
+@pytest.mark.parametrize("html", FIXTURES, ids=lambda p: p.stem)
+def test_normalize_cards_matches_golden(html):
+    parser = RawCardParser()
+    parser.feed(html.read_text(encoding="utf-8"))
+    golden = load_golden(html)
+    assert diff_cards(golden["expected"], normalize_cards(parser.payload(), golden["offset"])) == []
+
+
+def test_normalize_cards_conversions():
+    payload = {"schema": CARD_SCHEMA_VERSION, "has_next": False, "cards": [
+        {"position": 0, "name": "A", "id": "1", "is_sponsored": False, "score": "4,8", "reviews": "1.204", "profile_url": "/a/psicologo"},
+        {"position": 2, "name": "B", "id": "2", "is_sponsored": True, "score": None, "reviews": None, "profile_url": None},
+    ]}
+    first, second = normalize_cards(payload, offset=20)["cards"]
+    assert (first["rank"], first["rating"], first["reviews"]) == (21, 4.8, 1204)
+    assert first["profile_url"] == DoctoraliaIntelligence.DOCTORALIA_URL + "/a/psicologo"
+    assert (second["rank"], second["rating"], second["reviews"], second["profile_url"]) == (23, None, None, None)
+
+
+def test_extract_cards_matches_golden_in_browser():
+    from playwright.async_api import async_playwright
+
+    async def run():
+        async with async_playwright() as p:
+            try:
+                browser = await p.chromium.launch(headless=True)
+            except Exception as e:
+                pytest.skip(f"Chromium indisponível: {e}")
+            page = await browser.new_page()
+            intel = DoctoraliaIntelligence(page)
+            problems = {}
+            for html in FIXTURES:
+                golden = load_golden(html)
+                await page.set_content(html.read_text(encoding="utf-8"))
+                problems[html.name] = diff_cards(golden["expected"], await intel.extract_cards(offset=golden["offset"]))
+            await browser.close()
+            return problems
+
+    assert {name: found for name, found in asyncio.run(run()).items() if found} == {}
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from hipnolawrence.core.memory import MemoryManager
+
+
+@pytest.fixture
+def memory(tmp_path, monkeypatch):
+    # MemoryManager grava em data/ relativo ao diretório de trabalho
+    monkeypatch.chdir(tmp_path)
+    manager = MemoryManager()
+    yield manager
+    manager.store.close()
+
+
+def _wait_lexical(manager):
+    if manager._lexical_thread: manager._lexical_thread.join(timeout=10)
+
+
+def test_defaults_come_from_config(memory):
+    assert memory.retrieval_mode == "hybrid"
+    assert memory.storage == "float32"
+    assert memory.index_mode == "exact"
+
+
+def test_default_manager_builds_lexical_index(memory):
+    _wait_lexical(memory)
+    assert memory.lexical is not None
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(20, 8)).astype(np.float32)
+    records = [{"id": str(i), "text": f"campanha {i} hipnose clinica"} for i in range(20)]
+    assert memory._commit(records, vectors) == 20
+    assert len(memory.lexical) == 20  # Atualizado incrementalmente no _commit
+
+    hits = memory._search_with_vector("campanha 7", vectors[7], 2, None)
+    assert hits[0][0] == "campanha 7 hipnose clinica"
+
+
+def test_lexical_index_survives_restart(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = MemoryManager()
+    _wait_lexical(first)
+    rng = np.random.default_rng(1)
+    first._commit([{"id": str(i), "text": f"termo{i}"} for i in range(5)], rng.normal(size=(5, 8)))
+    first._save_lexical()
+    first.store.close()
+
+    second = MemoryManager()
+    _wait_lexical(second)
+    assert second.retrieval_mode == "hybrid"
+    assert len(second.lexical) == 5
+    second.store.close()
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("playwright")
+
+from hipnolawrence.core.visual_ads import parse_cell
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("R$ 1.234,56/dia", 1234.56),
+    ("3,45%", 0.0345),
+    ("1.020", 1020.0),
+    ("1.234.567", 1234567.0),
+    ("0.5", 0.5),
+    ("0.5%", 0.005),
+    ("R$ 2.75", 2.75),
+    ("12,5 mil", 12500.0),
+])
+def test_parse_cell_numbers(text, expected):
+    assert parse_cell(text) == pytest.approx(expected)
+
+
+def test_parse_cell_empty_and_text():
+    assert parse_cell("—") is None
+    assert parse_cell("--") is None
+    assert parse_cell("Qualificada") == "Qualificada"
+    assert parse_cell("1.234.56") == "1.234.56"